@@ -1,30 +1,129 @@
 # By Gabriel Schmeisk
 
-from collections import deque  # Importa deque, usado para criar filas que permitem adicionar/remover elementos dos dois lados
+import argparse                # Importa argparse, utilizado para ler os comandos do modo sem menus
+import atexit                  # Importa atexit, utilizado para gravar as alterações pendentes ao encerrar o programa
+import asyncio                 # Importa asyncio, utilizado pelo servidor HTTP de consultas
+import csv                     # Importa csv, utilizado para ler planilhas de notas exportadas em .csv
+import functools               # Importa functools, utilizado para medir as operações sem mudar o nome das funções
+import json                    # Importa json, utilizado para responder os comandos do modo sem menus
+import mmap                    # Importa mmap, utilizado para consultar um aluno no "alunos.txt" sem ler o arquivo todo
 import os                      # Importa o módulo OS para manipulação de arquivos e pastas
 import random                  # Importa random, utilizado para gerar RAs aleatórios
+import shlex                   # Importa shlex, utilizado para separar os comandos lidos da entrada padrão
+import signal                  # Importa signal, utilizado para gravar as alterações pendentes ao receber um sinal de término
+import sqlite3                 # Importa sqlite3, utilizado pelo armazenamento opcional em banco de dados SQLite
 import string                  # Importa string, utilizado para gerar letras e números para o RA
+import sys                     # Importa sys, utilizado para ler os argumentos e a entrada padrão do modo sem menus
+import time                    # Importa time, utilizado para medir a velocidade das importações em lote
+import unicodedata             # Importa unicodedata, utilizado para comparar nomes de matérias sem acentos
+from bisect import bisect_left, insort  # Importa bisect, utilizado para manter as listas das turmas ordenadas por nome
+from collections import OrderedDict, deque  # OrderedDict: cache de boletins e relatórios (LRU); deque: últimas durações medidas
+from contextlib import contextmanager  # Importa contextmanager, utilizado para criar a gravação atômica com "with"
+from urllib.parse import unquote  # Importa unquote, utilizado para ler nomes com espaços e acentos nas URLs do servidor
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor  # Executa a gravação dos relatórios em paralelo
+import math                    # Importa math, utilizado para comparar as médias acumuladas com o recálculo completo
+import struct                  # Importa struct, utilizado para montar o cabeçalho do instantâneo binário
+import threading               # Importa threading, utilizado para a trava da pasta entre threads do mesmo processo
+from array import array        # Importa array, utilizado para gravar/ler colunas de números no instantâneo binário
+
+try:
+    import numpy as np         # NumPy é opcional: quando instalado, a matriz de notas usa um ndarray
+except ImportError:
+    np = None                  # Sem NumPy, a matriz de notas usa array("d") da biblioteca padrão
+
+try:
+    import fcntl               # Trava de arquivo no Linux/Mac
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt              # Trava de arquivo no Windows
+except ImportError:
+    msvcrt = None
 
 # --------------------- DICIONÁRIOS E FILAS --------------------- #
 alunos = {}             # Dicionário que guarda os alunos cadastrados. Chave: RA, Valor: {"nome": ..., "turma": ...}
-notas = {}              # Dicionário que guarda as notas dos alunos. Chave: RA, Valor: {"materia": media, ...}
-fila_alunos = deque()   # Fila para controlar a ordem dos alunos, útil para salvar na ordem de cadastro
+fila_alunos = {}        # Fila (dicionário que preserva a ordem de inserção) com os RAs na ordem de cadastro. Chave: RA, Valor: None
+                        # Diferente de uma lista/deque, verificar, incluir e remover um RA custa O(1)
 ras_existentes = set()  # Conjunto que guarda os RAs existentes, garantindo que não haja duplicados
+# As notas ficam na matriz "notas" (alunos x matérias), criada logo após a lista de matérias válidas
+indice_turmas = {}      # Índice por turma (em MAIÚSCULAS). Chave: turma, Valor: lista de (nome, RA) sempre ordenada por nome
+acumulados_turmas = {}   # Chave: turma, Valor: [soma das médias gerais, qtd. de alunos com todas as notas]
+acumulados_materias = {} # Chave: matéria, Valor: [soma das notas, qtd. de alunos com nota na matéria]
+# Índice de nomes para a busca: lista ordenada de (parte do nome sem acentos, nome, RA), uma entrada por
+# parte do nome ("ana", "silva"), e o nome sem acentos de cada RA (" ana silva"). Montado na primeira busca e
+# mantido a cada alteração
+indice_nomes = {"pronto": False, "entradas": [], "termos": {}}
+
+# --------------------- CONTROLE DE ALTERAÇÕES --------------------- #
+# Guardam o que foi modificado desde o último salvamento, para regravar apenas os arquivos afetados
+alunos_alterados = set()   # RAs cadastrados, removidos ou com notas alteradas (afetam o "alunos.txt")
+turmas_alteradas = set()   # Turmas cujo arquivo em "turmas/" precisa ser regravado
+materias_alteradas = set() # Matérias cujo arquivo (ex: "matematica.txt") precisa ser regravado
+particoes_alteradas = set() # Turmas cujo arquivo no armazenamento particionado precisa ser regravado
 
 # --------------------- CRIAÇÃO DE PASTAS --------------------- #
-PASTA_ARQUIVOS = "dados_escolares"      # Define o nome da pasta principal onde serão salvos arquivos de alunos e notas
-if not os.path.exists(PASTA_ARQUIVOS):  # Verifica se a pasta já existe
-    os.makedirs(PASTA_ARQUIVOS)         # Se não existir, cria a pasta
-
-PASTA_TURMAS = "turmas"               # Define a pasta onde cada turma terá seu arquivo separado
-if not os.path.exists(PASTA_TURMAS):  # Verifica se a pasta de turmas existe
-    os.makedirs(PASTA_TURMAS)         # Cria a pasta caso não exista
+# As pastas só são criadas no carregamento dos dados: importar este arquivo não cria nada no disco
+PASTA_ARQUIVOS = "dados_escolares"  # Define o nome da pasta principal onde serão salvos arquivos de alunos e notas
+PASTA_TURMAS = "turmas"             # Define a pasta onde cada turma terá seu arquivo separado
+estado_carregamento = {"carregado": False}  # Se os dados já foram lidos do armazenamento
+
+def definir_pasta_base(pasta):
+    # Guarda as pastas de dados dentro de "pasta" (o padrão é a pasta atual)
+    global PASTA_ARQUIVOS, PASTA_TURMAS
+    PASTA_ARQUIVOS = os.path.normpath(os.path.join(pasta, "dados_escolares"))
+    PASTA_TURMAS = os.path.normpath(os.path.join(pasta, "turmas"))
+
+def preparar_pastas():
+    if not os.path.exists(PASTA_ARQUIVOS):  # Verifica se a pasta já existe
+        os.makedirs(PASTA_ARQUIVOS)         # Se não existir, cria a pasta
+    if not os.path.exists(PASTA_TURMAS):    # Verifica se a pasta de turmas existe
+        os.makedirs(PASTA_TURMAS)           # Cria a pasta caso não exista
+
+# --------------------- DIÁRIO DE ALTERAÇÕES --------------------- #
+USAR_DIARIO = True            # Se True, cada alteração é apenas acrescentada ao diário em vez de regravar o "alunos.txt"
+ARQUIVO_DIARIO = "diario.log" # Arquivo (dentro de PASTA_ARQUIVOS) onde as alterações são acrescentadas, uma por linha
+LIMITE_DIARIO = 1000          # Quantidade de registros no diário que dispara a compactação no "alunos.txt"
+estado_diario = {"registros": 0, "posicao": 0, "versao": 0}  # Registros desde a última compactação,
+                                                             # byte do diário já lido e versão do instantâneo lido
+
+# --------------------- VÁRIOS PROCESSOS NA MESMA PASTA --------------------- #
+ARQUIVO_TRAVA = ".trava"  # Arquivo (dentro de PASTA_ARQUIVOS) travado enquanto um processo altera os dados
+ARQUIVO_VERSAO = "versao"  # Número da versão do instantâneo, incrementado a cada compactação
+trava_pasta = {"nivel": 0, "arquivo": None, "threads": threading.RLock()}
+
+# --------------------- ARMAZENAMENTO --------------------- #
+BACKEND_ARMAZENAMENTO = "texto"  # "texto" (alunos.txt + diário + instantâneo binário), "sqlite" (banco escola.db)
+                                 # ou "particionado" (um arquivo por turma + manifesto)
+ARQUIVO_SQLITE = "escola.db"     # Banco SQLite (dentro de PASTA_ARQUIVOS) usado quando BACKEND_ARMAZENAMENTO = "sqlite"
+PASTA_PARTICOES = "particoes"    # Pasta (dentro de PASTA_ARQUIVOS) com um arquivo por turma no armazenamento particionado
+ARQUIVO_MANIFESTO = "manifesto.json"  # Turmas gravadas, quantidade de alunos e versão de cada arquivo de turma
+VERSAO_MANIFESTO = 1
+estado_armazenamento = {"backend": None}  # Armazenamento em uso, criado no primeiro acesso
+
+# --------------------- RELATÓRIOS SOB DEMANDA --------------------- #
+RELATORIOS_SOB_DEMANDA = True           # Se True, os arquivos de matéria e de turma só são gerados quando pedidos (opção 9,
+                                        # comando "exportar", ao sair); se False, são regravados a cada alteração
+ARQUIVO_RELATORIOS = "relatorios.json"  # Manifesto (dentro de PASTA_ARQUIVOS) com a situação de cada relatório
+VERSAO_RELATORIOS = 1
+estado_relatorios = {"manifesto": None, "assinatura": None}  # Último manifesto lido ou gravado e o stat dele
+
+# --------------------- INSTANTÂNEO BINÁRIO --------------------- #
+ARQUIVO_BINARIO = "alunos.bin"  # Cópia compacta do "alunos.txt", lida no carregamento em vez do texto
+VERSAO_BINARIO = 1              # Versão do formato; arquivos de outra versão são ignorados (o texto é lido)
+TAMANHO_RA = 8                  # Largura fixa (em bytes) reservada para cada RA
+
+# --------------------- ÍNDICE DE POSIÇÕES DO "alunos.txt" --------------------- #
+ARQUIVO_INDICE = "alunos.idx"  # RA -> posição (em bytes) do aluno no "alunos.txt", gravado junto com ele
+VERSAO_INDICE = 1
 
 # --------------------- INICIA O PROGRAMA NO LOGIN DO PROFESSOR --------------------- #
 def main():
+    if os.environ.get("SISTEMA_ESCOLAR_METRICAS"):
+        ativar_metricas(os.environ["SISTEMA_ESCOLAR_METRICAS"])  # Ex: SISTEMA_ESCOLAR_METRICAS=metricas.prom
     if primeiro_acesso():
         # A função primeiro_acesso já carrega os dados
         salvar_turmas() # Atualiza arquivos de turma após o carregamento inicial
+        iniciar_salvamento_em_segundo_plano()  # Os arquivos passam a ser regravados sem travar a digitação
 
         while True:
             limpar_console()
@@ -54,11 +153,1447 @@ def sair():
 def turmasfixas():
     return ["9A", "9B", "9C"]
 
+# --------------------- MATRIZ DE NOTAS --------------------- #
+class MatrizNotas:
+    # Guarda as médias em uma matriz de números (uma linha por aluno, uma coluna por matéria),
+    # com NaN no lugar de "N/A". Cada RA recebe uma linha fixa; linhas de alunos removidos são reaproveitadas.
+    # Ocupa 8 bytes por nota, em vez de um dicionário com floats separados para cada aluno.
+
+    def __init__(self, materias):
+        self.materias = list(materias)                                  # Ordem das colunas
+        self.coluna = {materia: i for i, materia in enumerate(self.materias)}
+        self.linha_do_ra = {}                                           # Chave: RA, Valor: número da linha
+        self.linhas_livres = []                                         # Linhas liberadas por alunos removidos
+        self.capacidade = 0                                             # Quantidade de linhas já reservadas
+        self.dados = np.empty((0, len(self.materias))) if np is not None else array("d")
+
+    def __contains__(self, ra):
+        return ra in self.linha_do_ra  # True se o aluno já teve uma linha de notas criada
+
+    def __len__(self):
+        return len(self.linha_do_ra)
+
+    def _crescer(self):
+        # Dobra a capacidade, para que incluir N alunos custe O(N) no total
+        nova = max(64, self.capacidade * 2)
+        if np is not None:
+            novos_dados = np.full((nova, len(self.materias)), np.nan)
+            novos_dados[:self.capacidade] = self.dados
+            self.dados = novos_dados
+        else:
+            self.dados.extend([float("nan")] * ((nova - self.capacidade) * len(self.materias)))
+        self.linhas_livres.extend(range(nova - 1, self.capacidade - 1, -1))  # Menores linhas saem primeiro
+        self.capacidade = nova
+
+    def criar_linha(self, ra):
+        # Reserva uma linha (toda N/A) para o aluno, se ele ainda não tiver uma
+        if ra not in self.linha_do_ra:
+            if not self.linhas_livres:
+                self._crescer()
+            self.linha_do_ra[ra] = self.linhas_livres.pop()
+        return self.linha_do_ra[ra]
+
+    def _posicao(self, linha, coluna):
+        return (linha, coluna) if np is not None else linha * len(self.materias) + coluna
+
+    def obter(self, ra, materia):
+        # Devolve a média do aluno na matéria, ou None se não houver nota
+        linha = self.linha_do_ra.get(ra)
+        if linha is None or materia not in self.coluna:
+            return None
+        nota = float(self.dados[self._posicao(linha, self.coluna[materia])])
+        return None if nota != nota else nota  # NaN é o único valor diferente de si mesmo
+
+    def definir(self, ra, materia, valor):
+        if materia not in self.coluna:
+            return  # Matéria fora da lista de matérias válidas: não há coluna para ela
+        linha = self.criar_linha(ra)
+        self.dados[self._posicao(linha, self.coluna[materia])] = float("nan") if valor is None else valor
+
+    def definir_linha(self, ra, valores):
+        # Grava todas as matérias de uma vez, na ordem de self.materias (usado no carregamento)
+        linha = self.criar_linha(ra)
+        for coluna, valor in enumerate(valores):
+            self.dados[self._posicao(linha, coluna)] = valor
+
+    def notas_do_aluno(self, ra):
+        # Dicionário {matéria: média ou None}; vazio se o aluno ainda não tem linha de notas
+        if ra not in self.linha_do_ra:
+            return {}
+        return {materia: self.obter(ra, materia) for materia in self.materias}
+
+    def remover(self, ra):
+        linha = self.linha_do_ra.pop(ra, None)
+        if linha is not None:
+            for coluna in range(len(self.materias)):
+                self.dados[self._posicao(linha, coluna)] = float("nan")  # Linha volta a ficar toda N/A
+            self.linhas_livres.append(linha)
+
+    def coluna_valores(self, materia, ras):
+        # Notas de uma matéria para os RAs informados, na mesma ordem (None = N/A)
+        coluna = self.coluna[materia]
+        linhas = [self.linha_do_ra.get(ra, -1) for ra in ras]
+        if np is not None and linhas and self.capacidade:
+            indices = np.array(linhas, dtype=np.intp)
+            valores = np.where(indices >= 0, self.dados[np.where(indices >= 0, indices, 0), coluna], np.nan)
+            return [None if v != v else v for v in valores.tolist()]
+        return [self.obter(ra, materia) for ra in ras]
+
+    def resumo(self, ras):
+        # Calcula, de uma só vez para todos os RAs informados, três listas na mesma ordem:
+        # tem alguma nota, tem todas as notas (máscara de completude) e média geral (None se incompleto)
+        qtd_materias = len(self.materias)
+        linhas = [self.linha_do_ra.get(ra, -1) for ra in ras]  # -1 = aluno ainda sem linha de notas
+        if np is not None:
+            if not linhas or not self.capacidade:
+                return [False] * len(linhas), [False] * len(linhas), [None] * len(linhas)
+            indices = np.array(linhas, dtype=np.intp)
+            tem_linha = indices >= 0
+            sub = self.dados[np.where(tem_linha, indices, 0)]             # Só as linhas pedidas, em um único bloco
+            presentes = ~np.isnan(sub) & tem_linha[:, None]
+            completo = presentes.all(axis=1)
+            medias = np.where(completo, sub.sum(axis=1) / qtd_materias, np.nan)
+            return (presentes.any(axis=1).tolist(), completo.tolist(),
+                    [None if m != m else m for m in medias.tolist()])
+        tem_nota, completo, medias = [], [], []
+        for linha in linhas:
+            valores = self.dados[linha * qtd_materias:(linha + 1) * qtd_materias] if linha >= 0 else []
+            presentes = [v for v in valores if v == v]                    # Descarta os NaN (N/A)
+            tem_nota.append(bool(presentes))
+            completo.append(len(presentes) == qtd_materias)
+            medias.append(sum(presentes) / qtd_materias if len(presentes) == qtd_materias else None)
+        return tem_nota, completo, medias
+
+    def limpar(self):
+        self.__init__(self.materias)
+
+notas = MatrizNotas(obter_materias_validas())  # Notas de todos os alunos. Ex: notas.obter("F1A2B3", "Matematica")
+
+# --------------------- CÁLCULO DE MÉDIAS E SITUAÇÃO --------------------- #
+MEDIA_APROVACAO = 6  # Média geral mínima para o aluno ser APROVADO
+
+def calcular_agregados(ras=None):
+    # Calcula em uma única passada sobre a matriz de notas (todos os alunos, ou só os RAs informados):
+    #   "tem_nota"   -> RA: True se o aluno tem ao menos uma nota
+    #   "completo"   -> RA: True se o aluno tem nota em todas as matérias
+    #   "media"      -> RA: média geral (None se faltar alguma matéria)
+    #   "status"     -> RA: "APROVADO", "REPROVADO" ou None (matérias a serem lançadas)
+    #   "media_turma"-> TURMA: média das médias dos alunos completos (None se nenhum estiver completo)
+    if ras is None:
+        ras = list(fila_alunos)
+    tem_nota, completo, medias = notas.resumo(ras)
+
+    agregados = {
+        "tem_nota": dict(zip(ras, tem_nota)),
+        "completo": dict(zip(ras, completo)),
+        "media": dict(zip(ras, medias)),
+        "status": {},
+        "media_turma": {},
+    }
+    somas_turmas = {}  # TURMA: [soma das médias, quantidade de alunos completos]
+    for ra, media in zip(ras, medias):
+        turma = alunos[ra]["turma"].upper()
+        soma = somas_turmas.setdefault(turma, [0, 0])
+        if media is None:
+            agregados["status"][ra] = None
+        else:
+            agregados["status"][ra] = "APROVADO" if media >= MEDIA_APROVACAO else "REPROVADO"
+            soma[0] += media
+            soma[1] += 1
+    for turma, (soma, qtd) in somas_turmas.items():
+        agregados["media_turma"][turma] = soma / qtd if qtd else None
+    return agregados
+
+def montar_boletim(ra, nome, turma, notas_aluno):
+    # Boletim de um aluno a partir das suas notas {matéria: média ou None} (vazio = aluno sem linha de notas)
+    presentes = [media for media in notas_aluno.values() if media is not None]
+    completo = bool(notas_aluno) and len(presentes) == len(notas.materias)
+    media = sum(presentes) / len(notas.materias) if completo else None
+    return {
+        "ra": ra,
+        "nome": nome,
+        "turma": turma,
+        "notas": notas_aluno,
+        "tem_nota": bool(presentes),
+        "completo": completo,
+        "media": media,
+        "status": None if media is None else ("APROVADO" if media >= MEDIA_APROVACAO else "REPROVADO"),
+    }
+
+# --------------------- MÉDIAS ACUMULADAS POR TURMA E POR MATÉRIA --------------------- #
+# Somas e contagens mantidas a cada alteração, para que a média de uma turma ou matéria
+# seja obtida na hora, sem percorrer os alunos. Cada atualização custa O(qtd. de matérias).
+def _acumular(acumulados, chave, valor, sinal):
+    soma = acumulados.setdefault(chave, [0.0, 0])
+    soma[0] += sinal * valor
+    soma[1] += sinal
+    if soma[1] == 0:
+        soma[0] = 0.0  # Sem alunos: zera a soma para não acumular resíduos de arredondamento
+
+def _contribuir(ra, sinal):
+    # sinal = +1 inclui as notas do aluno nas somas; sinal = -1 retira
+    if ra not in notas:
+        return  # Aluno sem nenhuma nota não contribui para nenhuma média
+    for materia in notas.materias:
+        nota = notas.obter(ra, materia)
+        if nota is not None:
+            _acumular(acumulados_materias, materia, nota, sinal)
+    _, _, medias = notas.resumo([ra])
+    if medias[0] is not None:
+        _acumular(acumulados_turmas, alunos[ra]["turma"].upper(), medias[0], sinal)
+
+def retirar_dos_acumulados(ra):
+    _contribuir(ra, -1)
+
+def incluir_nos_acumulados(ra):
+    _contribuir(ra, +1)
+
+def reconstruir_acumulados():
+    # Recalcula todas as somas do zero (usado após carregar os arquivos)
+    acumulados_turmas.clear()
+    acumulados_materias.clear()
+    for ra in fila_alunos:
+        incluir_nos_acumulados(ra)
+
+def media_da_turma(turma):
+    soma, qtd = acumulados_turmas.get(turma.upper(), (0.0, 0))
+    return soma / qtd if qtd else None  # None se nenhum aluno da turma tiver todas as notas
+
+def media_da_materia(materia):
+    soma, qtd = acumulados_materias.get(materia, (0.0, 0))
+    return soma / qtd if qtd else None  # None se nenhum aluno tiver nota na matéria
+
+def verificar_acumulados():
+    # Confere as médias acumuladas com um recálculo completo; devolve a lista de divergências (vazia = tudo certo)
+    divergencias = []
+    agregados = calcular_agregados()
+    for turma in set(agregados["media_turma"]) | set(acumulados_turmas):
+        esperado, obtido = agregados["media_turma"].get(turma), media_da_turma(turma)
+        if (esperado is None) != (obtido is None) or (esperado is not None and not math.isclose(esperado, obtido, abs_tol=1e-9)):
+            divergencias.append(("turma", turma, esperado, obtido))
+    for materia in notas.materias:
+        valores = [notas.obter(ra, materia) for ra in fila_alunos]
+        valores = [v for v in valores if v is not None]
+        esperado, obtido = (sum(valores) / len(valores) if valores else None), media_da_materia(materia)
+        if (esperado is None) != (obtido is None) or (esperado is not None and not math.isclose(esperado, obtido, abs_tol=1e-9)):
+            divergencias.append(("materia", materia, esperado, obtido))
+    return divergencias
+
+# --------------------- CACHE DE BOLETINS E RELATÓRIOS (LRU) --------------------- #
+TAMANHO_CACHE_BOLETINS = 1024  # Boletins (dados e texto) guardados; os usados há mais tempo saem primeiro
+TAMANHO_CACHE_TURMAS = 64      # Blocos por turma (seção do "alunos.txt" e lista de alunos da consulta)
+
+class CacheLRU:
+    # Dicionário com tamanho máximo: ao passar do limite, descarta o item usado há mais tempo
+    def __init__(self, capacidade):
+        self.capacidade = capacidade
+        self.itens = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self.trava = threading.Lock()  # O salvamento em segundo plano (servidor HTTP) usa o cache em outra thread
+
+    def obter(self, chave):
+        # Devolve o valor guardado ou None
+        with self.trava:
+            valor = self.itens.get(chave)
+            if valor is None:
+                self.falhas += 1
+                return None
+            self.itens.move_to_end(chave)  # Passa a ser o item usado mais recentemente
+            self.acertos += 1
+            return valor
+
+    def guardar(self, chave, valor):
+        with self.trava:
+            self.itens[chave] = valor
+            self.itens.move_to_end(chave)
+            while len(self.itens) > self.capacidade:
+                self.itens.popitem(last=False)  # Descarta o item usado há mais tempo
+
+    def descartar(self, *chaves):
+        with self.trava:
+            for chave in chaves:
+                self.itens.pop(chave, None)
+
+    def limpar(self):
+        with self.trava:
+            self.itens.clear()
+
+    def estatisticas(self):
+        consultas = self.acertos + self.falhas
+        return {"acertos": self.acertos, "falhas": self.falhas, "itens": len(self.itens),
+                "capacidade": self.capacidade, "taxa_acerto": self.acertos / consultas if consultas else 0.0}
+
+cache_boletins = CacheLRU(TAMANHO_CACHE_BOLETINS)  # Chaves: ("dados", RA) e ("texto", RA)
+cache_turmas = CacheLRU(TAMANHO_CACHE_TURMAS)      # Chaves: ("secao", TURMA) e ("lista", TURMA)
+
+def invalidar_cache(ra=None, turma=None):
+    # Descarta apenas o boletim do aluno e os blocos da turma afetados por uma alteração
+    if ra is not None:
+        cache_boletins.descartar(("dados", ra), ("texto", ra))
+    if turma is not None:
+        turma = turma.upper()
+        cache_turmas.descartar(("secao", turma), ("lista", turma))
+
+def estatisticas_cache():
+    return {"boletins": cache_boletins.estatisticas(), "turmas": cache_turmas.estatisticas()}
+
+# --------------------- MÉTRICAS DE DESEMPENHO --------------------- #
+# Desligadas por padrão: cada operação medida custa apenas a verificação de metricas["ativas"].
+# Ligadas (ativar_metricas(), opção --metricas ou variável SISTEMA_ESCOLAR_METRICAS), guardam por operação
+# as chamadas, o tempo total, as últimas AMOSTRAS_METRICAS durações (para p50/p99) e os arquivos e bytes gravados.
+# Tempos e bytes são inclusivos: "salvar" contém "salvar_turmas", que contém "relatorios".
+AMOSTRAS_METRICAS = 1024
+PREFIXO_PROMETHEUS = "sistema_escolar"
+QUANTIS_PROMETHEUS = {"p50": "0.5", "p99": "0.99"}
+metricas = {"ativas": False, "arquivo": None, "operacoes": {}, "arquivos": 0, "bytes": 0, "trava": threading.Lock()}
+operacoes_em_andamento = threading.local()  # Pilha de operações medidas abertas em cada thread
+
+def ativar_metricas(arquivo=None):
+    # "arquivo" terminado em .prom recebe o formato texto do Prometheus; qualquer outro, JSON
+    metricas["ativas"] = True
+    metricas["arquivo"] = arquivo or metricas["arquivo"]
+
+def desativar_metricas():
+    metricas["ativas"] = False  # O que já foi medido continua disponível até zerar_metricas()
+
+def zerar_metricas():
+    with metricas["trava"]:
+        metricas["operacoes"].clear()
+        metricas["arquivos"] = metricas["bytes"] = 0
+
+def executar_medido(nome, funcao, *args, **kwargs):
+    if not metricas["ativas"]:
+        return funcao(*args, **kwargs)
+    pilha = getattr(operacoes_em_andamento, "pilha", None)
+    if pilha is None:
+        pilha = operacoes_em_andamento.pilha = []
+    pilha.append(nome)
+    inicio = time.perf_counter()
+    try:
+        return funcao(*args, **kwargs)
+    finally:
+        duracao = time.perf_counter() - inicio
+        pilha.pop()
+        with metricas["trava"]:
+            dados = dados_da_operacao(nome)
+            dados["chamadas"] += 1
+            dados["segundos"] += duracao
+            dados["amostras"].append(duracao)
+
+def medido(nome):
+    # Decorador: @medido("salvar_turmas") acumula chamadas e durações da função quando as métricas estão ligadas
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def funcao_medida(*args, **kwargs):
+            if not metricas["ativas"]:
+                return funcao(*args, **kwargs)
+            return executar_medido(nome, funcao, *args, **kwargs)
+        return funcao_medida
+    return decorador
+
+def dados_da_operacao(nome):
+    # Chamada com metricas["trava"] adquirida
+    dados = metricas["operacoes"].get(nome)
+    if dados is None:
+        dados = metricas["operacoes"][nome] = {"chamadas": 0, "segundos": 0.0, "arquivos": 0, "bytes": 0,
+                                               "amostras": deque(maxlen=AMOSTRAS_METRICAS)}
+    return dados
+
+def contar_gravacao(qtd_bytes, qtd_arquivos=1):
+    # Soma os bytes gravados no total e em cada operação medida aberta nesta thread
+    with metricas["trava"]:
+        metricas["arquivos"] += qtd_arquivos
+        metricas["bytes"] += qtd_bytes
+        for nome in set(getattr(operacoes_em_andamento, "pilha", ())):
+            dados = dados_da_operacao(nome)
+            dados["arquivos"] += qtd_arquivos
+            dados["bytes"] += qtd_bytes
+
+def percentil(ordenados, p):
+    return ordenados[max(0, math.ceil(p * len(ordenados)) - 1)] if ordenados else None
+
+def resumo_metricas():
+    with metricas["trava"]:
+        operacoes = {}
+        for nome, dados in sorted(metricas["operacoes"].items()):
+            amostras = sorted(dados["amostras"])
+            operacoes[nome] = {"chamadas": dados["chamadas"], "segundos_total": dados["segundos"],
+                               "p50": percentil(amostras, 0.50), "p99": percentil(amostras, 0.99),
+                               "arquivos_gravados": dados["arquivos"], "bytes_gravados": dados["bytes"]}
+        return {"ativas": metricas["ativas"], "operacoes": operacoes, "arquivos_gravados": metricas["arquivos"],
+                "bytes_gravados": metricas["bytes"], "cache": estatisticas_cache()}
+
+def formatar_prometheus(resumo):
+    # Formato texto do Prometheus: durações como "summary" (quantis 0.5 e 0.99, _sum e _count) e contadores
+    linhas = []
+    def metrica(nome, tipo, ajuda, valores):
+        linhas.append(f"# HELP {PREFIXO_PROMETHEUS}_{nome} {ajuda}")
+        linhas.append(f"# TYPE {PREFIXO_PROMETHEUS}_{nome} {tipo}")
+        for sufixo, rotulos, valor in valores:
+            texto_rotulos = ",".join(f'{chave}="{rotulo}"' for chave, rotulo in rotulos)
+            linhas.append(f"{PREFIXO_PROMETHEUS}_{nome}{sufixo}{{{texto_rotulos}}} {valor}" if rotulos
+                          else f"{PREFIXO_PROMETHEUS}_{nome}{sufixo} {valor}")
+
+    operacoes = resumo["operacoes"]
+    duracoes = []
+    for nome, dados in operacoes.items():
+        for quantil in ("p50", "p99"):
+            if dados[quantil] is not None:
+                duracoes.append(("", [("operacao", nome), ("quantile", QUANTIS_PROMETHEUS[quantil])], dados[quantil]))
+        duracoes.append(("_sum", [("operacao", nome)], dados["segundos_total"]))
+        duracoes.append(("_count", [("operacao", nome)], dados["chamadas"]))
+    metrica("operacao_segundos", "summary", "Duração das operações em segundos.", duracoes)
+    metrica("operacao_arquivos_gravados_total", "counter", "Arquivos gravados durante a operação.",
+            [("", [("operacao", nome)], dados["arquivos_gravados"]) for nome, dados in operacoes.items()])
+    metrica("operacao_bytes_gravados_total", "counter", "Bytes gravados durante a operação.",
+            [("", [("operacao", nome)], dados["bytes_gravados"]) for nome, dados in operacoes.items()])
+    metrica("arquivos_gravados_total", "counter", "Arquivos gravados desde o início.", [("", [], resumo["arquivos_gravados"])])
+    metrica("bytes_gravados_total", "counter", "Bytes gravados desde o início.", [("", [], resumo["bytes_gravados"])])
+    for cache, dados in resumo["cache"].items():
+        metrica(f"cache_{cache}_acertos_total", "counter", f"Consultas atendidas pelo cache de {cache}.", [("", [], dados["acertos"])])
+        metrica(f"cache_{cache}_falhas_total", "counter", f"Consultas fora do cache de {cache}.", [("", [], dados["falhas"])])
+    return "\n".join(linhas) + "\n"
+
+def exportar_metricas(arquivo=None):
+    # Grava o resumo no arquivo configurado (substituído de uma vez, para quem lê nunca ver um arquivo pela metade)
+    arquivo = arquivo or metricas["arquivo"]
+    if not arquivo or not metricas["ativas"]:
+        return
+    resumo = resumo_metricas()
+    conteudo = formatar_prometheus(resumo) if arquivo.endswith(".prom") else json.dumps(resumo, ensure_ascii=False, indent=2)
+    with open(caminho_temporario(arquivo), "w", encoding="utf-8") as f:
+        f.write(conteudo)
+        sincronizar_arquivo(f)
+    efetivar_arquivos([arquivo])  # Sem confirmar_arquivo: o próprio arquivo de métricas não conta como gravação medida
+
+# --------------------- FUNÇÕES DE CONTROLE DE ALTERAÇÕES --------------------- #
+def marcar_alteracao(ra=None, turma=None, materias=()):
+    invalidar_cache(ra, turma)                # O boletim do aluno e os blocos da turma precisam ser refeitos
+    if ra is not None:
+        alunos_alterados.add(ra)              # O registro do aluno no "alunos.txt" mudou
+    if turma is not None:
+        turmas_alteradas.add(turma.upper())   # O arquivo da turma precisa ser regravado
+        particoes_alteradas.add(turma.upper())  # No armazenamento particionado, só o arquivo dessa turma muda
+    materias_alteradas.update(materias)       # Arquivos das matérias informadas precisam ser regravados
+
+def precisa_gravar(caminho, alterado):
+    # Um arquivo é regravado se algo mudou ou se ele não existe mais no disco (ex: após limpar o banco)
+    return alterado or not os.path.exists(caminho)
+
+# --------------------- GRAVAÇÃO ATÔMICA --------------------- #
+# Nenhum arquivo de dados é sobrescrito diretamente: o conteúdo vai para "<arquivo>.tmp" e só depois de
+# garantido no disco o temporário é renomeado por cima do original (os.replace é atômico). Assim uma
+# queda no meio da gravação deixa o arquivo antigo inteiro, nunca um arquivo pela metade.
+# Dentro de um grupo de gravação, as renomeações ficam pendentes até o fim do grupo: cada temporário é
+# sincronizado ao ser fechado, todos são renomeados juntos e cada pasta recebe um único fsync no final.
+# Se o grupo terminar com erro, nenhum arquivo dele é efetivado (os temporários são descartados).
+SUFIXO_TEMPORARIO = ".tmp"
+grupo_gravacao = {"nivel": 0, "pendentes": [], "depois": [], "falhou": False}  # Grupos abertos, a efetivar, ações e erro
+
+def caminho_temporario(caminho):
+    return caminho + SUFIXO_TEMPORARIO
+
+@contextmanager
+def gravacao_atomica(caminho, modo="w"):
+    # Uso: "with gravacao_atomica(caminho) as f:" no lugar de "with open(caminho, "w") as f:"
+    temporario = caminho_temporario(caminho)
+    try:
+        with open(temporario, modo, **({} if "b" in modo else {"encoding": "utf-8"})) as f:
+            yield f
+            sincronizar_arquivo(f)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)  # Gravação interrompida por erro: o arquivo original continua intacto
+        raise
+    confirmar_arquivo(caminho)
+
+def confirmar_arquivo(caminho):
+    # O temporário de "caminho" já está completo e fechado: efetiva agora ou no fim do grupo atual
+    if metricas["ativas"]:
+        contar_gravacao(os.path.getsize(caminho_temporario(caminho)))  # Conta para a operação que gravou o arquivo
+    if grupo_gravacao["nivel"]:
+        grupo_gravacao["pendentes"].append(caminho)
+    else:
+        efetivar_arquivos([caminho])
+
+def sincronizar_arquivo(f):
+    # Garante no disco o conteúdo do temporário antes de fechá-lo (a renomeação vem depois)
+    f.flush()
+    os.fsync(f.fileno())
+
+def descartar_arquivos(caminhos):
+    for caminho in caminhos:
+        if os.path.exists(caminho_temporario(caminho)):
+            os.remove(caminho_temporario(caminho))
+
+def apos_efetivar(acao):
+    # Executa "acao" só depois que os arquivos pendentes estiverem no disco (ex: apagar o diário já incorporado)
+    if grupo_gravacao["nivel"]:
+        grupo_gravacao["depois"].append(acao)
+    else:
+        acao()
+
+def efetivar_arquivos(caminhos):
+    # Os temporários já foram sincronizados ao serem fechados (sincronizar_arquivo)
+    if not caminhos:
+        return
+    # Renomeia na mesma ordem em que os arquivos foram gravados (o binário continua mais novo que o texto)
+    for caminho in caminhos:
+        os.replace(caminho_temporario(caminho), caminho)
+    # Sincroniza as pastas para que as renomeações também sobrevivam a uma queda (não suportado no Windows)
+    if os.name != "nt":
+        for pasta in {os.path.dirname(caminho) or "." for caminho in caminhos}:
+            fd = os.open(pasta, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+@contextmanager
+def grupo_de_gravacao():
+    # Agrupa as gravações de uma operação; grupos aninhados são efetivados apenas pelo grupo mais externo.
+    # A pasta fica travada durante o grupo: dois processos nunca gravam o mesmo temporário ao mesmo tempo
+    with trava_da_pasta():
+        grupo_gravacao["nivel"] += 1
+        try:
+            yield
+        except BaseException:
+            grupo_gravacao["falhou"] = True  # Vale para o grupo inteiro, mesmo que o erro seja tratado mais acima
+            raise
+        finally:
+            grupo_gravacao["nivel"] -= 1
+            if grupo_gravacao["nivel"] == 0:
+                pendentes, grupo_gravacao["pendentes"] = grupo_gravacao["pendentes"], []
+                depois, grupo_gravacao["depois"] = grupo_gravacao["depois"], []
+                falhou, grupo_gravacao["falhou"] = grupo_gravacao["falhou"], False
+                if falhou:
+                    descartar_arquivos(pendentes)  # Tudo ou nada: os originais continuam valendo
+                else:
+                    efetivar_arquivos(pendentes)
+                    for acao in depois:
+                        acao()
+
+def descartar_temporarios():
+    # Temporários que sobraram no disco são de uma gravação interrompida: o original ainda é a versão válida
+    descartados = 0
+    pasta_particoes = os.path.join(PASTA_ARQUIVOS, PASTA_PARTICOES)
+    for pasta in (PASTA_ARQUIVOS, PASTA_TURMAS) + ((pasta_particoes,) if os.path.isdir(pasta_particoes) else ()):
+        for nome in os.listdir(pasta):
+            if nome.endswith(SUFIXO_TEMPORARIO):
+                os.remove(os.path.join(pasta, nome))
+                descartados += 1
+    if descartados:
+        # Na saída de erros: na linha de comando, a saída padrão é reservada para as respostas em JSON
+        print(f"⚠️ {descartados} arquivo(s) temporário(s) de uma gravação interrompida foram descartados.", file=sys.stderr)
+    return descartados
+
+# --------------------- TRAVA DA PASTA DE DADOS (VÁRIOS PROCESSOS) --------------------- #
+# Vários programas podem usar a mesma pasta: cada um guarda os dados na memória e, antes de alterar,
+# trava a pasta e lê do diário o que os outros gravaram desde a última leitura. A trava só é mantida
+# durante a gravação de uma operação, nunca enquanto o professor digita.
+class PastaOcupada(Exception):
+    # trava_da_pasta(esperar=False) encontrou a pasta travada por outro processo ou outra thread
+    pass
+
+def travar_arquivo(arquivo, esperar=True):
+    # Devolve False se "esperar" for False e outro processo estiver com a trava
+    if fcntl is not None:
+        try:
+            fcntl.flock(arquivo.fileno(), fcntl.LOCK_EX if esperar else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+    elif msvcrt is not None:
+        arquivo.seek(0)
+        while True:
+            try:
+                msvcrt.locking(arquivo.fileno(), msvcrt.LK_LOCK if esperar else msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if not esperar:
+                    return False
+                continue  # LK_LOCK desiste após 10 tentativas: continua esperando
+    return True
+
+def destravar_arquivo(arquivo):
+    if fcntl is not None:
+        fcntl.flock(arquivo.fileno(), fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        arquivo.seek(0)
+        msvcrt.locking(arquivo.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def trava_da_pasta(esperar=True):
+    # Trava exclusiva da pasta de dados; pode ser usada de forma aninhada dentro do mesmo processo.
+    # Com esperar=False, gera PastaOcupada em vez de esperar (ex: servidor HTTP, que não pode bloquear)
+    if not trava_pasta["threads"].acquire(blocking=esperar):
+        raise PastaOcupada()
+    try:
+        if trava_pasta["nivel"] == 0:
+            arquivo = open(os.path.join(PASTA_ARQUIVOS, ARQUIVO_TRAVA), "a+b")
+            if not travar_arquivo(arquivo, esperar):
+                arquivo.close()
+                raise PastaOcupada()
+            trava_pasta["arquivo"] = arquivo
+        trava_pasta["nivel"] += 1
+        try:
+            yield
+        finally:
+            trava_pasta["nivel"] -= 1
+            if trava_pasta["nivel"] == 0:
+                destravar_arquivo(trava_pasta["arquivo"])
+                trava_pasta["arquivo"].close()
+                trava_pasta["arquivo"] = None
+    finally:
+        trava_pasta["threads"].release()
+
+@contextmanager
+def alteracao_compartilhada():
+    # Trava a pasta e traz as alterações dos outros processos antes de alterar a memória, para que
+    # a ordem no diário seja a mesma ordem em que as alterações foram aplicadas
+    with trava_da_pasta():
+        obter_armazenamento().sincronizar()
+        yield
+
+def ler_versao():
+    try:
+        with open(os.path.join(PASTA_ARQUIVOS, ARQUIVO_VERSAO), "r", encoding="utf-8") as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def assinatura_arquivo(caminho):
+    # (inode, data de modificação, tamanho): muda a cada regravação atômica; comparar o stat é bem mais
+    # barato que ler o arquivo a cada consulta. None se o arquivo não existe
+    try:
+        info = os.stat(caminho)
+    except FileNotFoundError:
+        return None
+    return info.st_ino, info.st_mtime_ns, info.st_size
+
+def tamanho_do_diario():
+    try:
+        return os.path.getsize(os.path.join(PASTA_ARQUIVOS, ARQUIVO_DIARIO))
+    except OSError:
+        return 0
+
+def limpar_memoria():
+    # Esvazia todas as estruturas de dados na memória
+    alunos.clear()          # Dicionário de alunos
+    notas.limpar()          # Matriz de notas
+    fila_alunos.clear()     # Fila de alunos para ordem de cadastro
+    indice_turmas.clear()   # Índice de alunos por turma
+    acumulados_turmas.clear()    # Médias acumuladas por turma
+    acumulados_materias.clear()  # Médias acumuladas por matéria
+    ras_existentes.clear()  # Conjunto de RAs já existentes
+    indice_nomes.update(pronto=False, entradas=[], termos={})  # Índice de nomes da busca
+    cache_boletins.limpar()      # Boletins montados
+    cache_turmas.limpar()        # Blocos de relatório das turmas
+
+@medido("recarregar_dados")
+def recarregar_dados():
+    # Outro processo compactou o diário (ou limpou o banco): lê tudo de novo do armazenamento
+    limpar_memoria()
+    obter_armazenamento().carregar()
+    if not relatorios_automaticos_ativos():
+        # Relatórios sob demanda: o manifesto já diz quais ficaram desatualizados (cada processo marca os seus)
+        materias_alteradas.clear()
+        turmas_alteradas.clear()
+        return
+    materias_alteradas.update(obter_materias_validas())
+    turmas_alteradas.update(turmasfixas())
+    turmas_alteradas.update(indice_turmas)
+
+# --------------------- FUNÇÕES DO DIÁRIO DE ALTERAÇÕES --------------------- #
+@medido("escrever_diario")
+def escrever_registros_no_diario(registros):
+    # Acrescenta os registros no final do diário, ex: "NOTA|F1A2B3|Matematica|7.5", abrindo o diário uma única vez
+    # (custo proporcional ao tamanho da alteração, independente do total de alunos)
+    if not USAR_DIARIO or not registros:
+        return
+    with trava_da_pasta():
+        dados = "".join("|".join(campos) + "\n" for campos in registros).encode("utf-8")
+        with open(os.path.join(PASTA_ARQUIVOS, ARQUIVO_DIARIO), "a+b") as f:
+            cortar_linha_incompleta(f)
+            atualizado = f.tell() == estado_diario["posicao"]  # Nenhum outro processo escreveu depois da última leitura
+            f.write(dados)
+            if atualizado:
+                estado_diario["posicao"] = f.tell()  # Os próprios registros não precisam ser lidos de novo
+    if metricas["ativas"]:
+        contar_gravacao(len(dados))
+    estado_diario["registros"] += len(registros)
+
+def cortar_linha_incompleta(f):
+    # Com a pasta travada, uma última linha sem "\n" só pode ser de um processo interrompido no meio da escrita:
+    # é cortada antes de acrescentar, senão o próximo registro seria emendado nela (e lido errado).
+    # Termina com "f" posicionado no final do diário
+    tamanho = f.seek(0, os.SEEK_END)
+    if tamanho == 0:
+        return
+    f.seek(tamanho - 1)
+    if f.read(1) == b"\n":
+        return
+    fim = tamanho
+    while fim > 0:  # Procura a última quebra de linha, lendo de trás para frente
+        inicio = max(0, fim - 4096)
+        f.seek(inicio)
+        quebra = f.read(fim - inicio).rfind(b"\n")
+        if quebra >= 0:
+            fim = inicio + quebra + 1
+            break
+        fim = inicio
+    f.truncate(fim)
+    f.seek(fim)
+
+def reproduzir_diario(posicao=0):
+    # Reaplica sobre os dados já carregados as alterações feitas depois da última compactação,
+    # a partir do byte "posicao" (as anteriores já foram aplicadas por este processo)
+    if posicao == 0:
+        estado_diario["registros"] = 0
+    try:
+        with open(os.path.join(PASTA_ARQUIVOS, ARQUIVO_DIARIO), "rb") as f:
+            f.seek(posicao)
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break  # Última linha incompleta (programa interrompido no meio da escrita): é descartada
+                posicao += len(linha)
+                campos = linha.decode("utf-8", "replace").rstrip("\n").split("|")
+                try:
+                    if campos[0] == "ALUNO":
+                        adicionar_aluno(campos[1], campos[2], campos[3], persistir=False)
+                    elif campos[0] == "NOTA" and campos[1] in alunos:
+                        media = None if campos[3] == "N/A" else float(campos[3])
+                        definir_nota(campos[1], campos[2], media, persistir=False)
+                    elif campos[0] == "REMOVER" and campos[1] in alunos:
+                        excluir_aluno(campos[1], persistir=False)
+                except (IndexError, ValueError):
+                    continue  # Registro corrompido: ignora e segue com os próximos
+                estado_diario["registros"] += 1
+    except FileNotFoundError:
+        pass  # Ainda não há diário (nenhuma alteração desde a última compactação)
+    estado_diario["posicao"] = posicao
+
+@medido("compactar_diario")
+def compactar_diario(arquivo_alunos):
+    # Incorpora o diário ao "alunos.txt" (regravando-o por completo) e esvazia o diário
+    # (chamada com a pasta travada, para que nenhum outro processo escreva no diário enquanto isso)
+    salvar_instantaneo(arquivo_alunos)
+    alunos_alterados.clear()
+    caminho_diario = os.path.join(PASTA_ARQUIVOS, ARQUIVO_DIARIO)
+
+    # Registros que outros processos gravaram e este ainda não leu continuam no diário novo
+    try:
+        with open(caminho_diario, "rb") as f:
+            f.seek(estado_diario["posicao"])
+            restante = f.read()
+    except FileNotFoundError:
+        restante = b""
+    if restante:
+        with gravacao_atomica(caminho_diario, "wb") as f:
+            f.write(restante)
+    else:
+        def apagar_diario():
+            if os.path.exists(caminho_diario):
+                os.remove(caminho_diario)
+        # O diário só pode ser apagado depois que o novo "alunos.txt" estiver efetivado no disco
+        apos_efetivar(apagar_diario)
+
+    # A nova versão avisa os outros processos que o diário recomeçou e precisam recarregar o instantâneo
+    versao = ler_versao() + 1
+    with gravacao_atomica(os.path.join(PASTA_ARQUIVOS, ARQUIVO_VERSAO)) as f:
+        f.write(str(versao))
+    estado_diario.update(registros=0, posicao=0, versao=versao)
+
+# --------------------- ÍNDICE DE ALUNOS POR TURMA --------------------- #
+def indexar_aluno(ra):
+    info = alunos[ra]
+    # insort insere na posição correta da lista ordenada, sem precisar reordenar a turma inteira
+    insort(indice_turmas.setdefault(info["turma"].upper(), []), (info["nome"], ra))
+    if indice_nomes["pronto"]:
+        indexar_nome(ra)
+
+def desindexar_aluno(ra):
+    info = alunos[ra]
+    turma = info["turma"].upper()
+    lista = indice_turmas.get(turma, [])
+    # Busca binária pela posição do aluno na lista ordenada da turma
+    pos = bisect_left(lista, (info["nome"], ra))
+    if pos < len(lista) and lista[pos] == (info["nome"], ra):
+        del lista[pos]
+    if not lista:
+        indice_turmas.pop(turma, None)  # Turma sem alunos deixa de aparecer nas listagens
+    if indice_nomes["pronto"]:
+        desindexar_nome(ra)
+
+def reconstruir_indice_turmas():
+    # Usado após carregar os arquivos, quando os alunos foram incluídos diretamente no dicionário
+    indice_turmas.clear()
+    for ra, info in alunos.items():
+        indice_turmas.setdefault(info["turma"].upper(), []).append((info["nome"], ra))
+    for lista in indice_turmas.values():
+        lista.sort()
+    indice_nomes["pronto"] = False  # O índice de nomes é remontado na próxima busca
+
+def alunos_da_turma(turma):
+    # RAs da turma já em ordem alfabética de nome, sem percorrer os alunos das outras turmas
+    return [ra for _, ra in indice_turmas.get(turma.upper(), [])]
+
+def turmas_com_alunos():
+    # Turmas que possuem pelo menos um aluno, em ordem alfabética
+    return sorted(indice_turmas)
+
+# --------------------- ÍNDICE DE NOMES (BUSCA SEM ACENTOS POR INÍCIO DE NOME) --------------------- #
+def nome_para_busca(nome):
+    # "Ana Júlia Silva" -> " ana julia silva": o espaço na frente permite testar o início de cada parte com " sil" in
+    return " " + " ".join(normalizar_texto(nome).split())
+
+def indexar_nome(ra):
+    nome = alunos[ra]["nome"]
+    termos = indice_nomes["termos"][ra] = nome_para_busca(nome)
+    for termo in set(termos.split()):
+        insort(indice_nomes["entradas"], (termo, nome, ra))
+
+def desindexar_nome(ra):
+    nome = alunos[ra]["nome"]
+    entradas = indice_nomes["entradas"]
+    for termo in set(indice_nomes["termos"].pop(ra, "").split()):
+        pos = bisect_left(entradas, (termo, nome, ra))
+        if pos < len(entradas) and entradas[pos] == (termo, nome, ra):
+            del entradas[pos]
+
+def montar_indice_nomes():
+    # Montagem única para todos os alunos (uma ordenação só, em vez de um insort por parte de nome)
+    termos = {ra: nome_para_busca(info["nome"]) for ra, info in alunos.items()}
+    entradas = [(termo, alunos[ra]["nome"], ra) for ra, termos_ra in termos.items() for termo in set(termos_ra.split())]
+    entradas.sort()
+    indice_nomes.update(pronto=True, entradas=entradas, termos=termos)
+
+def buscar_por_nome(texto, limite=20):
+    # RAs dos alunos cujo nome tem uma parte começando com cada palavra digitada, sem diferenciar acentos
+    # e maiúsculas ("ana sil" encontra "Ana Silva" e "Ana Júlia Silveira"), em ordem alfabética da parte buscada
+    if not indice_nomes["pronto"]:
+        montar_indice_nomes()
+    buscados = normalizar_texto(texto).split()
+    if not buscados:
+        return []
+    entradas = indice_nomes["entradas"]
+    # Faixa da lista ordenada em que cada palavra é início de uma parte do nome (duas buscas binárias cada)
+    faixas = {termo: (bisect_left(entradas, (termo,)), bisect_left(entradas, (termo + "\U0010ffff",)))
+              for termo in buscados}
+    mais_rara = min(faixas, key=lambda termo: faixas[termo][1] - faixas[termo][0])  # Percorre só a menor faixa
+    inicio, fim = faixas[mais_rara]
+    outras = [" " + termo for termo in faixas if termo != mais_rara]  # " sil" in " ana silva": parte começa com "sil"
+    termos = indice_nomes["termos"]
+    encontrados = []
+    for _, _, ra in entradas[inicio:fim]:
+        nome = termos[ra]
+        for parte in outras:
+            if parte not in nome:
+                break
+        else:
+            if ra not in encontrados:  # "Ana Anabela" aparece duas vezes na faixa de "ana"
+                encontrados.append(ra)
+                if len(encontrados) == limite:
+                    break
+    return encontrados
+
+# --------------------- OPERAÇÕES SOBRE OS DADOS --------------------- #
+# Toda alteração em alunos/notas passa por aqui, para que o controle de alterações e o armazenamento fiquem sempre corretos
+def adicionar_aluno(ra, nome, turma, persistir=True):
+    if ra in alunos:
+        desindexar_aluno(ra)                     # RA já existente (ao reaplicar o diário): sai da posição antiga
+        retirar_dos_acumulados(ra)               # e deixa de contar na média da turma antiga
+        marcar_alteracao(turma=alunos[ra]["turma"])  # A turma antiga também muda
+    alunos[ra] = {"nome": nome, "turma": turma}  # Adiciona o aluno ao dicionário principal
+    indexar_aluno(ra)                            # Inclui o aluno na lista ordenada da sua turma
+    incluir_nos_acumulados(ra)                   # Só tem efeito se o RA já tiver notas
+    if ra not in ras_existentes:                 # Evita duplicar o RA na fila ao reaplicar o diário
+        fila_alunos[ra] = None                   # Coloca o RA no fim da fila
+        ras_existentes.add(ra)                   # Adiciona o RA ao conjunto de RAs já cadastrados
+    # Um aluno novo aparece no arquivo principal, na sua turma e em todos os arquivos de matéria
+    marcar_alteracao(ra, turma, obter_materias_validas())
+    if persistir:
+        registrar_alteracoes([("ALUNO", ra, nome, turma)])
+
+def definir_nota(ra, materia, media, persistir=True):
+    retirar_dos_acumulados(ra)         # Retira a contribuição antiga do aluno das médias da turma e da matéria
+    notas.definir(ra, materia, media)  # Cria a linha de notas do aluno se não existir e salva a nota
+    incluir_nos_acumulados(ra)         # Soma a contribuição nova
+    # Uma nota altera apenas o aluno, a turma dele e o arquivo daquela matéria
+    marcar_alteracao(ra, alunos[ra]["turma"], [materia])
+    if persistir:
+        registrar_alteracoes([("NOTA", ra, materia, "N/A" if media is None else repr(media))])
+
+def excluir_aluno(ra, persistir=True):
+    desindexar_aluno(ra)   # Retira o aluno da lista da sua turma
+    retirar_dos_acumulados(ra)  # Retira as notas do aluno das médias da turma e das matérias
+    info = alunos.pop(ra)  # Remove o aluno e guarda seus dados para marcar a turma
+    notas.remover(ra)
+    fila_alunos.pop(ra, None)  # Remoção direta pela chave, sem percorrer a fila
+    if ra in ras_existentes:
+        ras_existentes.remove(ra)
+    marcar_alteracao(ra, info["turma"], obter_materias_validas())
+    if persistir:
+        registrar_alteracoes([("REMOVER", ra)])
+
+# --------------------- ARMAZENAMENTO DOS DADOS --------------------- #
+# Cada armazenamento sabe carregar os dados para a memória e gravar as alterações descritas como registros
+# ("ALUNO", RA, nome, turma), ("NOTA", RA, matéria, nota ou "N/A") e ("REMOVER", RA).
+class ArmazenamentoTexto:
+    # "alunos.txt" + diário de alterações + instantâneo binário (formato original do sistema)
+    relatorios_automaticos = True  # Arquivos de matéria e de turma são regravados a cada salvamento
+
+    def carregar(self):
+        arquivo_alunos = os.path.join(PASTA_ARQUIVOS, "alunos.txt")
+        estado_diario["versao"] = ler_versao()
+        # Usa o instantâneo binário quando ele existe e está atualizado; senão, lê o "alunos.txt"
+        if not carregar_arquivo_binario(os.path.join(PASTA_ARQUIVOS, ARQUIVO_BINARIO), arquivo_alunos):
+            carregar_arquivo_texto(arquivo_alunos)
+        reconstruir_indice_turmas()  # Monta o índice por turma uma única vez para todos os alunos lidos
+        reconstruir_acumulados()     # Soma as médias de turmas e matérias uma única vez
+
+        # Reaplica as alterações registradas no diário depois da última compactação
+        reproduzir_diario()
+
+    def registrar(self, registros):
+        escrever_registros_no_diario(registros)  # Só acrescenta ao diário; o "alunos.txt" é regravado na compactação
+
+    def ha_alteracoes_externas(self):
+        # Outro processo compactou (versão nova) ou acrescentou registros ao diário depois da última leitura
+        return ler_versao() != estado_diario["versao"] or tamanho_do_diario() != estado_diario["posicao"]
+
+    def sincronizar(self):
+        if ler_versao() != estado_diario["versao"]:
+            recarregar_dados()  # Diário recomeçou: lê o instantâneo novo
+        elif tamanho_do_diario() != estado_diario["posicao"]:
+            reproduzir_diario(estado_diario["posicao"])  # Aplica só os registros novos, na ordem do diário
+
+    def salvar(self, compactar):
+        arquivo_alunos = os.path.join(PASTA_ARQUIVOS, "alunos.txt")
+        # Com o diário ativo, as alterações já estão gravadas nele: o "alunos.txt" só é regravado na compactação,
+        # que acontece quando o diário atinge LIMITE_DIARIO registros ou quando solicitada (ex: ao sair do sistema)
+        if USAR_DIARIO:
+            if precisa_gravar(arquivo_alunos, compactar or estado_diario["registros"] >= LIMITE_DIARIO):
+                compactar_diario(arquivo_alunos)
+        # Sem o diário, só regrava o arquivo principal se algum aluno foi cadastrado, removido ou teve notas alteradas
+        elif precisa_gravar(arquivo_alunos, alunos_alterados):
+            salvar_instantaneo(arquivo_alunos)
+            alunos_alterados.clear()
+
+    def consultar_aluno(self, ra):
+        # Consulta pontual sem carregar os dados: último instantâneo (pelo índice) + registros do diário do aluno
+        if not os.path.isdir(PASTA_ARQUIVOS):
+            return None
+        with trava_da_pasta():  # Texto, índice e diário lidos sem nenhuma compactação no meio
+            aluno = ler_aluno_pelo_indice(ra)
+            if aluno is None:
+                return None
+            return aplicar_diario_ao_aluno(ra, aluno)
+
+    def fechar(self):
+        pass  # Nenhum arquivo fica aberto entre as operações
+
+class ArmazenamentoSQLite:
+    # Banco SQLite local: cada cadastro, nota ou remoção é uma operação de uma linha, confirmada na hora.
+    # Os arquivos .txt deixam de ser regravados a cada alteração e passam a ser exportados sob demanda.
+    relatorios_automaticos = False
+
+    # Comandos parametrizados: o sqlite3 guarda cada um já preparado e só troca os valores
+    SQL_ALUNO = ("INSERT INTO alunos (ra, nome, turma) VALUES (?, ?, ?) "
+                 "ON CONFLICT(ra) DO UPDATE SET nome = excluded.nome, turma = excluded.turma")
+    SQL_NOTA = ("INSERT INTO notas (ra, materia, media) VALUES (?, ?, ?) "
+                "ON CONFLICT(ra, materia) DO UPDATE SET media = excluded.media")
+    SQL_APAGAR_NOTA = "DELETE FROM notas WHERE ra = ? AND materia = ?"
+    SQL_REMOVER_NOTAS = "DELETE FROM notas WHERE ra = ?"
+    SQL_REMOVER_ALUNO = "DELETE FROM alunos WHERE ra = ?"
+    # PRAGMA user_version: 0 = dados do texto ainda não importados; 1 = importação feita (mesmo que depois
+    # todos os alunos sejam removidos, o banco vazio continua valendo e o texto não é importado de novo)
+    VERSAO_MIGRADO = 1
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.conexao = None  # Aberta só no primeiro uso
+        self.versao_dados = None  # PRAGMA data_version da última leitura (muda quando outra conexão grava)
+
+    def conectar(self):
+        if self.conexao is None:
+            self.conexao = sqlite3.connect(self.caminho)
+            self.conexao.execute("PRAGMA journal_mode=WAL")  # Leituras não bloqueiam as gravações
+            with self.conexao:
+                # "id" preserva a ordem de cadastro; RA único, turma e matéria ficam indexados
+                self.conexao.execute("CREATE TABLE IF NOT EXISTS alunos ("
+                                     "id INTEGER PRIMARY KEY AUTOINCREMENT, ra TEXT NOT NULL UNIQUE, "
+                                     "nome TEXT NOT NULL, turma TEXT NOT NULL)")
+                self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_alunos_turma ON alunos (turma, nome)")
+                self.conexao.execute("CREATE TABLE IF NOT EXISTS notas ("
+                                     "ra TEXT NOT NULL, materia TEXT NOT NULL, media REAL NOT NULL, "
+                                     "PRIMARY KEY (ra, materia))")
+                self.conexao.execute("CREATE INDEX IF NOT EXISTS idx_notas_materia ON notas (materia)")
+            if not self.migrado() and self.conexao.execute("SELECT 1 FROM alunos LIMIT 1").fetchone():
+                self.marcar_migrado()  # Banco criado antes da marcação, já com alunos: a importação foi feita
+        return self.conexao
+
+    def migrado(self):
+        return self.conexao.execute("PRAGMA user_version").fetchone()[0] >= self.VERSAO_MIGRADO
+
+    def marcar_migrado(self):
+        self.conexao.execute(f"PRAGMA user_version = {self.VERSAO_MIGRADO}")
+
+    def carregar(self):
+        conexao = self.conectar()
+        self.versao_dados = conexao.execute("PRAGMA data_version").fetchone()[0]
+        if not self.migrado():
+            # Banco novo: importa uma única vez os dados que estiverem no formato de texto
+            # (se a importação for interrompida, a próxima repete as mesmas inserções, sem duplicar)
+            ArmazenamentoTexto().carregar()
+            self.registrar([("ALUNO", ra, alunos[ra]["nome"], alunos[ra]["turma"]) for ra in fila_alunos] +
+                           [("NOTA", ra, materia, repr(media)) for ra in fila_alunos
+                            for materia, media in notas.notas_do_aluno(ra).items() if media is not None])
+            self.marcar_migrado()
+            return
+
+        for ra, nome, turma in conexao.execute("SELECT ra, nome, turma FROM alunos ORDER BY id"):
+            alunos[ra] = {"nome": nome, "turma": turma}
+            fila_alunos[ra] = None
+            ras_existentes.add(ra)
+            notas.criar_linha(ra)
+        for ra, materia, media in conexao.execute("SELECT ra, materia, media FROM notas"):
+            if ra in alunos and materia in notas.coluna:
+                notas.definir(ra, materia, media)
+        reconstruir_indice_turmas()
+        reconstruir_acumulados()
+
+    def registrar(self, registros):
+        if not registros:
+            return
+        conexao = self.conectar()
+        with conexao:  # Uma transação por operação (um lote inteiro também é uma única transação)
+            for registro in registros:
+                if registro[0] == "ALUNO":
+                    conexao.execute(self.SQL_ALUNO, registro[1:4])
+                elif registro[0] == "NOTA":
+                    ra, materia, media = registro[1:4]
+                    if media == "N/A":
+                        conexao.execute(self.SQL_APAGAR_NOTA, (ra, materia))
+                    else:
+                        conexao.execute(self.SQL_NOTA, (ra, materia, float(media)))
+                elif registro[0] == "REMOVER":
+                    conexao.execute(self.SQL_REMOVER_NOTAS, (registro[1],))
+                    conexao.execute(self.SQL_REMOVER_ALUNO, (registro[1],))
+
+    def salvar(self, compactar):
+        alunos_alterados.clear()  # Tudo já foi confirmado no banco em registrar()
+
+    def ha_alteracoes_externas(self):
+        return self.conectar().execute("PRAGMA data_version").fetchone()[0] != self.versao_dados
+
+    def sincronizar(self):
+        if self.ha_alteracoes_externas():
+            recarregar_dados()  # Outra conexão gravou no banco: relê alunos e notas
+
+    def buscar_aluno(self, ra):
+        # Consulta pontual pelo índice do RA: (nome, turma) ou None
+        return self.conectar().execute("SELECT nome, turma FROM alunos WHERE ra = ?", (ra,)).fetchone()
+
+    def buscar_notas(self, ra):
+        # Notas de um aluno pela chave primária (RA, matéria); matérias sem nota ficam de fora
+        return dict(self.conectar().execute("SELECT materia, media FROM notas WHERE ra = ?", (ra,)))
+
+    def consultar_aluno(self, ra):
+        # Consulta pontual sem carregar os dados: {"nome", "turma", "notas"}, False se o RA não existe
+        # ou None quando o banco ainda não foi criado/migrado (os dados podem estar só no texto)
+        if not os.path.exists(self.caminho):
+            return None
+        self.conectar()
+        if not self.migrado():
+            return None
+        aluno = self.buscar_aluno(ra)
+        if aluno is None:
+            return False
+        notas_banco = self.buscar_notas(ra)
+        return {"nome": aluno[0], "turma": aluno[1], "notas": {m: notas_banco.get(m) for m in notas.materias}}
+
+    def buscar_turma(self, turma):
+        # RAs da turma em ordem alfabética de nome, usando o índice (turma, nome)
+        return [ra for (ra,) in self.conectar().execute(
+            "SELECT ra FROM alunos WHERE turma = ? ORDER BY nome", (turma,))]
+
+    def fechar(self):
+        if self.conexao is not None:
+            self.conexao.close()
+            self.conexao = None
+
+class ArmazenamentoParticionado:
+    # Um arquivo por turma em "particoes/" (mesmo texto do bloco da turma no "alunos.txt") e um manifesto com a
+    # versão de cada arquivo. Cada operação regrava só os arquivos das turmas que alterou (custo proporcional ao
+    # tamanho da turma, não da escola) e, com vários processos, só as turmas com versão nova no manifesto
+    # são lidas de novo.
+    relatorios_automaticos = True  # Arquivos de matéria e de turma são regravados a cada salvamento
+
+    def __init__(self):
+        self.manifesto = {"formato": VERSAO_MANIFESTO, "versao": 0, "turmas": {}}  # Última versão lida ou gravada
+        self.assinatura = None  # (inode, data de modificação, tamanho) do manifesto lido ou gravado
+
+    def pasta(self):
+        return os.path.join(PASTA_ARQUIVOS, PASTA_PARTICOES)
+
+    def caminho_manifesto(self):
+        return os.path.join(self.pasta(), ARQUIVO_MANIFESTO)
+
+    def assinatura_manifesto(self):
+        return assinatura_arquivo(self.caminho_manifesto())
+
+    def ler_manifesto(self):
+        # Manifesto do disco, ou None se ainda não existe (ou é de outro formato)
+        try:
+            with open(self.caminho_manifesto(), "r", encoding="utf-8") as f:
+                manifesto = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return manifesto if manifesto.get("formato") == VERSAO_MANIFESTO else None
+
+    def carregar(self):
+        assinatura = self.assinatura_manifesto()
+        manifesto = self.ler_manifesto()
+        if manifesto is None:
+            # Pasta sem partições: importa uma única vez os dados que estiverem no formato de texto
+            self.fechar()
+            ArmazenamentoTexto().carregar()
+            with grupo_de_gravacao():
+                self.gravar_particoes(set(indice_turmas))
+            return
+
+        # As turmas são lidas uma após a outra: a leitura é limitada pela CPU (montar os alunos), então
+        # threads disputariam o GIL e processos gastariam mais copiando os alunos lidos do que lendo
+        for turma in sorted(manifesto["turmas"]):
+            for nome, ra, turma_aluno, linha_notas in ler_particao(
+                    os.path.join(self.pasta(), manifesto["turmas"][turma]["arquivo"])):
+                alunos[ra] = {"nome": nome, "turma": turma_aluno}
+                if ra not in ras_existentes:
+                    fila_alunos[ra] = None
+                    ras_existentes.add(ra)
+                if linha_notas is not None:
+                    notas.definir_linha(ra, linha_notas)  # Já vem na ordem das colunas (NaN continua sendo N/A)
+        reconstruir_indice_turmas()
+        reconstruir_acumulados()
+        self.manifesto, self.assinatura = manifesto, assinatura
+        particoes_alteradas.clear()  # O que acabou de ser lido já está gravado
+
+    def registrar(self, registros):
+        # A memória já contém as alterações: regrava os arquivos das turmas afetadas e o manifesto
+        if registros or particoes_alteradas:
+            with grupo_de_gravacao():
+                self.gravar_particoes(particoes_alteradas)
+
+    def gravar_particoes(self, turmas):
+        if not turmas:
+            return
+        os.makedirs(self.pasta(), exist_ok=True)
+        manifesto = {"formato": VERSAO_MANIFESTO, "versao": self.manifesto["versao"] + 1,
+                     "turmas": dict(self.manifesto["turmas"])}
+        for turma in sorted(turmas):
+            caminho = os.path.join(self.pasta(), f"{turma}.txt")
+            if turma in indice_turmas:
+                # Mesmo bloco do "alunos.txt", reaproveitado do cache quando a turma não mudou desde a última montagem
+                secao = cache_turmas.obter(("secao", turma))
+                if secao is None:
+                    secao = renderizar_secao_turma(turma)
+                    cache_turmas.guardar(("secao", turma), secao)
+                with gravacao_atomica(caminho, "wb") as f:
+                    f.write(secao[0])
+                manifesto["turmas"][turma] = {"arquivo": f"{turma}.txt", "alunos": len(indice_turmas[turma]),
+                                              "versao": manifesto["versao"]}
+            elif manifesto["turmas"].pop(turma, None) is not None:
+                def apagar_particao(caminho=caminho):
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                # Turma ficou sem alunos: o arquivo só é apagado depois que o manifesto novo estiver no disco
+                apos_efetivar(apagar_particao)
+        # O manifesto é o último arquivo do grupo: quem o lê já encontra os arquivos de turma novos
+        with gravacao_atomica(self.caminho_manifesto()) as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=1)
+        self.manifesto = manifesto
+        particoes_alteradas.difference_update(turmas)
+
+        def guardar_assinatura():
+            self.assinatura = self.assinatura_manifesto()  # A própria gravação não conta como alteração externa
+        apos_efetivar(guardar_assinatura)
+
+    def ha_alteracoes_externas(self):
+        return self.assinatura_manifesto() != self.assinatura
+
+    def sincronizar(self):
+        assinatura = self.assinatura_manifesto()
+        if assinatura == self.assinatura:
+            return
+        manifesto = self.ler_manifesto()
+        if manifesto is None:
+            recarregar_dados()  # Manifesto apagado ou substituído (ex: banco limpo por outro processo)
+            return
+        # Só as turmas com versão diferente são lidas de novo; as demais continuam na memória
+        turmas = set(manifesto["turmas"]) | set(self.manifesto["turmas"])
+        alteradas = {turma for turma in turmas
+                     if manifesto["turmas"].get(turma, {}).get("versao") != self.manifesto["turmas"].get(turma, {}).get("versao")}
+        for turma in alteradas:
+            for ra in alunos_da_turma(turma):
+                excluir_aluno(ra, persistir=False)
+        for turma in sorted(alteradas & set(manifesto["turmas"])):
+            for nome, ra, turma_aluno, linha_notas in ler_particao(
+                    os.path.join(self.pasta(), manifesto["turmas"][turma]["arquivo"])):
+                adicionar_aluno(ra, nome, turma_aluno, persistir=False)
+                for materia, media in zip(notas.materias, linha_notas or ()):
+                    definir_nota(ra, materia, media if media == media else None, persistir=False)
+        particoes_alteradas.difference_update(alteradas)  # Já estão gravadas pelo outro processo
+        self.manifesto, self.assinatura = manifesto, assinatura
+
+    def salvar(self, compactar):
+        alunos_alterados.clear()  # As turmas alteradas já foram gravadas em registrar()
+        self.gravar_particoes(particoes_alteradas)  # Nada pendente, a não ser em alterações feitas sem registro
+
+    def consultar_aluno(self, ra):
+        # Consulta pontual sem carregar os dados: procura "| RA: <ra> |" em cada arquivo de turma (sem montar
+        # nenhum aluno) e lê só as linhas encontradas. None = ainda não há partições nesta pasta
+        if not os.path.isdir(self.pasta()):
+            return None
+        with trava_da_pasta():
+            manifesto = self.ler_manifesto()
+            if manifesto is None:
+                return None
+            marcador = f"| RA: {ra} |".encode("utf-8")
+            for dados in manifesto["turmas"].values():
+                try:
+                    with open(os.path.join(self.pasta(), dados["arquivo"]), "rb") as f:
+                        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as texto:
+                            posicao = texto.find(marcador)
+                            if posicao < 0:
+                                continue
+                            inicio = texto.rfind(b"\n", 0, posicao) + 1
+                            fim = texto.find(b"\n", texto.find(b"\n", posicao) + 1)
+                            linhas = texto[inicio:fim if fim >= 0 else len(texto)].decode("utf-8").splitlines()
+                except (OSError, ValueError):
+                    return None  # Arquivo ausente ou vazio: a consulta carrega tudo
+                nome, _, turma = ler_linha_aluno(linhas[0].strip())
+                notas_aluno = {}
+                if len(linhas) > 1 and ":" in linhas[1] and not linhas[1].strip().startswith("Média geral"):
+                    notas_aluno = dict.fromkeys(notas.materias)
+                    for materia, media in ler_linha_notas(linhas[1].strip()):
+                        if materia in notas_aluno:
+                            notas_aluno[materia] = media
+                return {"nome": nome, "turma": turma, "notas": notas_aluno}
+        return False
+
+    def fechar(self):
+        # Esquece o manifesto lido (ex: banco limpo): a próxima gravação começa um manifesto novo
+        self.manifesto = {"formato": VERSAO_MANIFESTO, "versao": 0, "turmas": {}}
+        self.assinatura = None
+
+def ler_particao(caminho):
+    # Lê o arquivo de uma turma: lista de [nome, RA, turma, notas], com as notas já na ordem das colunas da matriz
+    # (NaN = N/A) ou None se o aluno não tem linha de notas
+    coluna = {materia: i for i, materia in enumerate(obter_materias_validas())}
+    lidos = []
+    with open(caminho, "r", encoding="utf-8") as f:
+        for linha in f:
+            linha = linha.strip()
+            if linha.startswith("Aluno:"):
+                lidos.append([*ler_linha_aluno(linha), None])
+            elif ":" in linha and lidos and lidos[-1][3] is None and not linha.startswith("Média geral"):
+                linha_notas = lidos[-1][3] = [float("nan")] * len(coluna)
+                for materia, media in ler_linha_notas(linha):
+                    if materia in coluna and media is not None:
+                        linha_notas[coluna[materia]] = media
+    return lidos
+
+def obter_armazenamento():
+    # Cria o armazenamento configurado em BACKEND_ARMAZENAMENTO no primeiro uso
+    if estado_armazenamento["backend"] is None:
+        if BACKEND_ARMAZENAMENTO == "sqlite":
+            estado_armazenamento["backend"] = ArmazenamentoSQLite(os.path.join(PASTA_ARQUIVOS, ARQUIVO_SQLITE))
+        elif BACKEND_ARMAZENAMENTO == "particionado":
+            estado_armazenamento["backend"] = ArmazenamentoParticionado()
+        else:
+            estado_armazenamento["backend"] = ArmazenamentoTexto()
+    return estado_armazenamento["backend"]
+
+# --------------------- LOTE DE ALTERAÇÕES --------------------- #
+# Dentro de um lote, os registros são guardados e enviados ao armazenamento de uma só vez no final,
+# e os arquivos de alunos, matérias e turmas são salvos uma única vez (em vez de uma vez por operação).
+# Um lote é tudo ou nada: se uma exceção escapa de qualquer nível, nada vai para o armazenamento e a memória
+# volta ao que está no disco.
+lote_alteracoes = {"nivel": 0, "registros": [], "compactar": False, "falhou": False}
+
+@contextmanager
+def lote_de_alteracoes():
+    # A pasta fica travada durante o lote inteiro, pois os registros só vão para o diário no final
+    with alteracao_compartilhada():
+        lote_alteracoes["nivel"] += 1
+        try:
+            yield
+        except BaseException:
+            lote_alteracoes["nivel"] -= 1
+            lote_alteracoes["falhou"] = True  # Vale para o lote inteiro, mesmo que um nível de fora trate a exceção
+            if lote_alteracoes["nivel"] == 0:
+                descartar_lote()
+            raise
+        lote_alteracoes["nivel"] -= 1
+        if lote_alteracoes["nivel"] == 0:
+            registros, lote_alteracoes["registros"] = lote_alteracoes["registros"], []
+            compactar, lote_alteracoes["compactar"] = lote_alteracoes["compactar"], False
+            if lote_alteracoes["falhou"]:
+                # Um lote interno falhou e a exceção foi tratada aqui fora: o lote inteiro é descartado
+                descartar_lote()
+                raise RuntimeError("lote descartado: uma operação dentro do lote falhou")
+            obter_armazenamento().registrar(registros)
+            salvar_alteracoes(compactar)
+
+def descartar_lote():
+    # Nada do lote chegou ao diário/banco: joga fora os registros guardados e relê os dados do disco,
+    # desfazendo na memória as operações já aplicadas
+    lote_alteracoes.update(registros=[], compactar=False, falhou=False)
+    recarregar_dados()
+
+def registrar_alteracoes(registros):
+    if lote_alteracoes["nivel"]:
+        lote_alteracoes["registros"].extend(registros)  # Enviados juntos no fim do lote
+    else:
+        obter_armazenamento().registrar(registros)
+
 # --------------------- FUNÇÃO PARA CARREGAR DADOS --------------------- #
+@medido("carregar_dados")
 def carregar_dados():
-    # Monta o caminho completo do arquivo "alunos.txt" que está dentro da pasta definida em PASTA_ARQUIVOS
-    arquivo_alunos = os.path.join(PASTA_ARQUIVOS, "alunos.txt")
+    preparar_pastas()  # Cria as pastas de dados na primeira execução
+
+    with trava_da_pasta():
+        # Remove restos de uma gravação interrompida antes de ler qualquer arquivo
+        # (com a pasta travada, nenhum outro processo está no meio de uma gravação)
+        descartar_temporarios()
+
+        # Lê os alunos e notas do armazenamento configurado (texto ou SQLite)
+        obter_armazenamento().carregar()
+    estado_carregamento["carregado"] = True
+
+    if not relatorios_automaticos_ativos():
+        # Relatórios sob demanda: as marcas deixadas ao reaplicar o diário já constam no manifesto de relatórios,
+        # que decide o que precisa ser gerado de novo (os relatórios atualizados são reaproveitados)
+        materias_alteradas.clear()
+        turmas_alteradas.clear()
+        return
+
+    # Após carregar todos os alunos e suas notas, atualiza os arquivos de turmas
+    # (todas as turmas são marcadas, pois os arquivos podem ter sido editados fora do sistema)
+    turmas_alteradas.update(turmasfixas())
+    turmas_alteradas.update(indice_turmas)
+    salvar_turmas()
+
+# --------------------- LEITURA E GRAVAÇÃO DO INSTANTÂNEO BINÁRIO --------------------- #
+# Formato (little-endian), com as colunas gravadas em blocos para serem lidas de uma só vez:
+#   "PIMB" | versão (H) | qtd. turmas (H) | qtd. matérias (H) | qtd. alunos (I)
+#   tabela de turmas e de matérias (cada texto: tamanho (H) + UTF-8)
+#   RAs (TAMANHO_RA bytes cada) | id da turma de cada aluno (H) | tamanho do nome (H) | nomes em UTF-8
+#   notas (d), uma linha por aluno e uma coluna por matéria, com NaN no lugar de "N/A"
+CABECALHO_BINARIO = struct.Struct("<4sHHHI")
+
+@medido("salvar_instantaneo_binario")
+def salvar_arquivo_binario(arquivo_binario):
+    materias = obter_materias_validas()
+    turmas = sorted({info["turma"] for info in alunos.values()})  # Mantém a grafia original gravada no texto
+    id_turma = {turma: i for i, turma in enumerate(turmas)}  # Cada turma vira um número pequeno
+
+    ras, ids_turmas, tamanhos_nomes, nomes = [], array("H"), array("H"), []
+    colunas_notas = array("d")
+    for ra in fila_alunos:
+        ra_bytes = ra.encode("ascii", "replace")
+        if len(ra_bytes) > TAMANHO_RA:
+            # RA fora do formato esperado: não dá para gravar em largura fixa, então o texto continua sendo usado
+            if os.path.exists(arquivo_binario):
+                os.remove(arquivo_binario)
+            return
+        nome = alunos[ra]["nome"].encode("utf-8")
+        ras.append(ra_bytes.ljust(TAMANHO_RA, b"\0"))
+        ids_turmas.append(id_turma[alunos[ra]["turma"]])
+        tamanhos_nomes.append(len(nome))
+        nomes.append(nome)
+        for materia in materias:
+            nota = notas.obter(ra, materia)
+            colunas_notas.append(float("nan") if nota is None else nota)
+
+    def texto(valor):
+        dados = valor.encode("utf-8")
+        return struct.pack("<H", len(dados)) + dados
+
+    with gravacao_atomica(arquivo_binario, "wb") as f:
+        f.write(CABECALHO_BINARIO.pack(b"PIMB", VERSAO_BINARIO, len(turmas), len(materias), len(ras)))
+        f.write(b"".join(texto(t) for t in turmas))
+        f.write(b"".join(texto(m) for m in materias))
+        f.write(b"".join(ras))
+        f.write(ids_turmas.tobytes())
+        f.write(tamanhos_nomes.tobytes())
+        f.write(b"".join(nomes))
+        f.write(colunas_notas.tobytes())
+
+def carregar_arquivo_binario(arquivo_binario, arquivo_alunos):
+    # Só usa o binário se ele for mais novo que o texto (o texto pode ter sido editado à mão)
+    try:
+        if os.path.exists(arquivo_alunos) and os.path.getmtime(arquivo_binario) < os.path.getmtime(arquivo_alunos):
+            return False
+        with open(arquivo_binario, "rb") as f:
+            dados = f.read()
+    except OSError:
+        return False  # Binário inexistente ou ilegível: o carregamento segue pelo texto
+
+    try:
+        magica, versao, qtd_turmas, qtd_materias, qtd_alunos = CABECALHO_BINARIO.unpack_from(dados, 0)
+        if magica != b"PIMB" or versao != VERSAO_BINARIO:
+            return False
+        pos = CABECALHO_BINARIO.size
+
+        def ler_textos(qtd, pos):
+            lista = []
+            for _ in range(qtd):
+                (tamanho,) = struct.unpack_from("<H", dados, pos)
+                lista.append(dados[pos + 2:pos + 2 + tamanho].decode("utf-8"))
+                pos += 2 + tamanho
+            return lista, pos
+
+        def ler_coluna(tipo, qtd, pos):
+            coluna = array(tipo)
+            coluna.frombytes(dados[pos:pos + qtd * coluna.itemsize])
+            if len(coluna) != qtd:
+                raise ValueError("instantâneo binário truncado")
+            return coluna, pos + qtd * coluna.itemsize
+
+        turmas, pos = ler_textos(qtd_turmas, pos)
+        materias, pos = ler_textos(qtd_materias, pos)
+        bloco_ras = dados[pos:pos + qtd_alunos * TAMANHO_RA]
+        pos += qtd_alunos * TAMANHO_RA
+        ids_turmas, pos = ler_coluna("H", qtd_alunos, pos)
+        tamanhos_nomes, pos = ler_coluna("H", qtd_alunos, pos)
+        bloco_nomes = dados[pos:pos + sum(tamanhos_nomes)]
+        pos += sum(tamanhos_nomes)
+        colunas_notas, pos = ler_coluna("d", qtd_alunos * qtd_materias, pos)
+    except (struct.error, ValueError, UnicodeDecodeError):
+        return False  # Arquivo corrompido: o carregamento segue pelo texto
+
+    inicio_nome = 0
+    for i in range(qtd_alunos):
+        ra = bloco_ras[i * TAMANHO_RA:(i + 1) * TAMANHO_RA].rstrip(b"\0").decode("ascii")
+        fim_nome = inicio_nome + tamanhos_nomes[i]
+        alunos[ra] = {"nome": bloco_nomes[inicio_nome:fim_nome].decode("utf-8"), "turma": turmas[ids_turmas[i]]}
+        inicio_nome = fim_nome
+        if ra not in ras_existentes:
+            fila_alunos[ra] = None
+            ras_existentes.add(ra)
+        linha = colunas_notas[i * qtd_materias:(i + 1) * qtd_materias]
+        if materias == notas.materias:
+            notas.definir_linha(ra, linha)  # Mesma ordem de colunas: copia a linha inteira (NaN continua sendo N/A)
+        else:
+            notas.criar_linha(ra)
+            for materia, nota in zip(materias, linha):
+                notas.definir(ra, materia, nota if nota == nota else None)
+    return True
 
+# --------------------- LEITURA DO ARQUIVO DE TEXTO --------------------- #
+def carregar_arquivo_texto(arquivo_alunos):
     try:
         # Abre o arquivo de alunos em modo leitura ("r") usando codificação UTF-8
         with open(arquivo_alunos, "r", encoding="utf-8") as f:
@@ -70,22 +1605,15 @@ def carregar_dados():
 
                 # Caso a linha comece com "Aluno:", significa que ela contém informações de um aluno
                 if linha.startswith("Aluno:"):
-                    partes = linha.split("|")  # Divide a linha em partes separadas pelo caractere "|"
-
-                    # Divide o nome em 2 partes antes e depois do :
-                    nome = partes[0].split(":", 1)[1].strip()
-                    # "Aluno: Gabriel Schmeisk".split(":", 1)
-                    # Resultado: ["Aluno", " Gabriel Schmeisk"]
-                    ra = partes[1].split(":", 1)[1].strip().upper()
-                    turma = partes[2].split(":", 1)[1].strip()
+                    nome, ra, turma = ler_linha_aluno(linha)
 
                     # Salva os dados do aluno em um dicionário global chamado "alunos"
                     # Estrutura: alunos[RA] = { "nome": nome_do_aluno, "turma": turma_do_aluno }
                     alunos[ra] = {"nome": nome, "turma": turma}
 
-                    # Verifica se o RA já não está na fila de alunos
+                    # Verifica se o RA já não está na fila de alunos (consulta direta, sem percorrer a fila)
                     if ra not in fila_alunos:
-                        fila_alunos.append(ra)   # Adiciona o RA na fila (ordem de leitura/cadastro)
+                        fila_alunos[ra] = None   # Adiciona o RA na fila (ordem de leitura/cadastro)
                         ras_existentes.add(ra)   # Guarda o RA em um conjunto para evitar duplicatas
                         ra_atual = ra            # Atualiza o "ra_atual" para saber de quem são as notas a seguir
                         continue                 # Pula para a próxima linha do arquivo
@@ -94,233 +1622,824 @@ def carregar_dados():
                 # Isso indica que estamos lendo as notas de um aluno
                 if ":" in linha and ra_atual and not linha.startswith("Média geral"):
 
-                    # Garante que o aluno atual tenha um dicionário de notas criado
-                    notas[ra_atual] = notas.setdefault(ra_atual, {})
-
-                    # Cada linha de notas pode conter várias matérias separadas por "|"
-                    for parte in linha.split("|"):
-                        if ":" in parte:  # Verifica se a parte contém "matéria: nota"
-                            materia, media = parte.split(":", 1)  # Divide em nome da matéria e a nota
-                            materia, media = materia.strip(), media.strip()  # Remove espaços extras
-
-                            # Ignora se a "matéria" for a média geral (pois será calculada separadamente)
-                            if materia.lower() != "média geral":
-                                if media.upper() == "N/A":  # Caso a nota seja "N/A", significa que não existe
-                                    notas[ra_atual][materia] = None
-                                else:
-                                    try:
-                                        # Converte a nota para número decimal (float)
-                                        notas[ra_atual][materia] = float(media)
-                                    except ValueError:
-                                        # Caso a conversão falhe (valor inválido), define como None
-                                        notas[ra_atual][materia] = None
+                    # Garante que o aluno atual tenha uma linha de notas criada
+                    notas.criar_linha(ra_atual)
+                    for materia, media in ler_linha_notas(linha):
+                        notas.definir(ra_atual, materia, media)
 
     # Caso o arquivo "alunos.txt" não exista ainda (primeira execução do sistema)
     except FileNotFoundError:
         pass  # Apenas ignora, não gera erro, pois significa que ainda não há alunos cadastrados
 
-    # Após carregar todos os alunos e suas notas, atualiza os arquivos de turmas
-    salvar_turmas()
+def ler_linha_aluno(linha):
+    # "Aluno: Nome | RA: F1A2B3 | Turma: 9A" -> (nome, RA, turma)
+    partes = linha.split("|")  # Divide a linha em partes separadas pelo caractere "|"
+
+    # Divide o nome em 2 partes antes e depois do :
+    nome = partes[0].split(":", 1)[1].strip()
+    # "Aluno: Gabriel Schmeisk".split(":", 1)
+    # Resultado: ["Aluno", " Gabriel Schmeisk"]
+    ra = partes[1].split(":", 1)[1].strip().upper()
+    turma = partes[2].split(":", 1)[1].strip()
+    return nome, ra, turma
+
+def ler_linha_notas(linha):
+    # "Matematica: 7.50 | Portugues: N/A | ... Média geral: N/A" -> lista de (matéria, nota ou None)
+    lidas = []
+    # Cada linha de notas pode conter várias matérias separadas por "|"
+    for parte in linha.split("|"):
+        if ":" in parte:  # Verifica se a parte contém "matéria: nota"
+            materia, media = parte.split(":", 1)  # Divide em nome da matéria e a nota
+            materia, media = materia.strip(), media.strip()  # Remove espaços extras
+
+            # Ignora se a "matéria" for a média geral (pois será calculada separadamente)
+            if materia.lower() != "média geral":
+                if media.upper() == "N/A":  # Caso a nota seja "N/A", significa que não existe
+                    lidas.append((materia, None))
+                else:
+                    try:
+                        # Converte a nota para número decimal (float)
+                        lidas.append((materia, float(media)))
+                    except ValueError:
+                        # Caso a conversão falhe (valor inválido), define como None
+                        lidas.append((materia, None))
+    return lidas
+
+# --------------------- ÍNDICE DE POSIÇÕES E CONSULTA PONTUAL --------------------- #
+# Formato (little-endian): "PIMX" | versão (H) | qtd. alunos (I) | tamanho do "alunos.txt" em bytes (Q)
+#   seguido de uma entrada por aluno, em ordem de RA: RA (TAMANHO_RA bytes) | início (Q) | tamanho (I)
+# Com as entradas em ordem e de tamanho fixo, um RA é achado por busca binária direto no arquivo mapeado (mmap).
+CABECALHO_INDICE = struct.Struct("<4sHIQ")
+ENTRADA_INDICE = struct.Struct(f"<{TAMANHO_RA}sQI")
+
+def salvar_indice_alunos(arquivo_indice, posicoes, tamanho_texto):
+    entradas = []
+    for ra, (inicio, tamanho) in posicoes.items():
+        ra_bytes = ra.encode("ascii", "replace")
+        if len(ra_bytes) > TAMANHO_RA:
+            # RA fora do formato esperado: sem índice, as consultas carregam o arquivo inteiro
+            if os.path.exists(arquivo_indice):
+                os.remove(arquivo_indice)
+            return
+        entradas.append((ra_bytes.ljust(TAMANHO_RA, b"\0"), inicio, tamanho))
+    entradas.sort()
+    with gravacao_atomica(arquivo_indice, "wb") as f:
+        f.write(CABECALHO_INDICE.pack(b"PIMX", VERSAO_INDICE, len(entradas), tamanho_texto))
+        f.write(b"".join(ENTRADA_INDICE.pack(*entrada) for entrada in entradas))
+
+def buscar_no_indice(mapa, ra_bytes):
+    # Busca binária pelo RA nas entradas do índice: (início, tamanho) ou None
+    _, _, qtd, _ = CABECALHO_INDICE.unpack_from(mapa, 0)
+    chave = ra_bytes.ljust(TAMANHO_RA, b"\0")
+    baixo, alto = 0, qtd
+    while baixo < alto:
+        meio = (baixo + alto) // 2
+        ra_meio, inicio, tamanho = ENTRADA_INDICE.unpack_from(mapa, CABECALHO_INDICE.size + meio * ENTRADA_INDICE.size)
+        if ra_meio == chave:
+            return inicio, tamanho
+        if ra_meio < chave:
+            baixo = meio + 1
+        else:
+            alto = meio
+    return None
+
+def ler_aluno_pelo_indice(ra):
+    # Lê do "alunos.txt" só as linhas do aluno, sem carregar o restante.
+    # Devolve {"nome", "turma", "notas"}, False se o RA não está no arquivo, ou None se o índice não serve
+    # (inexistente, de outra versão ou de outro "alunos.txt", ex: arquivo editado à mão)
+    arquivo_alunos = os.path.join(PASTA_ARQUIVOS, "alunos.txt")
+    try:
+        with open(os.path.join(PASTA_ARQUIVOS, ARQUIVO_INDICE), "rb") as f_indice, open(arquivo_alunos, "rb") as f_texto:
+            with mmap.mmap(f_indice.fileno(), 0, access=mmap.ACCESS_READ) as indice:
+                magica, versao, _, tamanho_texto = CABECALHO_INDICE.unpack_from(indice, 0)
+                if magica != b"PIMX" or versao != VERSAO_INDICE or os.fstat(f_texto.fileno()).st_size != tamanho_texto:
+                    return None
+                posicao = buscar_no_indice(indice, ra.encode("ascii", "replace"))
+            if posicao is None:
+                return False
+            with mmap.mmap(f_texto.fileno(), 0, access=mmap.ACCESS_READ) as texto:
+                inicio, tamanho = posicao
+                linhas = texto[inicio:inicio + tamanho].decode("utf-8").splitlines()
+    except (OSError, ValueError, struct.error):
+        return None  # Arquivos ausentes, vazios ou corrompidos: a consulta carrega tudo
+
+    # Mesmas regras do carregamento completo (carregar_arquivo_texto)
+    if not linhas or not linhas[0].startswith("Aluno:"):
+        return None
+    try:
+        nome, ra_lido, turma = ler_linha_aluno(linhas[0].strip())
+    except IndexError:
+        return None
+    if ra_lido != ra:
+        return None
+    notas_aluno = {}
+    if len(linhas) > 1 and ":" in linhas[1] and not linhas[1].strip().startswith("Média geral"):
+        notas_aluno = dict.fromkeys(notas.materias)  # Linha de notas criada (todas N/A até serem lidas)
+        for materia, media in ler_linha_notas(linhas[1].strip()):
+            if materia in notas_aluno:
+                notas_aluno[materia] = media
+    return {"nome": nome, "turma": turma, "notas": notas_aluno}
+
+def aplicar_diario_ao_aluno(ra, aluno):
+    # Aplica sobre um único aluno os registros do diário que o afetam, com as regras de reproduzir_diario
+    try:
+        with open(os.path.join(PASTA_ARQUIVOS, ARQUIVO_DIARIO), "rb") as f:
+            conteudo = f.read()  # O diário é limitado a LIMITE_DIARIO registros entre compactações
+    except FileNotFoundError:
+        return aluno
+    ra_bytes = ra.encode("utf-8")
+    for linha in conteudo.split(b"\n")[:-1]:  # A última parte é vazia ou uma linha incompleta (descartada)
+        if ra_bytes not in linha:
+            continue
+        campos = linha.decode("utf-8", "replace").split("|")
+        try:
+            if campos[1] != ra:
+                continue
+            if campos[0] == "ALUNO":
+                aluno = {"nome": campos[2], "turma": campos[3], "notas": aluno["notas"] if aluno else {}}
+            elif campos[0] == "NOTA" and aluno:
+                media = None if campos[3] == "N/A" else float(campos[3])
+                if campos[2] in notas.coluna:
+                    if not aluno["notas"]:
+                        aluno["notas"] = dict.fromkeys(notas.materias)
+                    aluno["notas"][campos[2]] = media
+            elif campos[0] == "REMOVER":
+                aluno = False
+        except (IndexError, ValueError):
+            continue  # Registro corrompido: ignorado, como no carregamento completo
+    return aluno
+
+# --------------------- SALVA TODAS AS ALTERAÇÕES DE UMA OPERAÇÃO --------------------- #
+# Com o salvamento adiado (ex: servidor HTTP), as operações só marcam que há algo pendente e quem adiou
+# chama salvar_pendentes() no momento certo; o diário/banco continua sendo gravado a cada operação.
+salvamento_adiado = {"ativo": False, "pendente": False, "compactar": False}
+
+def salvar_alteracoes(compactar=False):
+    # Arquivo principal, matérias e turmas alterados por uma operação são efetivados com uma única barreira
+    if lote_alteracoes["nivel"]:
+        lote_alteracoes["compactar"] = lote_alteracoes["compactar"] or compactar
+        return  # Dentro de um lote, tudo é salvo uma única vez no final
+    if not relatorios_automaticos_ativos():
+        marcar_relatorios_desatualizados()  # Na hora, mesmo com o salvamento adiado: vale também após uma queda
+    if salvamento_adiado["ativo"]:
+        salvamento_adiado["pendente"] = True
+        salvamento_adiado["compactar"] = salvamento_adiado["compactar"] or compactar
+        avisar_gravador()
+        return
+    gravar_alteracoes(compactar)
+
+def salvar_pendentes():
+    # Grava o que ficou pendente enquanto o salvamento estava adiado
+    if salvamento_adiado["pendente"]:
+        compactar = salvamento_adiado["compactar"]
+        salvamento_adiado["pendente"] = salvamento_adiado["compactar"] = False
+        gravar_alteracoes(compactar)
+
+# --------------------- SALVAMENTO EM SEGUNDO PLANO (MENUS) --------------------- #
+# Nos menus, lançar uma nota só grava o diário/banco (rápido e independente do tamanho da escola); o restante
+# (matérias, turmas, compactação) fica com uma thread que espera ATRASO_SALVAMENTO segundos sem novas
+# alterações antes de gravar, juntando as notas lançadas em sequência, mas nunca deixa uma alteração
+# esperando mais que ESPERA_MAXIMA_SALVAMENTO. O que estiver pendente (e os relatórios sob demanda desatualizados)
+# é gravado ao sair pela opção 7, ao receber um sinal de término e no encerramento do interpretador.
+# A thread grava com a pasta travada, e toda alteração dos dados também trava a pasta: as duas nunca se misturam.
+ATRASO_SALVAMENTO = 1.0          # Segundos sem novas alterações antes de gravar
+ESPERA_MAXIMA_SALVAMENTO = 10.0  # Segundos, no máximo, entre a primeira alteração pendente e a gravação
+gravador = {"thread": None, "condicao": threading.Condition(), "primeira": None, "ultima": None, "encerrar": False}
+
+def iniciar_salvamento_em_segundo_plano():
+    if gravador["thread"] is not None:
+        return
+    salvamento_adiado["ativo"] = True
+    gravador["encerrar"] = False
+    # daemon: a thread não impede o encerramento; o atexit grava o que estiver pendente antes de sair
+    gravador["thread"] = threading.Thread(target=executar_gravador, name="gravador", daemon=True)
+    gravador["thread"].start()
+    atexit.register(encerrar_salvamento_em_segundo_plano)
+    for nome_sinal in ("SIGTERM", "SIGHUP"):  # SIGHUP: terminal fechado (não existe no Windows)
+        if hasattr(signal, nome_sinal):
+            signal.signal(getattr(signal, nome_sinal), encerrar_por_sinal)
+
+def encerrar_por_sinal(numero, quadro):
+    # sys.exit desfaz a pilha normalmente (travas e grupos de gravação são liberados) e o atexit grava o pendente
+    sys.exit(128 + numero)
+
+def avisar_gravador():
+    # Chamado a cada alteração adiada: marca o horário e acorda a thread
+    with gravador["condicao"]:
+        agora = time.monotonic()
+        if gravador["primeira"] is None:
+            gravador["primeira"] = agora
+        gravador["ultima"] = agora
+        gravador["condicao"].notify()
+
+def prazo_do_gravador():
+    # Momento da gravação: ATRASO_SALVAMENTO após a última alteração, limitado pela espera máxima da primeira
+    return min(gravador["ultima"] + ATRASO_SALVAMENTO, gravador["primeira"] + ESPERA_MAXIMA_SALVAMENTO)
+
+def executar_gravador():
+    while True:
+        with gravador["condicao"]:
+            while not gravador["encerrar"] and (gravador["primeira"] is None or time.monotonic() < prazo_do_gravador()):
+                gravador["condicao"].wait(None if gravador["primeira"] is None else prazo_do_gravador() - time.monotonic())
+            if gravador["encerrar"]:
+                return
+            gravador["primeira"] = gravador["ultima"] = None
+        try:
+            salvar_pendentes()
+            exportar_metricas()
+        except Exception as erro:
+            print(f"\n⚠️ Não foi possível salvar os arquivos ({erro}). Nova tentativa em {ATRASO_SALVAMENTO:g}s.")
+            salvamento_adiado["pendente"] = True  # Os dados continuam no diário/banco; só os arquivos ficam para depois
+            avisar_gravador()
+
+def encerrar_salvamento_em_segundo_plano():
+    # Para a thread e grava na hora o que estava pendente (seguro chamar mais de uma vez)
+    thread = gravador["thread"]
+    if thread is None:
+        return
+    with gravador["condicao"]:
+        gravador["encerrar"] = True
+        gravador["condicao"].notify()
+    thread.join()
+    gravador.update(thread=None, primeira=None, ultima=None)
+    salvamento_adiado["ativo"] = False
+    salvar_pendentes()
+    if not relatorios_automaticos_ativos():
+        gerar_relatorios()  # Sob demanda, os relatórios também são gerados no encerramento (sinal ou fim do Python)
+
+@medido("salvar")
+def gravar_alteracoes(compactar=False):
+    with grupo_de_gravacao():  # O grupo trava a pasta: os arquivos são efetivados antes de liberá-la
+        salvar_dados(compactar)
+        salvar_turmas()
 
 # --------------------- FUNÇÃO PARA SALVAR DADOS --------------------- #
-def salvar_dados():
-    # Monta o caminho completo do arquivo "alunos.txt" dentro da pasta PASTA_ARQUIVOS.
-    arquivo_alunos = os.path.join(PASTA_ARQUIVOS, "alunos.txt")  # caminho do arquivo onde serão gravados os dados
+@medido("salvar_dados")
+def salvar_dados(compactar=False):
+    armazenamento = obter_armazenamento()
+    with grupo_de_gravacao():  # Todos os arquivos alterados são efetivados juntos
+        armazenamento.salvar(compactar)  # Alunos e notas (no texto: diário/compactação; no SQLite: nada pendente)
+        if relatorios_automaticos_ativos():
+            salvar_materias()  # Sob demanda (ou no SQLite), os arquivos de matéria são gerados só quando pedidos
+
+# --------------------- FUNÇÃO PARA SALVAR AS MATÉRIAS --------------------- #
+@medido("salvar_materias")
+def salvar_materias():
+    # ------------------- Cria arquivos separados por matéria -------------------
+    # Aqui o sistema vai gerar um arquivo .txt para cada matéria cadastrada no sistema.
+    # Exemplo: "matematica.txt", "portugues.txt", etc.
+    tarefas = []
+    alunos_em_ordem = None  # Retrato (nome, RA, turma) na ordem de cadastro, montado só se alguma matéria mudou
+    for materia in obter_materias_validas():
+        # Converte o nome da matéria para minúsculas e adiciona ".txt"
+        nome_arquivo = materia.lower() + ".txt"
 
-    # Abre o arquivo em modo escrita ("w") com codificação UTF-8.
-    # Modo "w" sobrescreve totalmente o arquivo existente — cuidado se quiser apenas acrescentar.
+        # Monta o caminho completo do arquivo juntando a pasta e o nome do arquivo
+        caminho_completo = os.path.join(PASTA_ARQUIVOS, nome_arquivo)
+
+        # Pula as matérias que não tiveram nenhuma alteração desde o último salvamento
+        if precisa_gravar(caminho_completo, materia in materias_alteradas):
+            if alunos_em_ordem is None:
+                alunos_em_ordem = [(alunos[ra]["nome"], ra, alunos[ra]["turma"]) for ra in fila_alunos]
+            notas_materia = notas.coluna_valores(materia, fila_alunos)
+            tarefas.append((caminho_completo, renderizar_materia,
+                            (materia, alunos_em_ordem, notas_materia, media_da_materia(materia) is not None)))
+        materias_alteradas.discard(materia)
+
+    # Todas as matérias alteradas são montadas e gravadas ao mesmo tempo
+    executar_relatorios(tarefas)
+
+# --------------------- GRAVA O INSTANTÂNEO COMPLETO DOS DADOS --------------------- #
+def salvar_instantaneo(arquivo_alunos):
+    salvar_arquivo_alunos(arquivo_alunos)  # Relatório legível para as pessoas
+    # Cópia binária gravada depois do texto, para ficar mais nova que ele e ser usada no próximo carregamento
+    salvar_arquivo_binario(os.path.join(PASTA_ARQUIVOS, ARQUIVO_BINARIO))
+
+# --------------------- GRAVA O ARQUIVO PRINCIPAL DE ALUNOS --------------------- #
+@medido("salvar_arquivo_alunos")
+def salvar_arquivo_alunos(arquivo_alunos):
+    # Grava o arquivo de forma atômica (em um temporário que depois substitui o original), com codificação UTF-8.
     # O context manager (with) garante que o arquivo seja fechado automaticamente ao final (mesmo em erro).
-    with open(arquivo_alunos, "w", encoding="utf-8") as f:
+    # O arquivo é gravado em bytes (UTF-8, quebras de linha "\n") para que as posições do índice sejam exatas.
+    posicoes = {}  # RA: (início, tamanho) das linhas do aluno no arquivo
+    with gravacao_atomica(arquivo_alunos, "wb") as f:
         # Escreve um cabeçalho fixo de direitos e ano na primeira linha do arquivo.
-        f.write("© Todos os direitos reservados TecMais LTDA - 2025\n")
+        f.write("© Todos os direitos reservados TecMais LTDA - 2025\n".encode("utf-8"))
         # Escreve uma linha separadora (60 sinais de "=") e pula uma linha.
-        f.write("=" * 60 + "\n\n")
+        f.write(("=" * 60 + "\n\n").encode("utf-8"))
 
         # Se o dicionário 'alunos' estiver vazio (nenhum aluno cadastrado)
         if not alunos:
             # Escreve uma mensagem indicando que não há alunos no sistema
-            f.write("❌ Nenhum aluno cadastrado no sistema.\n")
+            f.write("❌ Nenhum aluno cadastrado no sistema.\n".encode("utf-8"))
             # Escreve uma linha separadora.
-            f.write("-" * 60 + "\n")
+            f.write(("-" * 60 + "\n").encode("utf-8"))
         else:
-            # Cria um conjunto com todas as turmas (info["turma"] para cada aluno) e ordena alfabeticamente.
+            # Percorre as turmas em ordem alfabética.
             # Isso garante que o arquivo seja organizado por turma em ordem crescente.
-            for turma in sorted({info["turma"] for info in alunos.values()}):
-                # Escreve o título da turma atual (ex: "===== TURMA A =====")
-                f.write(f"===== TURMA {turma} =====\n\n")
-
-                # Monta uma lista com os RAs dos alunos que pertencem à turma atual.
-                # alunos.items() retorna pares (ra, info) e filtramos por info["turma"] == turma.
-                alunos_turma = [ra for ra, info in alunos.items() if info["turma"] == turma]
-
-                # Ordena a lista de RAs da turma pelo nome do aluno (alunos[ra]["nome"]).
-                # Assim a saída na turma fica em ordem alfabética de nome.
-                alunos_turma.sort(key=lambda ra: alunos[ra]["nome"])
-
-                # Flag que indica se ao menos um aluno da turma tem nota cadastrada.
-                turma_tem_notas = False
-
-                # Percorre cada RA dos alunos daquela turma para escrever seus dados e notas.
-                for ra in alunos_turma:
-                    info = alunos[ra]  # Dicionário com chaves "nome" e "turma"
-                    # Escreve a linha principal do aluno: nome, RA e turma.
-                    f.write(f"Aluno: {info['nome']} | RA: {ra} | Turma: {info['turma']}\n")
-
-                    # Obtém as notas do aluno a partir do dicionário global 'notas'.
-                    # Se o RA não existir em 'notas', usamos um dicionário vazio como padrão para não gerar erro.
-                    notas_aluno = notas.get(ra, {})
-
-                    # Flag que será False se alguma matéria estiver sem nota (N/A).
-                    todas_as_notas = True
-                    # Flag que indica se o aluno tem ao menos uma nota cadastrada (diferente de N/A).
-                    aluno_tem_nota = False
-
-                    # Percorre cada matéria válida (função obter_materias_validas() deve retornar lista/iterável).
-                    # Para cada matéria, escreve "Matéria: valor | " ou "Matéria: N/A | ".
-                    for materia in obter_materias_validas():
-                        # Se a matéria existe no dicionário do aluno e o valor não é None, escrevemos a nota.
-                        if materia in notas_aluno and notas_aluno[materia] is not None:
-                            # Formata a nota com duas casas decimais (ex: 7.50)
-                            f.write(f"{materia}: {notas_aluno[materia]:.2f} | ")
-                            aluno_tem_nota = True  # marcou que esse aluno tem pelo menos uma nota válida
-                        else:
-                            # Caso contrário, escreve N/A e marca que nem todas as notas estão presentes
-                            f.write(f"{materia}: N/A | ")
-                            todas_as_notas = False
-
-                    # Se o aluno teve pelo menos uma nota, a turma passa a ter notas também.
-                    if aluno_tem_nota:
-                        turma_tem_notas = True
-
-                    # Cálculo da média geral: só é feito se todas as matérias tiverem nota (todas_as_notas True)
-                    # e se o aluno efetivamente tiver alguma nota (aluno_tem_nota True).
-                    if todas_as_notas and aluno_tem_nota:
-                        # Soma as notas para todas as matérias válidas e divide pelo número de matérias.
-                        # OBS: aqui o código chama obter_materias_validas() novamente — ver observação de otimização abaixo.
-                        media_geral = sum(notas_aluno[m] for m in obter_materias_validas()) / len(obter_materias_validas())
-                        f.write(f"Média geral: {media_geral:.2f}\n")
-                    else:
-                        # Se faltar alguma nota, escreve "Média geral: N/A"
-                        f.write("Média geral: N/A\n")
-
-                    # Linha separadora após os dados do aluno
-                    f.write("-" * 60 + "\n")
-
-                # Se, após verificar todos os alunos da turma, nenhum possuía nota válida, escreve aviso.
-                if not turma_tem_notas:
-                    f.write("❌ Nenhuma nota cadastrada nessa turma.\n")
-                    f.write("-" * 60 + "\n")
-
-    # ------------------- Cria arquivos separados por matéria -------------------
-    # Aqui o sistema vai gerar um arquivo .txt para cada matéria cadastrada no sistema.
-    # Exemplo: "matematica.txt", "portugues.txt", etc.
-    for materia in obter_materias_validas():
-        # Converte o nome da matéria para minúsculas e adiciona ".txt"
-        nome_arquivo = materia.lower() + ".txt"
-
-        # Monta o caminho completo do arquivo juntando a pasta e o nome do arquivo
-        caminho_completo = os.path.join(PASTA_ARQUIVOS, nome_arquivo)
+            for turma in turmas_com_alunos():
+                # Só as turmas alteradas desde a última gravação são montadas de novo; as demais vêm do cache
+                secao = cache_turmas.obter(("secao", turma))
+                if secao is None:
+                    secao = renderizar_secao_turma(turma)
+                    cache_turmas.guardar(("secao", turma), secao)
+                texto, posicoes_turma = secao
+                inicio = f.tell()
+                for ra, posicao, tamanho in posicoes_turma:
+                    posicoes[ra] = (inicio + posicao, tamanho)
+                f.write(texto)
+        tamanho_arquivo = f.tell()
+
+    # O índice é efetivado junto com o texto (mesmo grupo de gravação)
+    salvar_indice_alunos(os.path.join(os.path.dirname(arquivo_alunos), ARQUIVO_INDICE), posicoes, tamanho_arquivo)
+
+# --------------------- MONTA O BLOCO DE UMA TURMA NO "alunos.txt" --------------------- #
+@medido("renderizar_secao_turma")
+def renderizar_secao_turma(turma):
+    # Devolve o bloco já em UTF-8 e a posição (início, tamanho) em bytes das linhas de cada aluno dentro dele
+    materias = obter_materias_validas()  # Lista de matérias obtida uma única vez para a turma toda
+    # Lista com os RAs dos alunos da turma, já em ordem alfabética de nome (vem do índice por turma).
+    alunos_turma = alunos_da_turma(turma)
+    agregados = calcular_agregados(alunos_turma)  # Médias e completude da turma, calculadas de uma vez
+
+    # Escreve o título da turma atual (ex: "===== TURMA A =====")
+    partes = [f"===== TURMA {turma} =====\n\n".encode("utf-8")]
+    posicao = len(partes[0])  # Bytes já escritos no bloco
+    posicoes = []             # (RA, início, tamanho) da linha do aluno e da linha de notas
+
+    # Flag que indica se ao menos um aluno da turma tem nota cadastrada.
+    turma_tem_notas = False
+
+    # Percorre cada RA dos alunos daquela turma para escrever seus dados e notas.
+    for ra in alunos_turma:
+        info = alunos[ra]  # Dicionário com chaves "nome" e "turma"
+        # Escreve a linha principal do aluno: nome, RA e turma.
+        linhas_aluno = [f"Aluno: {info['nome']} | RA: {ra} | Turma: {info['turma']}\n"]
+
+        # Obtém as notas do aluno a partir da matriz global 'notas'.
+        notas_aluno = notas.notas_do_aluno(ra)
+
+        # Para cada matéria, escreve "Matéria: valor | " ou "Matéria: N/A | ".
+        for materia in materias:
+            # Se a matéria existe no dicionário do aluno e o valor não é None, escrevemos a nota.
+            if notas_aluno.get(materia) is not None:
+                # Formata a nota com duas casas decimais (ex: 7.50)
+                linhas_aluno.append(f"{materia}: {notas_aluno[materia]:.2f} | ")
+            else:
+                linhas_aluno.append(f"{materia}: N/A | ")
 
-        # Abre o arquivo em modo escrita ("w"), ou seja, sobrescreve se já existir.
-        with open(caminho_completo, "w", encoding="utf-8") as f_mat:
-            # Escreve o cabeçalho fixo da TecMais LTDA com ano
-            f_mat.write("© Todos os direitos reservados TecMais LTDA - 2025\n")
-            # Linha separadora de 60 "="
-            f_mat.write("=" * 60 + "\n\n")
-            # Escreve o título com o nome da matéria
-            f_mat.write(f"===== Notas de {materia} =====\n\n")
-
-            # Flag que indica se algum aluno possui nota nessa matéria
-            materia_tem_nota = False
-
-            # Percorre os alunos na ordem da fila (fila_alunos preserva a ordem de cadastro/carregamento)
-            for ra in fila_alunos:
-                info = alunos[ra]  # Recupera informações do aluno (nome e turma)
-                # Busca a nota da matéria para o aluno. Se não existir, retorna None.
-                nota = notas.get(ra, {}).get(materia)
-
-                if nota is not None:
-                    # Caso o aluno tenha nota, escreve a linha com os dados e a nota formatada com 2 casas decimais
-                    f_mat.write(
-                        f"Aluno: {info['nome']} | RA: {ra} | Turma: {info['turma']} | Nota: {nota:.2f}\n"
-                        + "-" * 60 + "\n"
-                    )
-                    # Marca que essa matéria tem pelo menos uma nota cadastrada
-                    materia_tem_nota = True
-                else:
-                    # Caso o aluno não tenha nota cadastrada (ou seja None)
-                    f_mat.write(
-                        f"Aluno: {info['nome']} | RA: {ra} | Turma: {info['turma']} | Nota: N/A\n"
-                        + "-" * 60 + "\n"
-                    )
+        # Se o aluno teve pelo menos uma nota, a turma passa a ter notas também.
+        if agregados["tem_nota"][ra]:
+            turma_tem_notas = True
 
-            # Se após percorrer todos os alunos, nenhum tinha nota nessa matéria:
-            if not materia_tem_nota:
-                f_mat.write("❌ Nenhuma nota cadastrada para esta matéria.\n")
-                f_mat.write("-" * 60 + "\n")
+        # A média geral só existe se todas as matérias tiverem nota (já calculada em calcular_agregados).
+        media_geral = agregados["media"][ra]
+        if media_geral is not None:
+            linhas_aluno.append(f"Média geral: {media_geral:.2f}\n")
+        else:
+            # Se faltar alguma nota, escreve "Média geral: N/A"
+            linhas_aluno.append("Média geral: N/A\n")
+        # O índice aponta para a linha do aluno e a de notas (que termina com a média geral)
+        dados_aluno = "".join(linhas_aluno).encode("utf-8")
+        posicoes.append((ra, posicao, len(dados_aluno)))
+
+        # Linha separadora após os dados do aluno
+        partes.append(dados_aluno + ("-" * 60 + "\n").encode("utf-8"))
+        posicao += len(partes[-1])
+
+    # Se, após verificar todos os alunos da turma, nenhum possuía nota válida, escreve aviso.
+    if not turma_tem_notas:
+        partes.append(("❌ Nenhuma nota cadastrada nessa turma.\n" + "-" * 60 + "\n").encode("utf-8"))
+    return b"".join(partes), posicoes
+
+# --------------------- RELATÓRIOS EM PARALELO --------------------- #
+# Os arquivos de matéria e de turma são independentes entre si: cada um vira uma tarefa
+# (montar o texto e gravar o arquivo) executada em um conjunto de threads ou processos.
+# As tarefas recebem apenas listas e tuplas copiadas dos dados (um retrato somente leitura),
+# então não dependem dos dicionários globais enquanto estão sendo executadas.
+TRABALHADORES_RELATORIOS = min(4, os.cpu_count() or 1)  # Quantidade de tarefas simultâneas (1 = tudo em sequência)
+TIPO_POOL_RELATORIOS = "threads"                         # "threads" ou "processos" (processos usam todos os núcleos)
+pool_relatorios = {}                                     # Conjunto de trabalhadores criado no primeiro uso e reaproveitado
+
+def obter_pool_relatorios():
+    chave = (TIPO_POOL_RELATORIOS, TRABALHADORES_RELATORIOS)
+    if chave not in pool_relatorios:
+        for pool in pool_relatorios.values():
+            pool.shutdown()  # A configuração mudou: encerra o conjunto anterior
+        pool_relatorios.clear()
+        if TIPO_POOL_RELATORIOS == "processos":
+            pool_relatorios[chave] = ProcessPoolExecutor(max_workers=TRABALHADORES_RELATORIOS)
+        else:
+            pool_relatorios[chave] = ThreadPoolExecutor(max_workers=TRABALHADORES_RELATORIOS)
+    return pool_relatorios[chave]
+
+def gravar_relatorio(caminho, renderizar, argumentos):
+    # Monta o texto do relatório e grava o temporário do arquivo; a efetivação fica com o processo principal
+    conteudo = renderizar(*argumentos)
+    with open(caminho_temporario(caminho), "w", encoding="utf-8") as f:
+        f.write(conteudo)
+        sincronizar_arquivo(f)  # Cada trabalhador sincroniza o seu arquivo, ao mesmo tempo que os outros
+
+@medido("relatorios")
+def executar_relatorios(tarefas):
+    # tarefas: lista de (caminho do arquivo, função que monta o texto, argumentos da função)
+    try:
+        if len(tarefas) <= 1 or TRABALHADORES_RELATORIOS <= 1:
+            for tarefa in tarefas:
+                gravar_relatorio(*tarefa)  # Poucas tarefas: não compensa usar o conjunto de trabalhadores
+        elif tarefas:
+            caminhos, funcoes, argumentos = zip(*tarefas)
+            # list() espera todas as tarefas terminarem e repassa qualquer erro de gravação
+            list(obter_pool_relatorios().map(gravar_relatorio, caminhos, funcoes, argumentos))
+    except BaseException:
+        descartar_arquivos([caminho for caminho, _, _ in tarefas])  # Nenhum relatório da leva é efetivado
+        raise
+    # Os temporários prontos são efetivados juntos (no fim do grupo de gravação em andamento)
+    for caminho, _, _ in tarefas:
+        confirmar_arquivo(caminho)
+
+# --------------------- MONTA O TEXTO DE UMA MATÉRIA --------------------- #
+@medido("renderizar_materia")
+def renderizar_materia(materia, alunos_em_ordem, notas_materia, materia_tem_nota):
+    # alunos_em_ordem: lista de (nome, RA, turma) na ordem de cadastro; notas_materia: nota (ou None) de cada um
+    # Escreve o cabeçalho fixo da TecMais LTDA com ano, a linha separadora e o título com o nome da matéria
+    partes = ["© Todos os direitos reservados TecMais LTDA - 2025\n", "=" * 60 + "\n\n", f"===== Notas de {materia} =====\n\n"]
+    separador = "-" * 60 + "\n"
+
+    # Percorre os alunos na ordem da fila (fila_alunos preserva a ordem de cadastro/carregamento)
+    for (nome, ra, turma), nota in zip(alunos_em_ordem, notas_materia):
+        if nota is not None:
+            # Caso o aluno tenha nota, escreve a linha com os dados e a nota formatada com 2 casas decimais
+            partes.append(f"Aluno: {nome} | RA: {ra} | Turma: {turma} | Nota: {nota:.2f}\n" + separador)
+        else:
+            # Caso o aluno não tenha nota cadastrada (ou seja None)
+            partes.append(f"Aluno: {nome} | RA: {ra} | Turma: {turma} | Nota: N/A\n" + separador)
+
+    # Se nenhum aluno tem nota nessa matéria (vem das médias acumuladas, sem percorrer os alunos de novo)
+    if not materia_tem_nota:
+        partes.append("❌ Nenhuma nota cadastrada para esta matéria.\n")
+        partes.append(separador)
+    return "".join(partes)
+
+# --------------------- MONTA O TEXTO DE UMA TURMA --------------------- #
+@medido("renderizar_turma")
+def renderizar_turma(turma, alunos_turma, media_turma):
+    # alunos_turma: lista de (RA, nome, média do aluno ou None) em ordem alfabética; vazia se a turma não tem alunos
+    partes = ["© Todos os direitos reservados TecMais LTDA - 2025\n", "=" * 60 + "\n\n", f"===== TURMA {turma} =====\n\n"]
+    if not alunos_turma:
+        partes.append("Nenhum aluno cadastrado nesta turma.\n")
+        return "".join(partes)
+
+    for ra, nome, media_individual in alunos_turma:
+        partes.append(f"Aluno: {nome} | RA: {ra} | Turma: {turma}\n")
+        # Média só existe se o aluno tiver todas as matérias com nota válida
+        if media_individual is not None:
+            partes.append(f"   Média do aluno: {media_individual:.2f}\n")
+        else:
+            partes.append("   Média do aluno: N/A\n")
+        partes.append("-" * 50 + "\n")
 
+    # Média da turma (mantida a cada alteração, sem recalcular os alunos)
+    if media_turma is not None:
+        partes.append(f"\n📊 MÉDIA DA TURMA {turma}: {media_turma:.2f}\n")
+    else:
+        partes.append("\n❌ Nenhum aluno possui todas as notas para calcular a média da turma.\n")
+    return "".join(partes)
 
 # --------------------- FUNÇÃO PARA SALVAR TURMAS --------------------- #
+@medido("salvar_turmas")
 def salvar_turmas():
+    if not relatorios_automaticos_ativos():
+        return  # Sob demanda (ou no SQLite), os arquivos de turma são gerados só quando pedidos
+    with grupo_de_gravacao():  # Todos os arquivos de turma alterados são efetivados juntos
+        _salvar_turmas()
+
+def _salvar_turmas():
     turmas = {}
 
-    # Agrupa alunos existentes no dicionário "alunos"
-    for ra, dados in alunos.items():
-        # Normaliza o nome da turma para MAIÚSCULAS (garante chave única independente de maiúsc/minúsc)
-        turma = dados["turma"].upper()
-        # Usa setdefault para criar a lista se não existir e depois acrescenta uma tupla (ra, nome)
-        turmas.setdefault(turma, []).append((ra, dados["nome"]))
+    # Busca no índice apenas as turmas alteradas (as demais continuam com o arquivo atual válido)
+    for turma in turmas_alteradas:
+        if turma in indice_turmas:
+            # Lista de tuplas (ra, nome) em ordem alfabética de nome
+            turmas[turma] = [(ra, nome) for nome, ra in indice_turmas[turma]]
 
+    # Médias individuais de todos os alunos das turmas alteradas, calculadas de uma vez
+    agregados = calcular_agregados([ra for lista_alunos in turmas.values() for ra, _ in lista_alunos])
+
+    tarefas = []
     # Garante que todas as turmas fixas existam, mesmo sem alunos
     for turma in turmasfixas():
         caminho_arquivo = os.path.join(PASTA_TURMAS, f"{turma}.txt")
         # Se a turma fixa não existir na lista de turmas ou estiver vazia, cria um arquivo com cabeçalho e mensagem
-        if turma not in turmas or not turmas[turma]:
-            with open(caminho_arquivo, "w", encoding="utf-8") as f:
-                f.write("© Todos os direitos reservados TecMais LTDA - 2025\n")
-                f.write("=" * 60 + "\n\n")
-                f.write(f"===== TURMA {turma} =====\n\n")
-                f.write("Nenhum aluno cadastrado nesta turma.\n")
-
-    # Atualiza arquivos de turmas
+        if turma not in turmas and precisa_gravar(caminho_arquivo, turma in turmas_alteradas):
+            tarefas.append((caminho_arquivo, renderizar_turma, (turma, [], None)))
+
+    # Atualiza arquivos de turmas com alunos (cada turma recebe uma cópia própria dos dados que vai escrever)
     for turma, lista_alunos in turmas.items():
         caminho_arquivo = os.path.join(PASTA_TURMAS, f"{turma}.txt")
-        if lista_alunos:
-            # Turma com alunos: sobrescreve arquivo
-            soma_medias, qtd_com_nota = 0, 0
-            with open(caminho_arquivo, "w", encoding="utf-8") as f:
-                f.write("© Todos os direitos reservados TecMais LTDA - 2025\n")
-                f.write("=" * 60 + "\n\n")
-                f.write(f"===== TURMA {turma} =====\n\n")
-                for ra, nome in lista_alunos:
-                    f.write(f"Aluno: {nome} | RA: {ra} | Turma: {turma}\n")
-                    notas_aluno = notas.get(ra, {})
-                    # Verifica se o aluno tem todas as matérias com nota válida
-                    if all(materia in notas_aluno and notas_aluno[materia] is not None for materia in obter_materias_validas()):
-                        media_individual = sum(notas_aluno[materia] for materia in obter_materias_validas()) / len(obter_materias_validas())
-                        soma_medias += media_individual
-                        qtd_com_nota += 1
-                        f.write(f"   Média do aluno: {media_individual:.2f}\n")
-                    else:
-                        f.write("   Média do aluno: N/A\n")
-                    f.write("-" * 50 + "\n")
+        retrato = [(ra, nome, agregados["media"][ra]) for ra, nome in lista_alunos]
+        tarefas.append((caminho_arquivo, renderizar_turma, (turma, retrato, media_da_turma(turma))))
 
-                # Média da turma
-                if qtd_com_nota > 0:
-                    media_turma = soma_medias / qtd_com_nota
-                    f.write(f"\n📊 MÉDIA DA TURMA {turma}: {media_turma:.2f}\n")
-                else:
-                    f.write("\n❌ Nenhum aluno possui todas as notas para calcular a média da turma.\n")
-        else:
-            # Turma sem alunos e não fixa: apaga arquivo
-            if turma not in turmasfixas() and os.path.exists(caminho_arquivo):
-                os.remove(caminho_arquivo)
+    executar_relatorios(tarefas)
+
+    # Turma alterada que ficou sem alunos e não é fixa: apaga arquivo
+    for turma in turmas_alteradas:
+        caminho_arquivo = os.path.join(PASTA_TURMAS, f"{turma}.txt")
+        if turma not in turmas and turma not in turmasfixas():
+            def apagar_turma(caminho=caminho_arquivo):
+                if os.path.exists(caminho):
+                    os.remove(caminho)
+            # Como as partições: o arquivo só é apagado depois que os demais arquivos do grupo estiverem no disco
+            apos_efetivar(apagar_turma)
+
+    turmas_alteradas.clear()  # Todas as turmas pendentes foram gravadas
+
+# --------------------- API DO SISTEMA (USO SEM OS MENUS) --------------------- #
+class ErroRegistro(ValueError):
+    # Erro de validação das operações do RegistroEscolar; a mensagem já vem pronta para exibir
+    pass
+
+class AlunoNaoEncontrado(ErroRegistro):
+    pass
+
+class RegistroEscolar:
+    # Operações do sistema sem input(), print() ou limpeza de tela: usada pelos menus e por outros programas.
+    # Nada é lido nem criado no disco até a primeira operação. Os dados continuam nas estruturas
+    # globais deste arquivo, portanto há um único registro escolar por processo: depois que uma pasta
+    # é carregada, usar um registro de outra pasta gera ErroRegistro (outras pastas exigem outro processo).
+    def __init__(self, pasta="."):
+        self.pasta = pasta
+        self.sincronizar_leituras = True  # Consultas buscam antes as alterações de outros processos
+
+    def carregar(self):
+        # Carrega os dados na primeira chamada; as seguintes não fazem nada
+        if not estado_carregamento["carregado"]:
+            definir_pasta_base(self.pasta)
+            carregar_dados()
+        elif os.path.abspath(os.path.join(self.pasta, "dados_escolares")) != os.path.abspath(PASTA_ARQUIVOS):
+            raise ErroRegistro(f"Este processo já carregou os dados de {os.path.dirname(os.path.abspath(PASTA_ARQUIVOS))}; "
+                               f"a pasta {os.path.abspath(self.pasta)} precisa de outro processo.")
+        return self
+
+    def atualizar(self):
+        # Traz as alterações gravadas por outros processos desde a última leitura (se houver alguma)
+        self.carregar()
+        if self.sincronizar_leituras and obter_armazenamento().ha_alteracoes_externas():
+            with trava_da_pasta():
+                obter_armazenamento().sincronizar()
+
+    def validar_ra(self, ra):
+        self.atualizar()
+        ra = ra.strip().upper()
+        if ra not in alunos:
+            raise AlunoNaoEncontrado(f"RA não encontrado: {ra}")
+        return ra
+
+    @medido("registro.registrar")
+    def registrar(self, nome, turma):
+        # Cadastra um aluno e devolve o RA gerado
+        self.carregar()
+        nome, turma = nome.strip().title(), turma.strip().upper()
+        erro = validar_nome(nome)  # Apenas letras, nome e sobrenome, cada parte com 3 letras ou mais
+        if erro:
+            raise ErroRegistro(erro)
+        if turma not in turmasfixas():
+            raise ErroRegistro(f"Turma inválida! Disponíveis: {', '.join(turmasfixas())}")
+        with alteracao_compartilhada():
+            ra = gerar_ra()  # Gera RA único para o aluno (já conhecendo os RAs dos outros processos)
+            adicionar_aluno(ra, nome, turma)
+            salvar_alteracoes()
+        return ra
+
+    @medido("registro.lancar_notas")
+    def lancar_notas(self, ra, materia, n1, n2):
+        # Grava a média (N1 + N2) / 2 do aluno na matéria e devolve a média
+        ra = self.validar_ra(ra)
+        materias = {normalizar_texto(m): m for m in obter_materias_validas()}
+        if normalizar_texto(materia) not in materias:
+            raise ErroRegistro(f"Matéria inválida! Disponíveis: {', '.join(obter_materias_validas())}")
+        if not all(0 <= nota <= 10 for nota in (n1, n2)):
+            raise ErroRegistro("Nota inválida, deve ser 0-10.")
+        media = (n1 + n2) / 2  # Calcula média da matéria
+        with alteracao_compartilhada():
+            # Cada nota é um registro próprio (RA, matéria): alterações de outros processos em outros alunos
+            # ou matérias são preservadas; na mesma nota vale a última gravada no diário
+            if ra not in alunos:
+                raise AlunoNaoEncontrado(f"RA não encontrado: {ra} (removido por outro usuário)")
+            definir_nota(ra, materias[normalizar_texto(materia)], media)
+            salvar_alteracoes()
+        return media
+
+    @medido("registro.boletim")
+    def boletim(self, ra):
+        # Dados do boletim: notas por matéria (None = N/A), média geral e situação (None se faltar alguma nota)
+        # O dicionário devolvido fica no cache até o aluno ser alterado: quem o recebe não deve modificá-lo
+        if not estado_carregamento["carregado"]:
+            boletim = self.boletim_sem_carregar(ra)
+            if boletim is not None:
+                return boletim
+        ra = self.validar_ra(ra)
+        boletim = cache_boletins.obter(("dados", ra))
+        if boletim is None:
+            boletim = montar_boletim(ra, alunos[ra]["nome"], alunos[ra]["turma"], notas.notas_do_aluno(ra))
+            cache_boletins.guardar(("dados", ra), boletim)
+        return boletim
+
+    def boletim_sem_carregar(self, ra):
+        # Consulta de um único aluno antes de qualquer carregamento (ex: "boletim F1A2B3" na linha de comando):
+        # lê só as linhas do aluno, em tempo independente do tamanho da escola. None = precisa carregar tudo
+        definir_pasta_base(self.pasta)
+        ra = ra.strip().upper()
+        aluno = obter_armazenamento().consultar_aluno(ra)
+        if aluno is False:
+            raise AlunoNaoEncontrado(f"RA não encontrado: {ra}")
+        if aluno is None:
+            return None
+        return montar_boletim(ra, aluno["nome"], aluno["turma"], aluno["notas"])
+
+    def boletim_formatado(self, ra):
+        # Texto do boletim exatamente como aparece na tela de consulta
+        ra = self.validar_ra(ra)
+        texto = cache_boletins.obter(("texto", ra))
+        if texto is None:
+            texto = renderizar_boletim(self.boletim(ra))
+            cache_boletins.guardar(("texto", ra), texto)
+        return texto
+
+    @medido("registro.turmas")
+    def turmas(self):
+        # Turmas que possuem alunos, em ordem alfabética
+        self.atualizar()
+        return turmas_com_alunos()
+
+    @medido("registro.listar_turma")
+    def listar_turma(self, turma):
+        # Alunos da turma em ordem alfabética, com a indicação de notas completas
+        self.atualizar()
+        turma = turma.strip().upper()
+        lista = cache_turmas.obter(("lista", turma))
+        if lista is None:
+            ras = alunos_da_turma(turma)
+            agregados = calcular_agregados(ras)
+            lista = [{"ra": ra, "nome": alunos[ra]["nome"], "completo": agregados["completo"][ra]} for ra in ras]
+            if ras:  # Turmas inexistentes não ocupam espaço no cache
+                cache_turmas.guardar(("lista", turma), lista)
+        return lista
+
+    @medido("registro.buscar")
+    def buscar(self, texto, limite=20):
+        # Alunos cujo nome combina com o texto (partes do nome, sem acentos): lista de {ra, nome, turma}
+        self.atualizar()
+        return [{"ra": ra, "nome": alunos[ra]["nome"], "turma": alunos[ra]["turma"]}
+                for ra in buscar_por_nome(texto, limite)]
+
+    @medido("registro.remover")
+    def remover(self, ra):
+        ra = self.validar_ra(ra)
+        with alteracao_compartilhada():
+            if ra not in alunos:
+                raise AlunoNaoEncontrado(f"RA não encontrado: {ra} (removido por outro usuário)")
+            excluir_aluno(ra)  # Remove aluno de todas as estruturas de dados
+            salvar_alteracoes()
+
+    @medido("registro.salvar")
+    def salvar(self):
+        # Incorpora o diário ao "alunos.txt" e grava todos os arquivos pendentes (ex: antes de encerrar),
+        # inclusive os relatórios desatualizados quando eles são gerados sob demanda
+        self.carregar()
+        with alteracao_compartilhada():  # Traz as alterações dos outros processos e mantém a pasta travada até o fim
+            salvar_alteracoes(compactar=True)
+            if not relatorios_automaticos_ativos():
+                gerar_relatorios()
+
+    def verificar_medias(self):
+        # Compara as médias acumuladas de turmas e matérias com um recálculo completo: lista de divergências
+        self.atualizar()
+        return [{"tipo": tipo, "nome": nome, "esperado": esperado, "obtido": obtido}
+                for tipo, nome, esperado, obtido in verificar_acumulados()]
+
+    @medido("registro.gerar_relatorios")
+    def gerar_relatorios(self):
+        # Gera os relatórios de matéria e de turma desatualizados e devolve quantos foram gravados
+        self.atualizar()
+        return gerar_relatorios()
+
+    def lote(self):
+        # Uso: "with registro.lote():" — várias operações seguidas com um único salvamento no final
+        self.carregar()
+        return lote_de_alteracoes()
+
+    def estatisticas_cache(self):
+        # Acertos, falhas e ocupação dos caches de boletins e de turmas
+        return estatisticas_cache()
+
+    def metricas(self):
+        # Chamadas, tempo total, p50/p99 e bytes gravados por operação (só medidos com as métricas ligadas)
+        return resumo_metricas()
+
+registro = RegistroEscolar()  # Registro usado pelos menus (não carrega nada até o primeiro uso)
+
+# --------------------- RELATÓRIOS SOB DEMANDA --------------------- #
+# Os arquivos de matéria e de turma são derivados dos dados: com RELATORIOS_SOB_DEMANDA, uma alteração apenas
+# os marca como desatualizados no manifesto "relatorios.json" ({"materias": {...}, "turmas": {...}}, cada um
+# "atualizado" ou "desatualizado") e eles só são gerados quando pedidos. Relatório ausente do manifesto conta
+# como desatualizado; pedidos seguidos sem alterações no meio reaproveitam os arquivos existentes.
+def relatorios_automaticos_ativos():
+    # Se os arquivos de matéria e de turma são regravados a cada salvamento
+    return obter_armazenamento().relatorios_automaticos and not RELATORIOS_SOB_DEMANDA
+
+def ler_manifesto_relatorios():
+    caminho = os.path.join(PASTA_ARQUIVOS, ARQUIVO_RELATORIOS)
+    assinatura = assinatura_arquivo(caminho)
+    if estado_relatorios["manifesto"] is None or assinatura != estado_relatorios["assinatura"]:
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                manifesto = json.load(f)
+            if manifesto.get("formato") != VERSAO_RELATORIOS:
+                raise ValueError("manifesto de relatórios de outra versão")
+        except (FileNotFoundError, ValueError):
+            manifesto = {"formato": VERSAO_RELATORIOS, "materias": {}, "turmas": {}}  # Tudo desatualizado
+        estado_relatorios.update(manifesto=manifesto, assinatura=assinatura)
+    return estado_relatorios["manifesto"]
+
+def gravar_manifesto_relatorios(manifesto):
+    caminho = os.path.join(PASTA_ARQUIVOS, ARQUIVO_RELATORIOS)
+    with gravacao_atomica(caminho) as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    estado_relatorios["manifesto"] = manifesto
+
+    def guardar_assinatura():
+        estado_relatorios["assinatura"] = assinatura_arquivo(caminho)
+    apos_efetivar(guardar_assinatura)
+
+def marcar_relatorios_desatualizados():
+    # Só grava o manifesto quando algum relatório alterado ainda consta como atualizado: uma sequência de
+    # alterações nas mesmas matérias/turmas grava no máximo uma vez, e nenhum relatório é montado
+    if not materias_alteradas and not turmas_alteradas:
+        return
+    with trava_da_pasta():
+        manifesto = ler_manifesto_relatorios()
+        materias = [m for m in materias_alteradas if manifesto["materias"].get(m) == "atualizado"]
+        turmas = [t for t in turmas_alteradas if manifesto["turmas"].get(t) == "atualizado"]
+        if materias or turmas:
+            gravar_manifesto_relatorios({
+                "formato": VERSAO_RELATORIOS,
+                "materias": {**manifesto["materias"], **dict.fromkeys(materias, "desatualizado")},
+                "turmas": {**manifesto["turmas"], **dict.fromkeys(turmas, "desatualizado")},
+            })
+
+@medido("gerar_relatorios")
+def gerar_relatorios():
+    # Regrava só os relatórios de matéria e de turma desatualizados (ou apagados) e devolve quantos foram gravados.
+    # Os relatórios são montados com a pasta travada e depois de trazer as alterações dos outros processos:
+    # nenhum relatório é marcado como atualizado a partir de dados antigos da memória
+    with grupo_de_gravacao():
+        obter_armazenamento().sincronizar()
+        manifesto = ler_manifesto_relatorios()
+        materias = obter_materias_validas()
+        turmas = set(turmasfixas()) | set(indice_turmas)
+        materias_alteradas.update(m for m in materias if manifesto["materias"].get(m) != "atualizado")
+        turmas_alteradas.update(t for t in turmas if manifesto["turmas"].get(t) != "atualizado")
+        turmas_alteradas.update(t for t in manifesto["turmas"] if t not in turmas)  # Ficaram sem alunos: arquivo apagado
+        gerados = sum(precisa_gravar(os.path.join(PASTA_ARQUIVOS, m.lower() + ".txt"), m in materias_alteradas)
+                      for m in materias)
+        gerados += sum(precisa_gravar(os.path.join(PASTA_TURMAS, f"{t}.txt"), t in turmas_alteradas) for t in turmas)
+        salvar_materias()
+        _salvar_turmas()
+        atualizado = {"formato": VERSAO_RELATORIOS, "materias": dict.fromkeys(materias, "atualizado"),
+                      "turmas": dict.fromkeys(sorted(turmas), "atualizado")}
+        if atualizado != manifesto:  # Nada mudou desde a última geração: o manifesto não é regravado
+            gravar_manifesto_relatorios(atualizado)
+    return gerados
+
+# --------------------- EXPORTA TODOS OS RELATÓRIOS EM .TXT --------------------- #
+@medido("exportar_relatorios")
+def exportar_relatorios():
+    # Regrava "alunos.txt", os arquivos de matéria e os de turma a partir dos dados atuais
+    with grupo_de_gravacao():
+        obter_armazenamento().sincronizar()  # Antes de marcar tudo: recarregar os dados desfaz as marcas
+        materias_alteradas.update(obter_materias_validas())
+        turmas_alteradas.update(turmasfixas())
+        turmas_alteradas.update(indice_turmas)
+        salvar_arquivo_alunos(os.path.join(PASTA_ARQUIVOS, "alunos.txt"))  # Regrava também o índice de posições
+        gerar_relatorios()  # Todos marcados acima: grava todos e deixa o manifesto com todos atualizados
+
+def exportar_relatorios_menu():
+    print("""
+=========================================
+        📤 EXPORTAR RELATÓRIOS (.TXT)
+=========================================
+""")
+    gerados = registro.gerar_relatorios()  # Os relatórios que não mudaram desde a última geração são reaproveitados
+    print(f"✅ {gerados} relatório(s) gravado(s) em '{PASTA_ARQUIVOS}' e '{PASTA_TURMAS}'; os demais já estavam atualizados.")
+    input("\nPressione Enter para voltar ao menu...")
 
 # --------------------- FUNÇÃO PARA LISTAR ALUNOS --------------------- #
 def listar_alunos():
 
-    # Verifica se não há alunos cadastrados no dicionário global "alunos"
-    if not alunos:
+    # Verifica se não há alunos cadastrados (nenhuma turma com alunos)
+    turmas = registro.turmas()
+    if not turmas:
         # Exibe mensagem de aviso e pausa até o usuário pressionar alguma tecla
         input("\n❌ Nenhum aluno cadastrado ainda. Pressione qualquer tecla para continuar.\n")
         return
@@ -328,30 +2447,17 @@ def listar_alunos():
     # Cabeçalho da listagem de alunos por turma
     print("\n===== ALUNOS POR TURMA =====\n")
 
-    # Cria uma lista de turmas únicas a partir do dicionário de alunos e ordena alfabeticamente
-    turmas = sorted({info["turma"] for info in alunos.values()})
-
-    # Percorre cada turma para listar os alunos
+    # Percorre cada turma (em ordem alfabética) para listar os alunos
     for turma in turmas:
         print(f"--- Turma {turma} ---")  # Título da turma
 
-        # Filtra os RAs dos alunos pertencentes à turma atual
-        ras_turma = [ra for ra, info in alunos.items() if info["turma"] == turma]
-
-        # Ordena os RAs com base no nome do aluno para exibição ordenada
-        ras_turma.sort(key=lambda ra: alunos[ra]["nome"])
-
-        # Percorre cada RA da turma
-        for ra in ras_turma:
-            info = alunos[ra]  # Recupera informações do aluno
-
+        # Alunos da turma, já ordenados pelo nome (vem do índice por turma)
+        for aluno in registro.listar_turma(turma):
             # Verifica se todas as matérias possuem notas lançadas
-            notas_disponiveis = "Sim" if ra in notas and all(
-                m in notas[ra] and notas[ra][m] is not None for m in obter_materias_validas()
-            ) else "Não"
+            notas_disponiveis = "Sim" if aluno["completo"] else "Não"
 
             # Exibe os dados do aluno e se a média está lançada
-            print(f"Nome: {info['nome']} | RA: {ra} | Média Lançada: {notas_disponiveis}")
+            print(f"Nome: {aluno['nome']} | RA: {aluno['ra']} | Média Lançada: {notas_disponiveis}")
             print()
     print("=======================================\n")
     input("Pressione qualquer tecla para continuar.")
@@ -368,15 +2474,16 @@ def remover_alunos():
 """)
 
         # Solicita RA do aluno ou palavra-chave para voltar
-        ra = input("🆔 Digite o RA do aluno que deseja remover (ou '0' para retornar ao menu): ").strip().upper()
+        texto = input("🆔 Digite o RA ou o nome do aluno que deseja remover (ou '0' para retornar ao menu): ").strip()
 
         # Permite retornar ao menu principal se o usuário digitar uma opção de saída
-        if ra.lower() in sair():
+        if texto.lower() in sair():
             limpar_console()
             return
 
-        # Verifica se o RA digitado existe no dicionário de alunos
-        if ra not in alunos:
+        # Verifica se o RA digitado existe (ou se o nome corresponde a um aluno escolhido)
+        ra = identificar_aluno(texto)
+        if ra is None:
             input("\n❌ Aluno não encontrado! Tente novamente.\n")
             limpar_console()
             continue  # Volta para o início do loop para tentar novamente
@@ -402,17 +2509,8 @@ def remover_alunos():
             # Senha fixa para permitir exclusão
             senha = input("Digite a senha para confirmar a exclusão do aluno: ").strip()
             if senha in senha_aluno():
-                # Remove aluno de todas as estruturas de dados
-                alunos.pop(ra)
-                notas.pop(ra, None)
-                if ra in fila_alunos:
-                    fila_alunos.remove(ra)
-                if ra in ras_existentes:
-                    ras_existentes.remove(ra)
-
-                # Atualiza os arquivos de dados
-                salvar_dados()
-                salvar_turmas()
+                # Remove aluno de todas as estruturas de dados e atualiza os arquivos
+                registro.remover(ra)
                 limpar_console()
                 input("\n✅ Aluno removido com sucesso! Pressione qualquer tecla para retornar.")
                 return
@@ -434,7 +2532,13 @@ def remover_alunos():
 
 # --------------------- FUNÇÃO PARA LIMPAR CONSOLE --------------------- #
 def limpar_console():
-    os.system("cls" if os.name == "nt" else "clear")  # Comando para limpar tela no Windows ou Linux/Mac
+    if not sys.stdout.isatty():
+        return  # Saída redirecionada (arquivo ou outro programa): não há tela para limpar
+    if os.name == "nt":
+        os.system("cls")  # Comando para limpar tela no Windows
+    else:
+        sys.stdout.write("\033[H\033[2J")  # Linux/Mac: sequência ANSI, sem abrir um processo "clear" a cada tela
+        sys.stdout.flush()
 
 # --------------------- FUNÇÃO PARA LIMPAR BANCO DE DADOS --------------------- #
 def limpar_banco():
@@ -457,25 +2561,36 @@ def limpar_banco():
         # Valida se a senha está correta
         if senha in senha_banco():
 
-            # Percorre todos os arquivos da pasta principal (onde ficam os alunos e notas)
-            for arquivo in os.listdir(PASTA_ARQUIVOS):
-                caminho_arquivo = os.path.join(PASTA_ARQUIVOS, arquivo)
-                # Remove apenas arquivos (ignora pastas)
-                if os.path.isfile(caminho_arquivo):
-                    os.remove(caminho_arquivo)
-
-            # Percorre todos os arquivos da pasta de turmas
-            for arquivo in os.listdir(PASTA_TURMAS):
-                caminho_arquivo = os.path.join(PASTA_TURMAS, arquivo)
-                # Remove apenas arquivos (ignora pastas)
-                if os.path.isfile(caminho_arquivo):
-                    os.remove(caminho_arquivo)
-
-            # Limpa todas as estruturas de dados na memória para garantir que nada fique carregado
-            alunos.clear()          # Dicionário de alunos
-            notas.clear()           # Dicionário de notas
-            fila_alunos.clear()     # Fila de alunos para ordem de cadastro
-            ras_existentes.clear()  # Conjunto de RAs já existentes
+            with trava_da_pasta():  # Nenhum outro processo grava enquanto os arquivos são apagados
+                obter_armazenamento().fechar()  # Fecha o banco SQLite (se estiver em uso) antes de apagá-lo
+
+                # Percorre todos os arquivos da pasta principal (onde ficam os alunos e notas)
+                for arquivo in os.listdir(PASTA_ARQUIVOS):
+                    caminho_arquivo = os.path.join(PASTA_ARQUIVOS, arquivo)
+                    # Remove apenas arquivos (ignora pastas), mantendo o arquivo da trava que está em uso
+                    if os.path.isfile(caminho_arquivo) and arquivo != ARQUIVO_TRAVA:
+                        os.remove(caminho_arquivo)
+
+                # Arquivos de turma do armazenamento particionado (subpasta da pasta principal)
+                pasta_particoes = os.path.join(PASTA_ARQUIVOS, PASTA_PARTICOES)
+                for arquivo in os.listdir(pasta_particoes) if os.path.isdir(pasta_particoes) else ():
+                    os.remove(os.path.join(pasta_particoes, arquivo))
+
+                # Percorre todos os arquivos da pasta de turmas
+                for arquivo in os.listdir(PASTA_TURMAS):
+                    caminho_arquivo = os.path.join(PASTA_TURMAS, arquivo)
+                    # Remove apenas arquivos (ignora pastas)
+                    if os.path.isfile(caminho_arquivo):
+                        os.remove(caminho_arquivo)
+
+                # O diário e a versão também foram apagados junto com os demais arquivos
+                estado_diario.update(registros=0, posicao=0, versao=0)
+
+                # Gravações adiadas eram de dados que não existem mais: não recriam os arquivos apagados
+                salvamento_adiado.update(pendente=False, compactar=False)
+
+                # Limpa todas as estruturas de dados na memória para garantir que nada fique carregado
+                limpar_memoria()
 
             # Mensagem de sucesso no console
             input("\n✅ Banco de dados limpo com sucesso!\nPressione qualquer tecla para continuar!\n")
@@ -508,6 +2623,34 @@ def gerar_ra():
         if ra not in ras_existentes:  # Garante que não exista duplicado
             return ra  # Retorna RA único
 
+# --------------------- ALOCAÇÃO DE RAs EM BLOCO --------------------- #
+CARACTERES_RA = string.ascii_uppercase + string.digits  # 36 símbolos possíveis em cada posição do RA
+TOTAL_RAS = len(CARACTERES_RA) ** 5                     # 36⁵ RAs possíveis depois do prefixo "F"
+
+def alocar_ras(quantidade):
+    # Gera "quantidade" RAs únicos de uma vez, percorrendo uma permutação embaralhada de todos os RAs possíveis:
+    # posição = (a * i + b) mod TOTAL_RAS, com "a" sem fatores em comum com TOTAL_RAS (= 2¹⁰ x 3¹⁰).
+    # Assim nenhum candidato se repete dentro do bloco e cada RA já existente é testado no máximo uma vez.
+    if len(ras_existentes) + quantidade > TOTAL_RAS:
+        raise ValueError("Não há RAs livres suficientes para essa quantidade de alunos.")
+    a = random.randrange(1, TOTAL_RAS)
+    while a % 2 == 0 or a % 3 == 0:
+        a = random.randrange(1, TOTAL_RAS)
+    b = random.randrange(TOTAL_RAS)
+
+    novos, i = [], 0
+    while len(novos) < quantidade:
+        posicao = (a * i + b) % TOTAL_RAS
+        i += 1
+        resto_ra = ""
+        for _ in range(5):  # Converte a posição para 5 caracteres na base 36
+            posicao, digito = divmod(posicao, len(CARACTERES_RA))
+            resto_ra = CARACTERES_RA[digito] + resto_ra
+        ra = "F" + resto_ra
+        if ra not in ras_existentes:
+            novos.append(ra)
+    return novos
+
 # --------------------- PRIMEIRO ACESSO --------------------- #
 
 def primeiro_acesso():
@@ -529,7 +2672,7 @@ Por gentileza, insira sua senha abaixo.
         senha = input("🔑 Senha: ").strip()
         if senha in senha_professor():
             print("\n✅ Acesso permitido! Bem-vindo(a), professor.\nCarregando Sistemas...\n") 
-            carregar_dados()
+            registro.carregar()
             limpar_console()
             return True  # apenas retorna True
         else:
@@ -556,6 +2699,8 @@ Escolha uma opção para executar:
  [5] 👧 Remover Aluno do Sistema.
  [6] ❌ Limpar Banco de Dados.
  [7] 💾 Sair do Sistema.
+ [8] 📥 Matrícula em Lote (CSV).
+ [9] 📤 Exportar Relatórios (.txt).
 
 =========================================
 """)  # Menu principal
@@ -571,19 +2716,25 @@ Escolha uma opção para executar:
         "3": consultar_boletim,   # Opção 3 → Consultar boletim
         "4": listar_alunos,       # Opção 4 → Listar todos os alunos
         "5": remover_alunos,      # Opção 5 → Remover aluno(s) cadastrado(s)
-        "6": limpar_banco         # Opção 6 → Limpar todos os registros (reset)
+        "6": limpar_banco,        # Opção 6 → Limpar todos os registros (reset)
+        "8": matricular_em_lote,  # Opção 8 → Matricular vários alunos a partir de um CSV
+        "9": exportar_relatorios_menu  # Opção 9 → Gerar os arquivos .txt desatualizados
     }
 
     # Verifica se a opção digitada pelo usuário existe no dicionário "opcoes"
     if opcao in opcoes:
         limpar_console()          # Limpa a tela antes de executar qualquer ação
-        opcoes[opcao]()           # Executa a função correspondente à opção escolhida
+        # Executa a função correspondente à opção escolhida (o tempo medido inclui a digitação do professor;
+        # as operações do registro chamadas por ela são medidas separadamente)
+        executar_medido(f"menu.{opcoes[opcao].__name__}", opcoes[opcao])
+        exportar_metricas()       # Atualiza o arquivo de métricas (se estiver configurado)
 
     # Caso o usuário escolha a opção 7, o sistema será encerrado com salvamento dos dados
     elif opcao == "7":
         print("Saindo do sistema...")
-        salvar_dados()            # Salva os dados dos alunos antes de sair
-        salvar_turmas()           # Salva também as turmas antes de encerrar
+        encerrar_salvamento_em_segundo_plano()  # Grava o que a thread de salvamento ainda não gravou
+        registro.salvar()  # Salva alunos, matérias e turmas antes de sair, incorporando o diário ao "alunos.txt"
+        exportar_metricas()
         exit()
 
     # Caso o usuário digite uma opção inválida (não existente)
@@ -592,6 +2743,17 @@ Escolha uma opção para executar:
         limpar_console()
         return
 
+# --------------------- VALIDAÇÃO DE NOMES --------------------- #
+def validar_nome(nome):
+    # Devolve a mensagem de erro do nome, ou None se ele for válido
+    if not nome.replace(" ", "").isalpha():  # Verifica se o nome contém apenas letras
+        return "Por favor, digite apenas letras."
+    if len(nome.split()) < 2:
+        return "Por favor, digite nome e sobrenome (ex: Gabriel Schmeisk)"
+    if any(len(parte) < 3 for parte in nome.split()):
+        return "Cada parte do nome deve ter pelo menos 3 caracteres."
+    return None
+
 # --------------------- REGISTRO DE ALUNOS --------------------- #
 def registrar_aluno():
     while True:  # Loop para permitir cadastrar vários alunos
@@ -607,21 +2769,12 @@ def registrar_aluno():
             limpar_console()
             return  # Encerra a função e volta ao menu principal
 
-        if not nome.replace(" ", "").isalpha():  # Verifica se o nome contém apenas letras
-            input("\n⚠️  Por favor, digite apenas letras.\nPressione qualquer tecla para continuar!\n")
+        erro = validar_nome(nome)  # Apenas letras, nome e sobrenome, cada parte com 3 letras ou mais
+        if erro:
+            input(f"\n⚠️  {erro}\nPressione qualquer tecla para continuar!\n")
             limpar_console()
             continue  # Reinicia loop se o nome for inválido
 
-        if len(nome.split()) < 2:
-            input("⚠️  Por favor, digite nome e sobrenome (ex: Gabriel Schmeisk)\nPressione qualquer tecla para continuar!\n")
-            limpar_console()
-            continue 
-        
-        if any(len(parte) < 3 for parte in nome.split()):
-            input("⚠️  Cada parte do nome deve ter pelo menos 3 caracteres.\nPressione qualquer tecla para continuar!\n")
-            limpar_console()
-            continue
-
         # --- Entrada e validação da turma ---
         turma = input("🎓 Digite a turma do aluno (ou '0' para retornar ao menu): ").strip().upper()  
         if turma.lower() in sair():  # Permite retornar ao menu principal
@@ -634,12 +2787,7 @@ def registrar_aluno():
             continue  # Reinicia o loop se a turma não for válida
 
         # --- Registro do aluno ---
-        ra = gerar_ra()  # Gera RA único para o aluno
-        alunos[ra] = {"nome": nome, "turma": turma}  # Adiciona o aluno ao dicionário principal
-        fila_alunos.append(ra)  # Coloca o RA na fila
-        ras_existentes.add(ra)  # Adiciona o RA ao conjunto de RAs já cadastrados
-        salvar_dados()  # Salva os dados no arquivo principal
-        salvar_turmas()  # Salva os dados separados por turma
+        ra = registro.registrar(nome, turma)  # Gera o RA, cadastra o aluno e salva os arquivos
         limpar_console()  # Limpa a tela para mostrar mensagem de sucesso
 
         # --- Mensagem de confirmação ---
@@ -662,6 +2810,94 @@ def registrar_aluno():
             limpar_console()
             break
 
+# --------------------- MATRÍCULA DE ALUNOS EM LOTE --------------------- #
+def matricular_alunos(novos_alunos):
+    # Recebe uma lista de (nome, turma), valida com as mesmas regras do registro individual,
+    # aloca todos os RAs em um único bloco e grava o lote inteiro com um único salvamento.
+    # Devolve (lista de (RA, nome, turma) matriculados, lista de (posição, mensagem) com os erros).
+    validos, erros = [], []
+    for posicao, (nome, turma) in enumerate(novos_alunos, start=1):
+        nome, turma = " ".join(nome.split()).title(), turma.strip().upper()
+        erro = validar_nome(nome)
+        if erro is None and turma not in turmasfixas():
+            erro = f"Turma inválida: {turma} (disponíveis: {', '.join(turmasfixas())})"
+        if erro:
+            erros.append((posicao, erro))
+        else:
+            validos.append((nome, turma))
+
+    with alteracao_compartilhada():  # Os RAs são alocados já conhecendo os alunos cadastrados pelos outros processos
+        matriculados = [(ra, nome, turma) for ra, (nome, turma) in zip(alocar_ras(len(validos)), validos)]
+        for ra, nome, turma in matriculados:
+            adicionar_aluno(ra, nome, turma, persistir=False)
+        registrar_alteracoes([("ALUNO", ra, nome, turma) for ra, nome, turma in matriculados])
+        if matriculados:
+            salvar_alteracoes()
+    return matriculados, erros
+
+def matricular_alunos_csv(caminho):
+    # Lê um CSV com as colunas Nome, Turma (separadas por "," ou ";", cabeçalho opcional) e matricula todos de uma vez
+    inicio = time.perf_counter()
+    novos_alunos, linhas_arquivo, erros = [], [], []
+    linhas_lidas = 0
+    for numero, linha in linhas_csv(caminho, cabecalho="nome"):
+        linhas_lidas += 1
+        if len(linha) < 2:
+            erros.append((numero, "esperava 2 colunas: Nome, Turma"))
+            continue
+        novos_alunos.append((linha[0], linha[1]))
+        linhas_arquivo.append(numero)  # Para traduzir a posição na lista de volta para a linha do arquivo
+
+    matriculados, erros_validacao = matricular_alunos(novos_alunos)
+    erros.extend((linhas_arquivo[posicao - 1], mensagem) for posicao, mensagem in erros_validacao)
+    erros.sort()
+    segundos = time.perf_counter() - inicio
+    return {
+        "linhas": linhas_lidas,
+        "matriculados": matriculados,
+        "erros": erros,
+        "segundos": segundos,
+        "alunos_por_segundo": len(matriculados) / segundos if segundos > 0 else 0.0,
+    }
+
+def matricular_em_lote():
+    print("""
+=========================================
+    📥 MATRÍCULA DE ALUNOS EM LOTE (CSV)
+=========================================
+
+Colunas esperadas: Nome, Turma
+Exemplo: Gabriel Schmeisk;9A
+""")
+    caminho = input("📄 Caminho do arquivo CSV (ou '0' para retornar): ").strip().strip('"')
+    if caminho.lower() in sair():
+        limpar_console()
+        return
+
+    try:
+        relatorio = matricular_alunos_csv(caminho)
+    except (OSError, UnicodeDecodeError, csv.Error, ValueError) as erro:
+        input(f"\n❌ Não foi possível importar o arquivo: {erro}\nPressione qualquer tecla para continuar!\n")
+        limpar_console()
+        return
+
+    print(f"""
+=========================================
+       ✅ MATRÍCULA CONCLUÍDA
+=========================================
+
+📄 Linhas lidas        : {relatorio['linhas']}
+🧑 Alunos matriculados : {len(relatorio['matriculados'])}
+❌ Linhas com erro     : {len(relatorio['erros'])}
+⏱️  Tempo               : {relatorio['segundos']:.3f}s ({relatorio['alunos_por_segundo']:.0f} alunos/s)
+""")
+    for ra, nome, turma in relatorio["matriculados"]:
+        print(f"   🆔 {ra} | {nome} | {turma}")
+    for numero, mensagem in relatorio["erros"]:
+        print(f"   Linha {numero}: {mensagem}")
+    input("\nPressione qualquer tecla para continuar!\n")
+    limpar_console()
+
 # --------------------- REGISTRO DE NOTAS --------------------- #
 def cadastrar_notas():
     # Loop principal para manter o usuário no sub-menu de cadastro de notas
@@ -673,7 +2909,8 @@ def cadastrar_notas():
 
 [1] 💻 Cadastrar notas por RA
 [2] 🏫 Cadastrar notas por Sala (selecionar aluno da turma)
-[3] 🔙 Retornar ao menu principal
+[3] 📥 Importar notas de arquivo CSV
+[4] 🔙 Retornar ao menu principal
 
 =========================================
 """)  # Menu de cadastro de notas
@@ -682,9 +2919,9 @@ def cadastrar_notas():
         # ---------------- CADASTRAR POR RA ---------------- #
         if escolha == "1":
             limpar_console()
-            ra = input("Digite o RA do aluno: ").strip().upper()  # Solicita RA
-            
-            if ra not in alunos:  # Verifica se aluno existe
+            ra = identificar_aluno(input("Digite o RA ou o nome do aluno: "))  # Solicita RA ou nome
+
+            if ra is None:  # Verifica se aluno existe
                 input("\n⚠️  Aluno não encontrado! Cadastre-o primeiro.\nPressione qualquer tecla para continuar!\n")
                 limpar_console()
                 continue # Volta ao menu [1], [2], [3] (tela anterior)
@@ -697,7 +2934,7 @@ def cadastrar_notas():
 
         # ---------------- CADASTRAR POR SALA ---------------- #
         elif escolha == "2":
-            turmas_disponiveis = sorted({info["turma"] for info in alunos.values()})  # Lista turmas existentes
+            turmas_disponiveis = turmas_com_alunos()  # Lista turmas existentes
             
             if not turmas_disponiveis:  # Verifica se há alunos cadastrados
                 input("\n⚠️  Não há alunos cadastrados ainda.\nPressione qualquer tecla para continuar!\n")
@@ -714,7 +2951,7 @@ def cadastrar_notas():
                 limpar_console()
                 continue  # Volta ao menu
             
-            alunos_turma = [ra for ra, info in alunos.items() if info["turma"] == turma]  # Filtra alunos da turma
+            alunos_turma = alunos_da_turma(turma)  # Alunos da turma, em ordem alfabética
 
             while True:  # Loop para cadastrar notas de alunos da turma
                 limpar_console()
@@ -730,9 +2967,7 @@ def cadastrar_notas():
                 
                 if ra.lower() in sair():  # Permite sair do loop
                     limpar_console()
-                    salvar_dados()
-                    salvar_turmas()
-                    break # Sai do while True interno
+                    break # Sai do while True interno (cada nota já foi salva ao ser lançada)
                 
                 elif ra not in alunos_turma:  # Valida RA
                     input("\n❌ RA inválido ou não pertence a essa turma.\nPressione qualquer tecla para continuar!\n")
@@ -746,18 +2981,138 @@ def cadastrar_notas():
 
 
         # ---------------- VOLTAR AO MENU PRINCIPAL ---------------- #
-        elif escolha == "3":
+        elif escolha == "4":
             limpar_console()
             return  # Retorna ao menu principal
+
+        # ---------------- IMPORTAR DE ARQUIVO CSV ---------------- #
+        elif escolha == "3":
+            limpar_console()
+            importar_notas()
+            continue  # Volta ao menu [1], [2], [3], [4] (tela anterior)
         
         # ---------------- OPÇÃO INVÁLIDA ---------------- #
         else:
             input("\n❌ Opção inválida! Tente novamente.\nPressione qualquer tecla para continuar!\n")
             limpar_console()
-            continue  # Volta ao menu [1], [2], [3] (tela anterior)
+            continue  # Volta ao menu [1], [2], [3], [4] (tela anterior)
 
 # A função cadastrar_notas_individual(ra) permanece inalterada pois seu fluxo já é interno.
 
+# --------------------- IMPORTAÇÃO DE NOTAS EM LOTE (CSV) --------------------- #
+def normalizar_texto(texto):
+    # "Matemática" -> "matematica": remove acentos e diferenças de maiúsculas/minúsculas
+    sem_acentos = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+    return sem_acentos.strip().lower()
+
+def ler_nota_csv(texto):
+    nota = float(texto.strip().replace(",", "."))  # Aceita "7,5" (padrão das planilhas em português) e "7.5"
+    if nota < 0 or nota > 10 or nota != nota:
+        raise ValueError("nota fora do intervalo 0-10")
+    return nota
+
+def linhas_csv(caminho, cabecalho):
+    # Lê as linhas de um CSV separado por "," ou ";" (o que aparecer mais na primeira linha) e devolve
+    # (número da linha, colunas), sem as linhas em branco e sem o cabeçalho opcional (primeira coluna == cabecalho)
+    with open(caminho, "r", encoding="utf-8-sig", newline="") as f:
+        primeira_linha = f.readline()
+        separador = ";" if primeira_linha.count(";") > primeira_linha.count(",") else ","
+        f.seek(0)
+        for numero, linha in enumerate(csv.reader(f, delimiter=separador), start=1):
+            if not any(campo.strip() for campo in linha):
+                continue  # Linha em branco
+            if numero == 1 and normalizar_texto(linha[0]) == cabecalho:
+                continue  # Cabeçalho
+            yield numero, linha
+
+def importar_notas_csv(caminho):
+    # Lê um CSV com as colunas RA, Matéria, N1, N2 (separadas por "," ou ";", cabeçalho opcional),
+    # valida todas as linhas e só então aplica as válidas de uma vez, com um único salvamento no final.
+    # Devolve um relatório com as notas aplicadas, os erros por linha e a velocidade da importação.
+    inicio = time.perf_counter()
+    materias = {normalizar_texto(m): m for m in obter_materias_validas()}
+    pendentes = {}  # Chave: (RA, matéria), Valor: média (se o mesmo par aparecer de novo, vale a última linha)
+    erros = []      # Lista de (número da linha, mensagem)
+    linhas_lidas = 0
+
+    # Validação e aplicação com a pasta travada: os RAs conferidos são os mesmos que recebem as notas
+    with alteracao_compartilhada():
+        for numero, linha in linhas_csv(caminho, cabecalho="ra"):
+            linhas_lidas += 1
+            if len(linha) < 4:
+                erros.append((numero, "esperava 4 colunas: RA, Matéria, N1, N2"))
+                continue
+            ra = linha[0].strip().upper()
+            materia = materias.get(normalizar_texto(linha[1]))
+            if ra not in alunos:
+                erros.append((numero, f"RA {ra} não encontrado"))
+                continue
+            if materia is None:
+                erros.append((numero, f"matéria inválida: {linha[1].strip()} (válidas: {', '.join(obter_materias_validas())})"))
+                continue
+            try:
+                n1, n2 = ler_nota_csv(linha[2]), ler_nota_csv(linha[3])
+            except ValueError:
+                erros.append((numero, f"notas inválidas: N1={linha[2].strip()} N2={linha[3].strip()} (devem ser números de 0 a 10)"))
+                continue
+            pendentes[(ra, materia)] = (n1 + n2) / 2  # Média da matéria
+
+        # Aplica todas as notas válidas de uma vez: um único bloco no diário e um único salvamento
+        substituidas = 0
+        for (ra, materia), media in pendentes.items():
+            if notas.obter(ra, materia) is not None:
+                substituidas += 1
+            definir_nota(ra, materia, media, persistir=False)
+        registrar_alteracoes([("NOTA", ra, materia, repr(media)) for (ra, materia), media in pendentes.items()])
+        if pendentes:
+            salvar_alteracoes()
+
+    segundos = time.perf_counter() - inicio
+    return {
+        "linhas": linhas_lidas,
+        "aplicadas": len(pendentes),
+        "substituidas": substituidas,
+        "erros": erros,
+        "segundos": segundos,
+        "linhas_por_segundo": linhas_lidas / segundos if segundos > 0 else 0.0,
+    }
+
+def importar_notas():
+    print("""
+=========================================
+     📥 IMPORTAR NOTAS DE ARQUIVO CSV
+=========================================
+
+Colunas esperadas: RA, Matéria, N1, N2
+Exemplo: F1A2B3;Matemática;7,5;8
+""")
+    caminho = input("📄 Caminho do arquivo CSV (ou '0' para retornar): ").strip().strip('"')
+    if caminho.lower() in sair():
+        limpar_console()
+        return
+
+    try:
+        relatorio = importar_notas_csv(caminho)
+    except (OSError, UnicodeDecodeError, csv.Error) as erro:
+        input(f"\n❌ Não foi possível ler o arquivo: {erro}\nPressione qualquer tecla para continuar!\n")
+        limpar_console()
+        return
+
+    print(f"""
+=========================================
+       ✅ IMPORTAÇÃO CONCLUÍDA
+=========================================
+
+📄 Linhas lidas     : {relatorio['linhas']}
+✏️  Notas aplicadas  : {relatorio['aplicadas']} ({relatorio['substituidas']} substituídas)
+❌ Linhas com erro  : {len(relatorio['erros'])}
+⏱️  Tempo            : {relatorio['segundos']:.3f}s ({relatorio['linhas_por_segundo']:.0f} linhas/s)
+""")
+    for numero, mensagem in relatorio["erros"]:
+        print(f"   Linha {numero}: {mensagem}")
+    input("\nPressione qualquer tecla para continuar!\n")
+    limpar_console()
+
 # --------------------- FUNÇÃO AUXILIAR PARA CADASTRAR NOTAS --------------------- #
 def cadastrar_notas_individual(ra):
     if ra not in alunos:  # Verifica se RA existe
@@ -766,6 +3121,11 @@ def cadastrar_notas_individual(ra):
         return
     
     while True:  # Loop para permitir cadastrar várias notas
+        registro.atualizar()  # Mostra as notas lançadas por outros professores enquanto esta tela estava aberta
+        if ra not in alunos:
+            input("\n❌ Aluno removido por outro usuário.\nPressione qualquer tecla para continuar!\n")
+            limpar_console()
+            return
         info = alunos[ra]  # Pega dados do aluno
         print(f"""
 =========================================
@@ -800,8 +3160,8 @@ Aluno: {info['nome']} | Turma: {info['turma']} | RA: {ra}
         materia = materias[int(materia_input)]  # Seleciona matéria correta
     
         #  Verifica se já existe nota cadastrada
-        if ra in notas and materia in notas[ra] and notas[ra][materia] is not None:
-            nota_existente = notas[ra][materia]
+        if notas.obter(ra, materia) is not None:
+            nota_existente = notas.obter(ra, materia)
             limpar_console()
             print(f"\n⚠️  O aluno {alunos[ra]['nome']} já possui notas cadastradas, sua média em {materia} é {nota_existente:.2f}")
             opcao = input("Deseja substituir as notas existentes? (sim/não): ").strip().lower()
@@ -833,17 +3193,71 @@ Aluno: {info['nome']} | Turma: {info['turma']} | RA: {ra}
                 limpar_console()
                 continue
 
-            media = (n1 + n2) / 2  # Calcula média da matéria
-            if ra not in notas:
-                notas[ra] = {}  # Cria dicionário de notas se não existir
-            notas[ra][materia] = media  # Salva nota
+            media = registro.lancar_notas(ra, materia, n1, n2)  # Calcula a média, grava a nota e salva os arquivos
             print(f"\nA média em {materia} do aluno(a) {alunos[ra]['nome']} é: {media:.2f}")
-            salvar_dados()  # Atualiza arquivo principal
-            salvar_turmas()  # Atualiza arquivos de turmas
             input("Pressione qualquer tecla para continuar!\n")
             limpar_console()
             break  
 
+# --------------------- MONTA O TEXTO DO BOLETIM --------------------- #
+@medido("renderizar_boletim")
+def renderizar_boletim(boletim):
+    # Mesmo texto que os print() da consulta de boletim escreviam na tela
+    ra = boletim["ra"]
+    partes = [f"""
+=========================================
+         BOLETIM DE {boletim['nome'].upper()}
+=========================================
+
+🧑 Nome : {boletim['nome']}
+🆔 RA   : {ra}
+🎓 Turma: {boletim['turma']}
+-----------------------------------------
+\n"""]  # Cabeçalho do boletim
+
+    if boletim["notas"]:  # Verifica se existem notas (o aluno tem linha de notas)
+        partes.append("📌 Notas por matéria:\n\n")
+
+        for materia, media in boletim["notas"].items():
+            if media is not None:  # Se existe nota válida
+                partes.append(f"   {materia:<12} : {media:.2f}\n")  # Nota formatada
+            else:  # Caso não exista nota
+                partes.append(f"   {materia:<12} : N/A\n")
+
+        # Média geral e situação vêm do mesmo cálculo usado nos relatórios (só existem se todas as matérias tiverem nota)
+        if boletim["completo"]:
+            status = "APROVADO ✅" if boletim["status"] == "APROVADO" else "REPROVADO ❌"  # Define status
+            partes.append("\n=========================================\n")
+            partes.append(f"        MÉDIA GERAL : {boletim['media']:.2f}\n")
+            partes.append(f"        STATUS      : {status}\n")
+            partes.append("=========================================\n\n")
+        else:  # Caso faltem notas
+            partes.append("\n=========================================\n")
+            partes.append("   STATUS : MATÉRIAS A SEREM LANÇADAS ⏳\n")
+            partes.append("=========================================\n\n")
+    else:  # Se não houver nenhuma nota cadastrada
+        partes.append("❌ Nenhuma nota cadastrada ainda.\n\n")
+    return "".join(partes)
+
+# --------------------- IDENTIFICA O ALUNO PELO RA OU PELO NOME --------------------- #
+def identificar_aluno(texto):
+    # Aceita o RA ou parte do nome ("ana sil"): devolve o RA do aluno, ou None se nenhum foi encontrado/escolhido
+    registro.atualizar()
+    ra = texto.strip().upper()
+    if ra in alunos:
+        return ra
+    encontrados = registro.buscar(texto)
+    if len(encontrados) <= 1:
+        return encontrados[0]["ra"] if encontrados else None
+
+    print("\n🔎 Alunos encontrados:\n")
+    for numero, aluno in enumerate(encontrados, start=1):
+        print(f"[{numero}] {aluno['nome']:<25} | {aluno['ra']} | Turma {aluno['turma']}")
+    escolha = input("\nDigite o número do aluno (ou Enter para cancelar): ").strip()
+    if escolha.isdigit() and 1 <= int(escolha) <= len(encontrados):
+        return encontrados[int(escolha) - 1]["ra"]
+    return None
+
 # --------------------- CONSULTAR BOLETIM --------------------- #
 def consultar_boletim():
     while True:  # Loop para permitir consultar vários boletins
@@ -852,65 +3266,382 @@ def consultar_boletim():
      📊 CONSULTAR BOLETIM DO ALUNO
 =========================================
 """)  # Cabeçalho da consulta
-        ra = input("🆔 Digite o RA do aluno (ou '0' para retornar ao menu): ").strip().upper()  # Solicita RA
+        texto = input("🆔 Digite o RA ou o nome do aluno (ou '0' para retornar ao menu): ").strip()  # Solicita RA ou nome
         limpar_console()
 
-        if ra.lower() in sair():  # Permite sair
+        if texto.lower() in sair():  # Permite sair
             return
 
-        if ra not in alunos:  # Valida RA
+        ra = identificar_aluno(texto)  # RA digitado ou aluno escolhido pelo nome
+        limpar_console()
+        if ra is None:
             input("\n❌ RA não encontrado.\nPressione qualquer tecla para continuar!\n")
             limpar_console()
             continue  # Repete loop
 
-        info = alunos[ra]  # Pega dados do aluno
-        print(f"""
-=========================================
-         BOLETIM DE {info['nome'].upper()}
-=========================================
-
-🧑 Nome : {info['nome']}
-🆔 RA   : {ra}
-🎓 Turma: {info['turma']}
------------------------------------------
-""")  # Exibe cabeçalho do boletim
-
-
-        if ra in notas and notas[ra]:  # Verifica se existem notas
-            soma_geral = 0  # Soma das médias
-            qtd_materias = 0  # Contador de matérias com nota
-            print("📌 Notas por matéria:\n")
-            
-            for materia in obter_materias_validas():
-                media = notas[ra].get(materia)  # Pega a nota ou None
-                if media is not None:  # Se existe nota válida
-                    print(f"   {materia:<12} : {media:.2f}")  # Exibe nota formatada
-                    soma_geral += media  # Soma para média geral
-                    qtd_materias += 1  # Conta matéria válida
-                else:  # Caso não exista nota
-                    print(f"   {materia:<12} : N/A")  # Exibe N/A
-
-            # Calcula média geral apenas se todas as matérias tiverem nota
-            if qtd_materias == len(obter_materias_validas()):
-                media_geral = soma_geral / qtd_materias  # Calcula média geral
-                status = "APROVADO ✅" if media_geral >= 6 else "REPROVADO ❌"  # Define status
-
-                print("\n=========================================")
-                print(f"        MÉDIA GERAL : {media_geral:.2f}")
-                print(f"        STATUS      : {status}")
-                print("=========================================\n")
-            else:  # Caso faltem notas
-                print("\n=========================================")
-                print("   STATUS : MATÉRIAS A SEREM LANÇADAS ⏳")
-                print("=========================================\n")
-        else:  # Se não houver nenhuma nota cadastrada
-            print("❌ Nenhuma nota cadastrada ainda.\n")
+        print(registro.boletim_formatado(ra), end="")  # Texto montado uma vez e reaproveitado até o aluno mudar
 
         input("Pressione qualquer tecla para continuar!")  # Pausa
         limpar_console()  # Limpa console após exibir boletim
 
+# --------------------- SERVIDOR HTTP DE CONSULTAS --------------------- #
+# Servidor asyncio (somente biblioteca padrão) que atende apenas a própria máquina:
+#   GET  /boletim/<RA>    → boletim do aluno
+#   GET  /turmas          → turmas com alunos
+#   GET  /turmas/<TURMA>  → alunos da turma
+#   POST /notas           → {"ra": ..., "materia": ..., "n1": ..., "n2": ...} lança as notas
+# As consultas usam só a memória. As notas são gravadas no diário/banco na hora, e os arquivos de
+# relatório são regravados em uma thread separada, agrupando as alterações de ATRASO_SALVAMENTO_HTTP segundos.
+HOST_SERVIDOR = "127.0.0.1"
+PORTA_SERVIDOR = 8080
+ATRASO_SALVAMENTO_HTTP = 1.0  # Segundos esperando mais alterações antes de regravar os arquivos
+TAMANHO_MAXIMO_CORPO = 64 * 1024  # Maior corpo de requisição aceito (bytes)
+ESPERA_TRAVA_HTTP = 0.01  # Segundos entre as tentativas de travar a pasta quando outro processo está com ela
+MOTIVOS_HTTP = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+                431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+class ServidorEscolar:
+    def __init__(self, host=HOST_SERVIDOR, porta=PORTA_SERVIDOR):
+        self.host = host
+        self.porta = porta
+        self.trava_escrita = None      # asyncio.Lock: alterações esperam enquanto os arquivos são regravados
+        self.alteracao_pendente = None  # asyncio.Event: avisa a tarefa de salvamento
+        self.servidor = None
+
+    # ------------------- Rotas ------------------- #
+    def rota_get(self, partes):
+        if len(partes) == 2 and partes[0] == "boletim":
+            return 200, registro.boletim(partes[1])
+        if partes == ["turmas"]:
+            return 200, {"turmas": registro.turmas()}
+        if len(partes) == 2 and partes[0] == "busca":
+            return 200, {"alunos": registro.buscar(unquote(partes[1]))}
+        if partes == ["cache"]:
+            return 200, registro.estatisticas_cache()
+        if partes == ["metricas"]:
+            return 200, registro.metricas()
+        if len(partes) == 2 and partes[0] == "turmas":
+            return 200, {"turma": partes[1].upper(), "alunos": registro.listar_turma(partes[1])}
+        return 404, {"erro": "Rota não encontrada."}
+
+    async def rota_post(self, partes, corpo):
+        if partes != ["notas"]:
+            return 404, {"erro": "Rota não encontrada."}
+        try:
+            dados = json.loads(corpo or b"{}")
+            if not isinstance(dados, dict):
+                raise TypeError("o corpo deve ser um objeto JSON")
+            ra, materia, n1, n2 = dados["ra"], dados["materia"], float(dados["n1"]), float(dados["n2"])
+            if not isinstance(ra, str) or not isinstance(materia, str):
+                raise TypeError("RA e matéria devem ser textos")
+        except (ValueError, KeyError, TypeError):
+            return 400, {"erro": 'Envie {"ra": ..., "materia": ..., "n1": ..., "n2": ...}.'}
+        async with self.trava_escrita:  # Não altera os dados enquanto a thread de salvamento lê
+            media = await self.com_pasta_travada(registro.lancar_notas, ra, materia, n1, n2)
+        self.alteracao_pendente.set()
+        return 200, {"ra": ra.strip().upper(), "media": media}
+
+    async def com_pasta_travada(self, funcao, *argumentos):
+        # Executa "funcao" com a pasta travada sem bloquear o laço de eventos: se outro processo (ex: um lote ou
+        # uma compactação) estiver com a pasta, as outras conexões continuam sendo atendidas enquanto espera
+        while True:
+            try:
+                with trava_da_pasta(esperar=False):
+                    return funcao(*argumentos)  # As travas aninhadas dentro de "funcao" já são deste processo
+            except PastaOcupada:
+                await asyncio.sleep(ESPERA_TRAVA_HTTP)
+
+    # ------------------- Protocolo HTTP/1.1 ------------------- #
+    async def atender(self, leitor, escritor):
+        try:
+            while True:  # Conexão mantida aberta (keep-alive) até o cliente encerrar
+                try:
+                    linha = await leitor.readline()
+                    if not linha:
+                        break
+                    cabecalhos = {}
+                    while True:
+                        linha_cabecalho = await leitor.readline()
+                        if linha_cabecalho in (b"\r\n", b"\n", b""):
+                            break
+                        nome, _, valor = linha_cabecalho.decode("latin-1").partition(":")
+                        cabecalhos[nome.strip().lower()] = valor.strip()
+                except ValueError:
+                    # Linha da requisição ou cabeçalho maior que o limite do leitor (64 KiB): responde e encerra
+                    await self.responder(escritor, 431, {"erro": "Requisição ou cabeçalho muito grande."}, True)
+                    break
+                try:
+                    metodo, caminho, versao = linha.decode("latin-1").split()
+                except ValueError:
+                    break  # Requisição malformada: encerra a conexão
+                try:
+                    tamanho = int(cabecalhos.get("content-length", 0) or 0)
+                    if tamanho < 0:
+                        raise ValueError("tamanho negativo")
+                except ValueError:
+                    # Sem um tamanho válido não há como saber onde o corpo termina: responde e encerra a conexão
+                    await self.responder(escritor, 400, {"erro": "Content-Length inválido."}, True)
+                    break
+                if tamanho > TAMANHO_MAXIMO_CORPO:
+                    await self.responder(escritor, 413, {"erro": "Corpo muito grande."}, True)
+                    break
+                corpo = await leitor.readexactly(tamanho) if tamanho else b""
+
+                partes = [parte for parte in caminho.split("?")[0].split("/") if parte]
+                try:
+                    if metodo == "GET":
+                        if obter_armazenamento().ha_alteracoes_externas() and not self.trava_escrita.locked():
+                            # Outro processo gravou: sincroniza sem disputar a memória com a thread de salvamento.
+                            # Consultas nunca esperam: com a pasta ou a memória ocupadas, respondem com os dados
+                            # já carregados e uma das próximas consultas sincroniza
+                            async with self.trava_escrita:
+                                try:
+                                    with trava_da_pasta(esperar=False):
+                                        obter_armazenamento().sincronizar()
+                                except PastaOcupada:
+                                    pass
+                        status, resposta = self.rota_get(partes)
+                    elif metodo == "POST":
+                        status, resposta = await self.rota_post(partes, corpo)
+                    else:
+                        status, resposta = 405, {"erro": "Método não permitido."}
+                except AlunoNaoEncontrado as erro:
+                    status, resposta = 404, {"erro": str(erro)}
+                except ErroRegistro as erro:
+                    status, resposta = 400, {"erro": str(erro)}
+                except Exception as erro:
+                    # Erro inesperado: o cliente recebe uma resposta e o servidor continua atendendo
+                    print(f"⚠️ Erro ao atender {metodo} {caminho}: {erro!r}", file=sys.stderr)
+                    status, resposta = 500, {"erro": "Erro interno do servidor."}
+
+                fechar = cabecalhos.get("connection", "").lower() == "close" or versao == "HTTP/1.0"
+                await self.responder(escritor, status, resposta, fechar)
+                if fechar:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Cliente desconectou no meio da requisição
+        finally:
+            escritor.close()
+
+    async def responder(self, escritor, status, resposta, fechar):
+        corpo = json.dumps(resposta, ensure_ascii=False).encode("utf-8")
+        escritor.write(
+            f"HTTP/1.1 {status} {MOTIVOS_HTTP[status]}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(corpo)}\r\n"
+            f"Connection: {'close' if fechar else 'keep-alive'}\r\n\r\n".encode("latin-1") + corpo)
+        await escritor.drain()
+
+    # ------------------- Salvamento em segundo plano ------------------- #
+    async def salvar_periodicamente(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.alteracao_pendente.wait()
+            await asyncio.sleep(ATRASO_SALVAMENTO_HTTP)  # Junta as alterações que chegarem nesse intervalo
+            async with self.trava_escrita:
+                self.alteracao_pendente.clear()
+                # Regrava os arquivos em outra thread: as consultas continuam sendo atendidas enquanto isso
+                await loop.run_in_executor(None, salvar_pendentes)
+                await loop.run_in_executor(None, exportar_metricas)
+
+    async def executar(self, pronto=None):
+        registro.carregar()
+        registro.sincronizar_leituras = False  # As consultas sincronizam aqui, junto com a trava de escrita
+        salvamento_adiado["ativo"] = True
+        self.trava_escrita = asyncio.Lock()
+        self.alteracao_pendente = asyncio.Event()
+        self.servidor = await asyncio.start_server(self.atender, self.host, self.porta)
+        self.porta = self.servidor.sockets[0].getsockname()[1]  # Porta real (quando 0 foi pedida)
+        tarefa_salvamento = asyncio.create_task(self.salvar_periodicamente())
+        if pronto:
+            pronto(self)
+        try:
+            async with self.servidor:
+                await self.servidor.serve_forever()
+        finally:
+            tarefa_salvamento.cancel()
+            salvamento_adiado["ativo"] = False
+            salvar_pendentes()
+
+def iniciar_servidor(porta=PORTA_SERVIDOR):
+    servidor = ServidorEscolar(porta=porta)
+    try:
+        asyncio.run(servidor.executar(lambda s: print(f"Servidor em http://{s.host}:{s.porta} (Ctrl+C para encerrar)", flush=True)))
+    except KeyboardInterrupt:
+        pass
+    registro.salvar()  # Incorpora o diário e grava tudo antes de encerrar
+    exportar_metricas()
+
+# --------------------- MODO SEM MENUS (LINHA DE COMANDO) --------------------- #
+# Exemplos:
+#   python "PIM II - Sistema Escolar.py" registrar "Ana Silva" 9A
+#   python "PIM II - Sistema Escolar.py" nota F1A2B3 Matematica 7,5 8
+#   python "PIM II - Sistema Escolar.py" lote < comandos.txt   (um comando por linha)
+# Cada comando responde uma linha JSON: {"ok": true, ...} ou {"ok": false, "erro": "..."}.
+TAMANHO_BLOCO_LOTE = 1000  # Linhas do lote, no máximo, gravadas juntas no diário/banco
+
+class AnalisadorComandos(argparse.ArgumentParser):
+    def error(self, message):
+        raise ErroRegistro(message)  # Comando inválido vira uma resposta de erro, sem encerrar o lote
+
+def criar_analisador_comandos():
+    analisador = AnalisadorComandos(prog="sistema_escolar", description="Sistema escolar sem menus.")
+    analisador.add_argument("--pasta", default=".", help="pasta onde ficam dados_escolares/ e turmas/")
+    analisador.add_argument("--armazenamento", choices=["texto", "sqlite", "particionado"], help="armazenamento dos dados")
+    analisador.add_argument("--metricas", metavar="ARQUIVO", help="liga as métricas e grava em ARQUIVO (.json ou .prom)")
+    comandos = analisador.add_subparsers(dest="comando", required=True)
+    comando = comandos.add_parser("registrar", help="cadastra um aluno")
+    comando.add_argument("nome")
+    comando.add_argument("turma")
+    comando = comandos.add_parser("nota", help="lança as notas N1 e N2 de uma matéria")
+    comando.add_argument("ra")
+    comando.add_argument("materia")
+    comando.add_argument("n1")
+    comando.add_argument("n2")
+    comando = comandos.add_parser("boletim", help="mostra o boletim de um aluno")
+    comando.add_argument("ra")
+    comando = comandos.add_parser("listar", help="lista os alunos (de uma turma ou de todas)")
+    comando.add_argument("turma", nargs="?")
+    comando = comandos.add_parser("buscar", help="procura alunos pelo nome (início das palavras, sem acentos)")
+    comando.add_argument("nome", nargs="+")
+    comando = comandos.add_parser("remover", help="remove um aluno")
+    comando.add_argument("ra")
+    comando = comandos.add_parser("exportar", help="gera os relatórios .txt desatualizados")
+    comando.add_argument("--todos", action="store_true", help="regrava todos, inclusive o alunos.txt")
+    comandos.add_parser("verificar", help="confere as médias acumuladas com um recálculo completo")
+    comandos.add_parser("lote", help="lê um comando por linha da entrada padrão")
+    comando = comandos.add_parser("servidor", help=f"inicia o servidor HTTP de consultas em {HOST_SERVIDOR}")
+    comando.add_argument("--porta", type=int, default=PORTA_SERVIDOR)
+    return analisador
+
+def executar_comando(argumentos):
+    # Executa um comando já analisado e devolve o dicionário da resposta
+    if argumentos.comando == "registrar":
+        return {"ra": registro.registrar(argumentos.nome, argumentos.turma)}
+    if argumentos.comando == "nota":
+        try:
+            n1, n2 = float(argumentos.n1.replace(",", ".")), float(argumentos.n2.replace(",", "."))
+        except ValueError:
+            raise ErroRegistro("Digite apenas números para as notas.")
+        return {"ra": argumentos.ra.upper(), "media": registro.lancar_notas(argumentos.ra, argumentos.materia, n1, n2)}
+    if argumentos.comando == "boletim":
+        return registro.boletim(argumentos.ra)
+    if argumentos.comando == "listar":
+        turmas = [argumentos.turma.upper()] if argumentos.turma else registro.turmas()
+        return {"turmas": {turma: registro.listar_turma(turma) for turma in turmas}}
+    if argumentos.comando == "buscar":
+        return {"alunos": registro.buscar(" ".join(argumentos.nome))}
+    if argumentos.comando == "remover":
+        registro.remover(argumentos.ra)
+        return {"ra": argumentos.ra.upper()}
+    if argumentos.comando == "exportar":
+        if argumentos.todos:
+            registro.carregar()
+            exportar_relatorios()
+            return {}
+        return {"relatorios_gerados": registro.gerar_relatorios()}
+    if argumentos.comando == "verificar":
+        divergencias = registro.verificar_medias()
+        if divergencias:
+            raise ErroRegistro(f"{len(divergencias)} média(s) acumulada(s) diferente(s) do recálculo: "
+                               + "; ".join(f"{d['tipo']} {d['nome']}: {d['esperado']} != {d['obtido']}" for d in divergencias))
+        return {"divergencias": 0}
+    raise ErroRegistro(f"comando não permitido aqui: {argumentos.comando}")
+
+def responder(resultado):
+    sys.stdout.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+
+def executar_linha_de_comando(lista_argumentos, entrada=None):
+    # Devolve o código de saída: 0 se todos os comandos deram certo, 1 se algum falhou
+    analisador = criar_analisador_comandos()
+    try:
+        argumentos = analisador.parse_args(lista_argumentos)
+    except ErroRegistro as erro:
+        responder({"ok": False, "erro": str(erro)})
+        return 1
+    if argumentos.armazenamento:
+        global BACKEND_ARMAZENAMENTO
+        BACKEND_ARMAZENAMENTO = argumentos.armazenamento
+    registro.pasta = argumentos.pasta
+    if argumentos.metricas:
+        ativar_metricas(argumentos.metricas)
+    try:
+        return executar_argumentos(analisador, argumentos, entrada)
+    finally:
+        exportar_metricas()
+
+def executar_argumentos(analisador, argumentos, entrada):
+    # Executa o comando já analisado (ou cada linha do lote) e devolve o código de saída
+    if argumentos.comando == "servidor":
+        iniciar_servidor(argumentos.porta)
+        return 0
+
+    if argumentos.comando != "lote":
+        try:
+            responder({"ok": True, **executar_comando(argumentos)})
+            return 0
+        except ErroRegistro as erro:
+            responder({"ok": False, "erro": str(erro)})
+            return 1
+
+    # Cada bloco de linhas é gravado no diário/banco antes das respostas, então um "ok" nunca se perde se o
+    # lote for interrompido; a pasta só fica travada enquanto o bloco é aplicado, nunca esperando a entrada.
+    # Os arquivos de alunos, matérias e turmas ficam para o final, com um único salvamento.
+    falhas = numero = 0
+    registro.carregar()
+    salvamento_adiado["ativo"] = True
+    try:
+        for bloco in blocos_do_lote(entrada):
+            respostas = []
+            with registro.lote():
+                for linha in bloco:
+                    numero += 1
+                    try:
+                        partes = shlex.split(linha, comments=True)
+                        if not partes:
+                            continue  # Linha vazia ou comentário (#)
+                        resposta = {"ok": True, "linha": numero, **executar_comando(analisador.parse_args(partes))}
+                    except ValueError as erro:  # ErroRegistro (ErroRegistro herda de ValueError) ou aspas sem fechamento
+                        resposta = {"ok": False, "linha": numero, "erro": str(erro)}
+                        falhas += 1
+                    respostas.append(resposta)
+            for resposta in respostas:
+                responder(resposta)
+            sys.stdout.flush()  # Quem enviou as linhas recebe as respostas sem esperar o fim da entrada
+    finally:
+        salvamento_adiado["ativo"] = False
+        salvar_pendentes()
+    return 1 if falhas else 0
+
+def blocos_do_lote(entrada=None):
+    # Agrupa as linhas do lote com as que já chegaram (no máximo TAMANHO_BLOCO_LOTE por bloco), sem nunca esperar
+    # a próxima linha com um bloco em aberto: quem envia uma linha e aguarda a resposta a recebe na hora, e uma
+    # entrada redirecionada de um arquivo é aplicada em blocos cheios
+    if entrada is not None:
+        bloco = []
+        for linha in entrada:
+            bloco.append(linha)
+            if len(bloco) == TAMANHO_BLOCO_LOTE:
+                yield bloco
+                bloco = []
+        if bloco:
+            yield bloco
+        return
+    codificacao, resto = sys.stdin.encoding or "utf-8", b""
+    while True:
+        dados = os.read(sys.stdin.fileno(), 1 << 16)  # Devolve o que já chegou; só espera quando não há nada
+        if not dados:
+            break
+        *linhas, resto = (resto + dados).split(b"\n")
+        for inicio in range(0, len(linhas), TAMANHO_BLOCO_LOTE):
+            yield [linha.decode(codificacao) for linha in linhas[inicio:inicio + TAMANHO_BLOCO_LOTE]]
+    if resto:
+        yield [resto.decode(codificacao)]  # Última linha sem quebra de linha no final
+
 # --------------------- INICIA O PROGRAMA A PRIMEIRA VEZ NA MAIN --------------------- #
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(executar_linha_de_comando(sys.argv[1:]))  # Modo sem menus
     main()
 
 # --------------------- LOOP PRINCIPAL --------------------- #
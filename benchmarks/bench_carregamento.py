@@ -0,0 +1,57 @@
+# Mede o tempo de carregamento do "alunos.txt" para escolas de tamanhos crescentes.
+# Se o carregamento for linear, o tempo por aluno (última coluna) fica praticamente constante.
+# Uso: python benchmarks/bench_carregamento.py [quantidades...]
+
+import importlib.util  # Importa importlib, utilizado para carregar o programa principal (o nome do arquivo tem espaços)
+import os              # Importa o módulo OS para manipulação de arquivos e pastas
+import sys             # Importa sys, utilizado para ler as quantidades passadas na linha de comando
+import tempfile        # Importa tempfile, utilizado para criar uma pasta descartável para cada medição
+import time            # Importa time, utilizado para medir o tempo de carregamento
+
+PROGRAMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PIM II - Sistema Escolar.py")
+
+# --------------------- CARREGA UMA CÓPIA NOVA DO PROGRAMA --------------------- #
+def importar_sistema():
+    # Cada medição usa um módulo novo, para começar com os dicionários vazios
+    spec = importlib.util.spec_from_file_location("sistema_escolar_bench", PROGRAMA)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    modulo.preparar_pastas()  # Cria as pastas de dados dentro da pasta atual (temporária)
+    return modulo
+
+# --------------------- GERA UM "alunos.txt" COM N ALUNOS --------------------- #
+def gerar_arquivo(qtd_alunos):
+    sistema = importar_sistema()
+    materias = sistema.obter_materias_validas()
+    for i in range(qtd_alunos):
+        ra = f"F{i:05X}"
+        sistema.adicionar_aluno(ra, f"Aluno Numero{i}", sistema.turmasfixas()[i % 3], persistir=False)
+        for j, materia in enumerate(materias):
+            sistema.definir_nota(ra, materia, float((i + j) % 11), persistir=False)
+    sistema.salvar_arquivo_alunos(os.path.join(sistema.PASTA_ARQUIVOS, "alunos.txt"))
+
+# --------------------- MEDE O CARREGAMENTO DO TEXTO --------------------- #
+def medir_carregamento():
+    sistema = importar_sistema()
+    inicio = time.perf_counter()
+    sistema.carregar_arquivo_texto(os.path.join(sistema.PASTA_ARQUIVOS, "alunos.txt"))
+    return time.perf_counter() - inicio, len(sistema.alunos)
+
+def main():
+    quantidades = [int(q) for q in sys.argv[1:]] or [1000, 2000, 4000, 8000, 16000, 32000]
+    pasta_original = os.getcwd()
+    print(f"{'ALUNOS':>8} | {'TEMPO (s)':>10} | {'µs POR ALUNO':>12}")
+    print("-" * 38)
+    for qtd in quantidades:
+        with tempfile.TemporaryDirectory() as pasta:
+            os.chdir(pasta)
+            try:
+                gerar_arquivo(qtd)
+                tempo, carregados = medir_carregamento()
+            finally:
+                os.chdir(pasta_original)
+        assert carregados == qtd, f"esperava {qtd} alunos, carregou {carregados}"
+        print(f"{qtd:>8} | {tempo:>10.4f} | {tempo / qtd * 1e6:>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# Teste de carga do servidor HTTP de consultas: cria uma escola sintética em uma pasta temporária,
+# inicia o servidor em outro processo e dispara requisições de vários clientes ao mesmo tempo.
+# Mostra requisições por segundo e as latências p50/p99 (90% boletins, 5% turmas, 5% lançamento de notas).
+# Uso: python benchmarks/carga_http.py [--alunos 2000] [--clientes 50] [--requisicoes 20000]
+
+import argparse        # Importa argparse, utilizado para ler as opções do teste
+import asyncio         # Importa asyncio, utilizado para simular vários clientes ao mesmo tempo
+import json            # Importa json, utilizado para ler as respostas e montar o corpo das notas
+import os              # Importa o módulo OS para montar caminhos
+import random          # Importa random, utilizado para sortear alunos e operações
+import socket          # Importa socket, utilizado para escolher uma porta livre
+import subprocess      # Importa subprocess, utilizado para iniciar o servidor em outro processo
+import sys             # Importa sys, utilizado para chamar o mesmo interpretador Python
+import tempfile        # Importa tempfile, utilizado para criar uma pasta descartável para os dados
+import time            # Importa time, utilizado para medir as latências
+
+PROGRAMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PIM II - Sistema Escolar.py")
+MATERIAS = ["Matematica", "Portugues", "Historia", "Geografia"]
+
+# --------------------- ESCOLA SINTÉTICA (MODO LOTE) --------------------- #
+def criar_escola(pasta, qtd_alunos):
+    nomes = ["Ana", "Bruno", "Carla", "Davi", "Eva", "Fabio", "Gina", "Hugo"]
+    comandos = "".join(f'registrar "{random.choice(nomes)} Silva" 9{"ABC"[i % 3]}\n' for i in range(qtd_alunos))
+    saida = subprocess.run([sys.executable, PROGRAMA, "--pasta", pasta, "lote"], input=comandos,
+                           capture_output=True, text=True, check=True).stdout
+    return [json.loads(linha)["ra"] for linha in saida.splitlines()]
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+# --------------------- CLIENTE HTTP MÍNIMO (KEEP-ALIVE) --------------------- #
+async def requisitar(leitor, escritor, metodo, caminho, corpo=b""):
+    escritor.write(f"{metodo} {caminho} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(corpo)}\r\n\r\n".encode() + corpo)
+    await escritor.drain()
+    status = int((await leitor.readline()).split()[1])
+    tamanho = 0
+    while True:
+        linha = await leitor.readline()
+        if linha == b"\r\n":
+            break
+        if linha.lower().startswith(b"content-length:"):
+            tamanho = int(linha.split(b":")[1])
+    await leitor.readexactly(tamanho)
+    return status
+
+async def cliente(porta, ras, quantidade, latencias, erros):
+    leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+    for _ in range(quantidade):
+        sorteio = random.random()
+        if sorteio < 0.90:
+            metodo, caminho, corpo = "GET", f"/boletim/{random.choice(ras)}", b""
+        elif sorteio < 0.95:
+            metodo, caminho, corpo = "GET", f"/turmas/9{random.choice('ABC')}", b""
+        else:
+            dados = {"ra": random.choice(ras), "materia": random.choice(MATERIAS),
+                     "n1": random.randint(0, 10), "n2": random.randint(0, 10)}
+            metodo, caminho, corpo = "POST", "/notas", json.dumps(dados).encode()
+        inicio = time.perf_counter()
+        status = await requisitar(leitor, escritor, metodo, caminho, corpo)
+        latencias.append(time.perf_counter() - inicio)
+        if status != 200:
+            erros.append(status)
+    escritor.close()
+
+async def disparar(porta, ras, clientes, requisicoes):
+    latencias, erros = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(porta, ras, requisicoes // clientes, latencias, erros) for _ in range(clientes)))
+    return time.perf_counter() - inicio, latencias, erros
+
+async def aguardar_servidor(porta, limite=30):
+    fim = time.monotonic() + limite
+    while True:
+        try:
+            _, escritor = await asyncio.open_connection("127.0.0.1", porta)
+            escritor.close()
+            return
+        except OSError:
+            if time.monotonic() > fim:
+                raise
+            await asyncio.sleep(0.1)
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+def main():
+    opcoes = argparse.ArgumentParser(description=__doc__)
+    opcoes.add_argument("--alunos", type=int, default=2000)
+    opcoes.add_argument("--clientes", type=int, default=50)
+    opcoes.add_argument("--requisicoes", type=int, default=20000)
+    opcoes = opcoes.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        ras = criar_escola(pasta, opcoes.alunos)
+        porta = porta_livre()
+        servidor = subprocess.Popen([sys.executable, PROGRAMA, "--pasta", pasta, "servidor", "--porta", str(porta)],
+                                    stdout=subprocess.DEVNULL)
+        try:
+            asyncio.run(aguardar_servidor(porta))
+            tempo, latencias, erros = asyncio.run(disparar(porta, ras, opcoes.clientes, opcoes.requisicoes))
+        finally:
+            servidor.terminate()
+            servidor.wait()
+
+    print(f"Alunos: {opcoes.alunos} | Clientes simultâneos: {opcoes.clientes} | Requisições: {len(latencias)}")
+    print(f"Requisições por segundo: {len(latencias) / tempo:.0f}")
+    print(f"Latência p50: {percentil(latencias, 50) * 1000:.2f} ms | p99: {percentil(latencias, 99) * 1000:.2f} ms")
+    print(f"Respostas com erro: {len(erros)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+# Suíte de desempenho: gera escolas sintéticas de tamanhos crescentes e mede as operações principais
+# (carregar_dados, salvar_dados, salvar_turmas, listar_alunos e gerar_ra), com o pico de memória do processo.
+# Cada tamanho é medido em um processo novo, para que a memória de uma medição não se misture com a da outra.
+# Uso:
+#   python benchmarks/suite_desempenho.py                                   (1 mil, 10 mil, 100 mil e 1 milhão de alunos)
+#   python benchmarks/suite_desempenho.py --alunos 1000 10000 --saida novo.json
+#   python benchmarks/suite_desempenho.py --comparar base.json --limite 0.25 (falha se alguma operação ficar 25% mais lenta)
+
+import argparse        # Importa argparse, utilizado para ler as opções da suíte
+import contextlib      # Importa contextlib, utilizado para descartar a saída de listar_alunos
+import importlib.util  # Importa importlib, utilizado para carregar o programa principal (o nome do arquivo tem espaços)
+import json            # Importa json, utilizado para gravar e comparar os resultados
+import os              # Importa o módulo OS para montar caminhos
+import platform        # Importa platform, utilizado para registrar onde a medição foi feita
+import random          # Importa random, utilizado para sortear nomes, turmas e notas
+import subprocess      # Importa subprocess, utilizado para medir cada tamanho em um processo novo
+import sys             # Importa sys, utilizado para chamar o mesmo interpretador Python
+import tempfile        # Importa tempfile, utilizado para criar uma pasta descartável para cada escola
+import time            # Importa time, utilizado para medir o tempo das operações
+
+try:
+    import resource    # Pico de memória do processo (Linux/Mac)
+except ImportError:
+    resource = None    # No Windows o pico de memória fica como null nos resultados
+
+PROGRAMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PIM II - Sistema Escolar.py")
+MATERIAS_DO_SISTEMA = ["Matematica", "Portugues", "Historia", "Geografia"]
+MATERIAS_EXTRAS = ["Ciencias", "Ingles", "Artes", "Fisica", "Quimica", "Biologia", "Filosofia", "Sociologia"]
+PRIMEIROS_NOMES = ["Ana", "Bruno", "Carla", "Davi", "Eva", "Fabio", "Gina", "Hugo", "Iara", "Joao", "Lara", "Mateus"]
+SOBRENOMES = ["Silva", "Souza", "Costa", "Lima", "Rocha", "Alves", "Nunes", "Dias", "Pereira", "Ramos"]
+CARACTERES_RA = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+OPERACOES = ["carregar_dados_texto", "salvar_dados", "carregar_dados_binario", "salvar_turmas", "listar_alunos", "gerar_ra"]
+CHAMADAS_GERAR_RA = 1000  # gerar_ra é medido em um bloco de chamadas (o tempo de uma só seria ruído)
+
+# --------------------- ESCOLA SINTÉTICA --------------------- #
+def nomes_das_materias(quantidade):
+    # As 4 matérias do sistema vêm primeiro; as demais só existem na escola sintética
+    return (MATERIAS_DO_SISTEMA + MATERIAS_EXTRAS)[:quantidade]
+
+def nomes_das_turmas(quantidade):
+    return [f"{i // 26 + 1}{CARACTERES_RA[i % 26]}" for i in range(quantidade)]  # 1A, 1B, ..., 1Z, 2A, ...
+
+def gerar_escola(pasta, qtd_alunos, qtd_turmas, materias, preenchimento, semente):
+    # Grava um "alunos.txt" no mesmo formato do sistema, sem passar pelo programa (a geração não entra na medição)
+    sorteio = random.Random(semente)
+    turmas = nomes_das_turmas(qtd_turmas)
+    ras = ["F" + "".join(CARACTERES_RA[(n // 36 ** k) % 36] for k in range(4, -1, -1))
+           for n in sorteio.sample(range(36 ** 5), qtd_alunos)]
+    por_turma = {turma: [] for turma in turmas}
+    for i, ra in enumerate(ras):
+        nome = f"{sorteio.choice(PRIMEIROS_NOMES)} {sorteio.choice(SOBRENOMES)}"
+        por_turma[turmas[i % qtd_turmas]].append((nome, ra))
+
+    os.makedirs(os.path.join(pasta, "dados_escolares"))
+    with open(os.path.join(pasta, "dados_escolares", "alunos.txt"), "w", encoding="utf-8", newline="\n") as f:
+        f.write("© Todos os direitos reservados TecMais LTDA - 2025\n" + "=" * 60 + "\n\n")
+        for turma in turmas:
+            f.write(f"===== TURMA {turma} =====\n\n")
+            for nome, ra in sorted(por_turma[turma]):
+                linha = [f"Aluno: {nome} | RA: {ra} | Turma: {turma}\n"]
+                valores = [round(sorteio.uniform(0, 10), 2) if sorteio.random() < preenchimento else None
+                           for _ in materias]
+                linha += [f"{m}: {v:.2f} | " if v is not None else f"{m}: N/A | " for m, v in zip(materias, valores)]
+                completo = all(v is not None for v in valores)
+                linha.append(f"Média geral: {sum(valores) / len(valores):.2f}\n" if completo else "Média geral: N/A\n")
+                f.write("".join(linha) + "-" * 60 + "\n")
+
+# --------------------- MEDIÇÃO (PROCESSO FILHO) --------------------- #
+def pico_memoria_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(pico / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # Mac: bytes; Linux: KiB
+
+def medir_tamanho(pasta, materias):
+    # Executa as operações em sequência sobre a escola gerada em "pasta" e devolve {operação: medição}
+    spec = importlib.util.spec_from_file_location("sistema_escolar_suite", PROGRAMA)
+    sistema = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sistema)
+    # Matérias da escola sintética no lugar da lista fixa do sistema (a matriz de notas é recriada com elas)
+    sistema.obter_materias_validas = lambda: list(materias)
+    sistema.notas = sistema.MatrizNotas(materias)
+    sistema.RELATORIOS_SOB_DEMANDA = False  # Mede a gravação das matérias e turmas, como nas execuções anteriores
+    sistema.definir_pasta_base(pasta)
+    medicoes = {"inicio": {"pico_memoria_mb": pico_memoria_mb()}}
+
+    def medir(nome, operacao):
+        inicio = time.perf_counter()
+        operacao()
+        medicoes[nome] = {"segundos": round(time.perf_counter() - inicio, 6), "pico_memoria_mb": pico_memoria_mb()}
+
+    def marcar_tudo():
+        # Tudo alterado: as gravações medidas regravam todos os arquivos, não só as diferenças
+        sistema.alunos_alterados.update(sistema.alunos)
+        sistema.materias_alteradas.update(materias)
+        sistema.turmas_alteradas.update(sistema.indice_turmas)
+
+    def recarregar():
+        sistema.limpar_memoria()
+        sistema.estado_carregamento["carregado"] = False
+        sistema.carregar_dados()
+
+    def listar():
+        with open(os.devnull, "w", encoding="utf-8") as descarte, contextlib.redirect_stdout(descarte):
+            sistema.listar_alunos()
+
+    def gerar_ras():
+        for _ in range(CHAMADAS_GERAR_RA):
+            sistema.gerar_ra()
+
+    sistema.input = lambda *args: ""  # listar_alunos espera o Enter do professor no final
+    medir("carregar_dados_texto", sistema.carregar_dados)  # Primeira leitura: só existe o "alunos.txt"
+    marcar_tudo()
+    medir("salvar_dados", lambda: sistema.salvar_dados(compactar=True))  # Grava texto, binário, índice e matérias
+    medir("carregar_dados_binario", recarregar)  # Agora o instantâneo binário está atualizado
+    marcar_tudo()
+    medir("salvar_turmas", sistema.salvar_turmas)
+    medir("listar_alunos", listar)
+    medir("gerar_ra", gerar_ras)
+    return medicoes
+
+# --------------------- EXECUÇÃO DA SUÍTE (PROCESSO PRINCIPAL) --------------------- #
+def parametros_da_escola(opcoes):
+    return {"turmas": opcoes.turmas, "materias": nomes_das_materias(opcoes.materias),
+            "preenchimento": opcoes.preenchimento, "semente": opcoes.semente, "chamadas_gerar_ra": CHAMADAS_GERAR_RA}
+
+def medir_em_processo_novo(qtd, parametros):
+    # Gera a escola em uma pasta descartável e mede em outro processo; devolve {operação: medição}
+    with tempfile.TemporaryDirectory() as pasta:
+        gerar_escola(pasta, qtd, parametros["turmas"], parametros["materias"], parametros["preenchimento"],
+                     parametros["semente"] + qtd)
+        saida = subprocess.run([sys.executable, os.path.abspath(__file__), "--medir", pasta,
+                                "--lista-materias", ",".join(parametros["materias"])],
+                               capture_output=True, text=True)
+    if saida.returncode != 0:
+        sys.stderr.write(saida.stderr)
+        raise SystemExit(f"A medição com {qtd} alunos falhou.")
+    return json.loads(saida.stdout.splitlines()[-1])
+
+def executar_suite(opcoes):
+    parametros = parametros_da_escola(opcoes)
+    resultados = {}
+    for qtd in opcoes.alunos:
+        print(f"{qtd:>9} alunos ({opcoes.repeticoes} repetições)...", flush=True)
+        # Cada repetição começa de uma escola idêntica (mesma semente); vale o menor tempo de cada operação,
+        # que é o menos afetado por outros programas, e o maior pico de memória
+        repeticoes = [medir_em_processo_novo(qtd, parametros) for _ in range(opcoes.repeticoes)]
+        resultados[str(qtd)] = {}
+        for operacao in OPERACOES:
+            picos = [r[operacao]["pico_memoria_mb"] for r in repeticoes if r[operacao]["pico_memoria_mb"] is not None]
+            resultados[str(qtd)][operacao] = {"segundos": min(r[operacao]["segundos"] for r in repeticoes),
+                                              "pico_memoria_mb": max(picos) if picos else None}
+        mostrar_tamanho(qtd, resultados[str(qtd)])
+    return {
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": parametros,
+        "repeticoes": opcoes.repeticoes,
+        "resultados": resultados,
+    }
+
+def mostrar_tamanho(qtd, medicoes):
+    print(f"{'OPERAÇÃO':<24} | {'TEMPO (s)':>10} | {'PICO MEM. (MB)':>14}")
+    print("-" * 55)
+    for operacao in OPERACOES:
+        medicao = medicoes[operacao]
+        pico = "-" if medicao["pico_memoria_mb"] is None else f"{medicao['pico_memoria_mb']:.1f}"
+        print(f"{operacao:<24} | {medicao['segundos']:>10.4f} | {pico:>14}")
+    print()
+
+# --------------------- COMPARAÇÃO COM UMA EXECUÇÃO ANTERIOR --------------------- #
+def comparar(base, atual, limite, minimo):
+    # Regressão: operação mais lenta que a base além de "limite" (fração) e de "minimo" segundos (ruído)
+    regressoes = []
+    for qtd, medicoes in atual["resultados"].items():
+        for operacao in OPERACOES:
+            antes = base.get("resultados", {}).get(qtd, {}).get(operacao)
+            if antes is None:
+                continue  # Tamanho ou operação que a base não mediu
+            depois = medicoes[operacao]["segundos"]
+            if depois > antes["segundos"] * (1 + limite) and depois - antes["segundos"] > minimo:
+                regressoes.append((qtd, operacao, antes["segundos"], depois))
+    return regressoes
+
+def main():
+    opcoes = argparse.ArgumentParser(description="Suíte de desempenho do sistema escolar.")
+    opcoes.add_argument("--alunos", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    opcoes.add_argument("--turmas", type=int, default=30)
+    opcoes.add_argument("--materias", type=int, default=4, choices=range(1, len(MATERIAS_DO_SISTEMA + MATERIAS_EXTRAS) + 1),
+                        metavar=f"1-{len(MATERIAS_DO_SISTEMA + MATERIAS_EXTRAS)}")
+    opcoes.add_argument("--preenchimento", type=float, default=0.8, help="fração das notas lançadas (0 a 1)")
+    opcoes.add_argument("--semente", type=int, default=2025)
+    opcoes.add_argument("--repeticoes", type=int, default=3, help="medições por tamanho (vale o menor tempo)")
+    opcoes.add_argument("--saida", default="resultados_desempenho.json", help="arquivo JSON com os resultados")
+    opcoes.add_argument("--comparar", metavar="BASE.json", help="resultados anteriores usados como referência")
+    opcoes.add_argument("--limite", type=float, default=0.25, help="piora máxima aceita (0.25 = 25%%)")
+    opcoes.add_argument("--minimo", type=float, default=0.01, help="diferença em segundos ignorada como ruído")
+    opcoes.add_argument("--medir", help=argparse.SUPPRESS)           # Uso interno: processo filho de medição
+    opcoes.add_argument("--lista-materias", help=argparse.SUPPRESS)
+    opcoes = opcoes.parse_args()
+
+    if opcoes.medir:
+        print(json.dumps(medir_tamanho(opcoes.medir, opcoes.lista_materias.split(","))))
+        return 0
+
+    base = None
+    if opcoes.comparar:
+        with open(opcoes.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        if base.get("parametros") != parametros_da_escola(opcoes):
+            print(f"❌ {opcoes.comparar} foi medido com outra escola sintética: {base.get('parametros')}")
+            return 2  # Tempos de escolas diferentes não são comparáveis
+
+    resultado = executar_suite(opcoes)
+    with open(opcoes.saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"Resultados gravados em {opcoes.saida}")
+
+    if base is not None:
+        regressoes = comparar(base, resultado, opcoes.limite, opcoes.minimo)
+        for qtd, operacao, antes, depois in regressoes:
+            print(f"❌ REGRESSÃO {operacao} com {qtd} alunos: {antes:.4f} s -> {depois:.4f} s "
+                  f"(+{(depois / antes - 1) * 100:.0f}%)")
+        if regressoes:
+            return 1
+        print(f"✅ Nenhuma operação ficou mais de {opcoes.limite * 100:.0f}% mais lenta que {opcoes.comparar}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
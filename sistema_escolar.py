@@ -0,0 +1,27 @@
+# Permite usar o sistema escolar a partir de outros programas:
+#     from sistema_escolar import RegistroEscolar
+#     escola = RegistroEscolar("pasta/dos/dados")
+#     ra = escola.registrar("Ana Silva", "9A")
+# O programa principal tem espaços no nome do arquivo e não pode ser importado diretamente;
+# este módulo o carrega sem abrir menus e sem criar pastas (os dados só são lidos no primeiro uso).
+
+import importlib.util  # Importa importlib, utilizado para carregar o programa principal (o nome do arquivo tem espaços)
+import os              # Importa o módulo OS para montar o caminho do programa principal
+import sys             # Importa sys, utilizado para registrar o módulo carregado
+
+PROGRAMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "PIM II - Sistema Escolar.py")
+
+_spec = importlib.util.spec_from_file_location("sistema_escolar_nucleo", PROGRAMA)
+nucleo = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = nucleo  # Registrado para que os relatórios em processos separados encontrem as funções
+_spec.loader.exec_module(nucleo)
+
+RegistroEscolar = nucleo.RegistroEscolar
+ErroRegistro = nucleo.ErroRegistro
+AlunoNaoEncontrado = nucleo.AlunoNaoEncontrado
+
+__all__ = ["RegistroEscolar", "ErroRegistro", "AlunoNaoEncontrado", "nucleo"]
+
+if __name__ == "__main__":
+    # "python sistema_escolar.py boletim F1A2B3": mesmo modo sem menus, reaproveitando o programa já compilado
+    sys.exit(nucleo.executar_linha_de_comando(sys.argv[1:]))
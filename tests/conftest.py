@@ -0,0 +1,34 @@
+# Configuração dos testes: cada teste recebe cópias novas do programa, com os dados em uma pasta temporária.
+# Uso: python -m pytest -q
+
+import importlib.util  # Importa importlib, utilizado para carregar o programa principal (o nome do arquivo tem espaços)
+import itertools       # Importa itertools, utilizado para dar um nome diferente a cada cópia do programa
+import os              # Importa o módulo OS para montar o caminho do programa principal
+import sys             # Importa sys, utilizado para registrar as cópias carregadas
+
+import pytest
+
+PROGRAMA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "PIM II - Sistema Escolar.py")
+contador_copias = itertools.count()
+
+# --------------------- CARREGA UMA CÓPIA NOVA DO PROGRAMA --------------------- #
+def importar_sistema(monkeypatch, pasta, armazenamento="texto"):
+    # Os dados ficam em variáveis globais do programa: cada cópia começa vazia, como um processo novo
+    nome = f"sistema_escolar_teste_{next(contador_copias)}"
+    spec = importlib.util.spec_from_file_location(nome, PROGRAMA)
+    sistema = importlib.util.module_from_spec(spec)
+    monkeypatch.setitem(sys.modules, nome, sistema)  # Removido do sys.modules no fim do teste
+    spec.loader.exec_module(sistema)
+    sistema.BACKEND_ARMAZENAMENTO = armazenamento
+    sistema.TRABALHADORES_RELATORIOS = 1  # Relatórios em sequência: testes determinísticos e sem threads sobrando
+    sistema.registro.pasta = str(pasta)
+    return sistema
+
+@pytest.fixture
+def novo_sistema(monkeypatch, tmp_path):
+    # novo_sistema() devolve uma cópia nova do programa usando a mesma pasta temporária do teste;
+    # chamar de novo simula reabrir o programa (ex: depois de uma queda)
+    monkeypatch.chdir(tmp_path)
+    def criar(armazenamento="texto"):
+        return importar_sistema(monkeypatch, tmp_path, armazenamento)
+    return criar
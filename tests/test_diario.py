@@ -0,0 +1,80 @@
+# Diário de alterações: o que foi gravado antes de uma queda (sem compactar) volta ao reabrir o programa.
+
+import os
+
+def caminho_diario(sistema):
+    return os.path.join(sistema.PASTA_ARQUIVOS, sistema.ARQUIVO_DIARIO)
+
+def test_reproduz_diario_depois_de_queda(novo_sistema):
+    sistema = novo_sistema()
+    registro = sistema.registro
+    ana = registro.registrar("Ana Silva", "9A")
+    bruno = registro.registrar("Bruno Lima", "9B")
+    registro.lancar_notas(ana, "Matematica", 7, 8)
+    registro.lancar_notas(bruno, "Historia", 3, 4)
+    registro.remover(bruno)
+    # Queda: o programa some sem salvar; as alterações só existem no diário
+    with open(caminho_diario(sistema), "rb") as f:
+        assert f"NOTA|{ana}|Matematica|7.5\n".encode() in f.read()
+
+    reaberto = novo_sistema()
+    reaberto.registro.carregar()
+    assert list(reaberto.alunos) == [ana]
+    assert reaberto.registro.boletim(ana)["notas"]["Matematica"] == 7.5
+    assert reaberto.registro.verificar_medias() == []
+
+def test_linha_incompleta_no_fim_do_diario(novo_sistema):
+    sistema = novo_sistema()
+    ana = sistema.registro.registrar("Ana Silva", "9A")
+    sistema.registro.lancar_notas(ana, "Matematica", 6, 6)
+    with open(caminho_diario(sistema), "ab") as f:
+        f.write(f"NOTA|{ana}|Matematica|1".encode())  # Queda no meio da escrita de "10.0"
+
+    reaberto = novo_sistema()
+    reaberto.registro.carregar()
+    assert reaberto.registro.boletim(ana)["notas"]["Matematica"] == 6.0  # A linha incompleta é descartada
+    bruno = reaberto.registro.registrar("Bruno Lima", "9A")
+    reaberto.registro.lancar_notas(ana, "Portugues", 9, 9)
+
+    # O próximo registro não pode ser emendado na linha incompleta
+    with open(caminho_diario(reaberto), "rb") as f:
+        assert f.read().endswith(f"ALUNO|{bruno}|Bruno Lima|9A\nNOTA|{ana}|Portugues|9.0\n".encode())
+    outro = novo_sistema()
+    outro.registro.carregar()
+    assert sorted(outro.alunos) == sorted([ana, bruno])
+    assert outro.registro.boletim(ana)["notas"] == {"Matematica": 6.0, "Portugues": 9.0,
+                                                    "Historia": None, "Geografia": None}
+
+def test_registro_corrompido_e_ignorado(novo_sistema):
+    sistema = novo_sistema()
+    ana = sistema.registro.registrar("Ana Silva", "9A")
+    with open(caminho_diario(sistema), "ab") as f:
+        f.write(f"NOTA|{ana}|Matematica|sete\nALUNO|FXXXXX\n".encode())
+    sistema.registro.lancar_notas(ana, "Historia", 5, 5)
+
+    reaberto = novo_sistema()
+    reaberto.registro.carregar()
+    assert list(reaberto.alunos) == [ana]
+    assert reaberto.registro.boletim(ana)["notas"]["Matematica"] is None
+    assert reaberto.registro.boletim(ana)["notas"]["Historia"] == 5.0
+
+def test_compactacao_esvazia_o_diario(novo_sistema):
+    sistema = novo_sistema()
+    sistema.LIMITE_DIARIO = 5
+    ras = [sistema.registro.registrar(nome, "9C") for nome in
+           ["Ana Silva", "Bruno Lima", "Carla Dias", "Davi Reis", "Elisa Souza", "Fabio Rocha"]]
+    assert sistema.estado_diario["registros"] < 5  # Passou do limite: incorporado ao "alunos.txt"
+
+    reaberto = novo_sistema()
+    reaberto.registro.carregar()
+    assert sorted(reaberto.alunos) == sorted(ras)
+    assert reaberto.estado_diario["versao"] >= 1
+
+def test_outro_processo_ve_o_diario(novo_sistema):
+    # Dois processos na mesma pasta: as consultas trazem os registros novos do diário do outro
+    primeiro = novo_sistema()
+    segundo = novo_sistema()
+    ana = primeiro.registro.registrar("Ana Silva", "9A")
+    assert segundo.registro.boletim(ana)["nome"] == "Ana Silva"
+    segundo.registro.lancar_notas(ana, "Geografia", 10, 9)
+    assert primeiro.registro.boletim(ana)["notas"]["Geografia"] == 9.5
@@ -0,0 +1,134 @@
+# Lotes de alterações: o comando "lote" da linha de comando e o "with registro.lote():" da API.
+
+import json
+import os
+
+import pytest
+
+def executar_lote(sistema, capsys, linhas):
+    # Roda "lote" com as linhas como entrada e devolve (código de saída, respostas JSON)
+    codigo = sistema.executar_linha_de_comando(["--pasta", sistema.registro.pasta, "lote"],
+                                               entrada=[linha + "\n" for linha in linhas])
+    return codigo, [json.loads(linha) for linha in capsys.readouterr().out.splitlines()]
+
+def ler_diario(sistema):
+    try:
+        with open(os.path.join(sistema.PASTA_ARQUIVOS, sistema.ARQUIVO_DIARIO), "rb") as f:
+            return f.read().decode("utf-8")
+    except FileNotFoundError:
+        return ""
+
+def test_lote_com_linhas_invalidas(novo_sistema, capsys):
+    # As linhas com erro respondem com o número da linha; as demais são gravadas normalmente
+    sistema = novo_sistema()
+    ana = sistema.registro.registrar("Ana Silva", "9A")
+    codigo, respostas = executar_lote(sistema, capsys, [
+        "# comentário",
+        'registrar "Bruno Lima" 9B',
+        "registrar Carla 9B",                 # Sem sobrenome
+        f"nota {ana} Matematica 7,5 8",
+        f"nota {ana} Quimica 5 5",            # Matéria inexistente
+        'registrar "Davi Reis 9C',            # Aspas sem fechamento
+        "nota FZZZZZ Historia 5 5",           # RA inexistente
+        "comando_que_nao_existe",
+        "",
+    ])
+    assert codigo == 1
+    assert [(r["linha"], r["ok"]) for r in respostas] == [(2, True), (3, False), (4, True), (5, False),
+                                                         (6, False), (7, False), (8, False)]
+    assert respostas[2]["media"] == 7.75
+
+    reaberto = novo_sistema()
+    reaberto.registro.carregar()
+    assert sorted(aluno["nome"] for aluno in reaberto.alunos.values()) == ["Ana Silva", "Bruno Lima"]
+    assert reaberto.registro.boletim(ana)["notas"]["Matematica"] == 7.75
+    assert reaberto.registro.verificar_medias() == []
+
+def test_lote_sem_erros_em_varios_blocos(novo_sistema, capsys):
+    sistema = novo_sistema()
+    sistema.registro.salvar()  # Cria o "alunos.txt": daqui em diante as alterações vão para o diário
+    sistema.TAMANHO_BLOCO_LOTE = 2
+    nomes = ["Ana Silva", "Bruno Lima", "Carla Dias", "Davi Reis", "Elisa Souza"]
+    codigo, respostas = executar_lote(sistema, capsys, [f'registrar "{nome}" 9A' for nome in nomes])
+    assert codigo == 0
+    assert all(resposta["ok"] for resposta in respostas)
+    ras = [resposta["ra"] for resposta in respostas]
+    assert len(set(ras)) == len(nomes)
+    for ra, nome in zip(ras, nomes):
+        assert f"ALUNO|{ra}|{nome}|9A\n" in ler_diario(sistema)
+
+    reaberto = novo_sistema()
+    assert [aluno["nome"] for aluno in reaberto.registro.listar_turma("9A")] == nomes
+
+def test_lote_grava_so_no_final(novo_sistema):
+    sistema = novo_sistema()
+    registro = sistema.registro
+    registro.salvar()  # Cria o "alunos.txt": daqui em diante as alterações vão para o diário
+    with registro.lote():
+        ana = registro.registrar("Ana Silva", "9A")
+        registro.lancar_notas(ana, "Portugues", 9, 10)
+        assert ana not in ler_diario(sistema)  # Ainda guardado na memória do lote
+    assert ler_diario(sistema) == f"ALUNO|{ana}|Ana Silva|9A\nNOTA|{ana}|Portugues|9.5\n"
+
+def test_excecao_no_lote_nao_grava_nada(novo_sistema):
+    sistema = novo_sistema()
+    registro = sistema.registro
+    ana = registro.registrar("Ana Silva", "9A")
+    registro.lancar_notas(ana, "Matematica", 5, 5)
+    diario_antes = ler_diario(sistema)
+
+    with pytest.raises(KeyError):
+        with registro.lote():
+            bruno = registro.registrar("Bruno Lima", "9A")
+            registro.lancar_notas(ana, "Matematica", 10, 10)
+            registro.remover(ana)
+            raise KeyError("falha no meio do lote")
+
+    # Nada foi gravado e a memória voltou ao que está no disco
+    assert ler_diario(sistema) == diario_antes
+    assert list(sistema.alunos) == [ana]
+    assert bruno not in sistema.alunos
+    assert registro.boletim(ana)["notas"]["Matematica"] == 5.0
+    assert [aluno["nome"] for aluno in registro.listar_turma("9A")] == ["Ana Silva"]
+    assert registro.verificar_medias() == []
+    assert sistema.lote_alteracoes == {"nivel": 0, "registros": [], "compactar": False, "falhou": False}
+
+    # O próximo lote funciona normalmente
+    with registro.lote():
+        carla = registro.registrar("Carla Dias", "9B")
+    reaberto = novo_sistema()
+    reaberto.registro.carregar()
+    assert sorted(reaberto.alunos) == sorted([ana, carla])
+
+def test_erro_de_registro_no_lote_desfaz_o_lote(novo_sistema):
+    sistema = novo_sistema()
+    registro = sistema.registro
+    with pytest.raises(sistema.ErroRegistro):
+        with registro.lote():
+            registro.registrar("Ana Silva", "9A")
+            registro.registrar("Bruno", "9A")  # Nome inválido: a exceção escapa do lote
+    assert sistema.alunos == {}
+    assert ler_diario(sistema) == ""
+    reaberto = novo_sistema()
+    reaberto.registro.carregar()
+    assert reaberto.alunos == {}
+
+def test_falha_em_lote_interno_descarta_o_lote_inteiro(novo_sistema):
+    # Mesmo tratando a exceção do lote interno, o lote de fora não grava metade das operações
+    sistema = novo_sistema()
+    registro = sistema.registro
+    with pytest.raises(RuntimeError):
+        with registro.lote():
+            registro.registrar("Ana Silva", "9A")
+            try:
+                with registro.lote():
+                    registro.registrar("Bruno Lima", "9A")
+                    raise KeyError("falha no lote interno")
+            except KeyError:
+                pass
+            registro.registrar("Carla Dias", "9A")
+    assert sistema.alunos == {}
+    assert ler_diario(sistema) == ""
+    reaberto = novo_sistema()
+    reaberto.registro.carregar()
+    assert reaberto.alunos == {}
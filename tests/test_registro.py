@@ -0,0 +1,92 @@
+# Ida e volta pelos três armazenamentos: o que é gravado por um processo é lido igual pelo próximo.
+
+import pytest
+
+ARMAZENAMENTOS = ["texto", "sqlite", "particionado"]
+
+def preencher_escola(sistema):
+    # Mesma sequência de operações para todos os armazenamentos; devolve os RAs por nome
+    registro = sistema.registro
+    ras = {nome: registro.registrar(nome, turma) for nome, turma in
+           [("Ana Silva", "9A"), ("Bruno Lima", "9A"), ("Carla Dias", "9B"), ("Davi Reis", "9C")]}
+    for materia in sistema.obter_materias_validas():
+        registro.lancar_notas(ras["Ana Silva"], materia, 8, 9)
+    registro.lancar_notas(ras["Bruno Lima"], "Matematica", 4, 5)
+    registro.lancar_notas(ras["Bruno Lima"], "Matematica", 6, 7)  # A última nota gravada é a que vale
+    registro.lancar_notas(ras["Carla Dias"], "Historia", 10, 10)
+    registro.remover(ras["Davi Reis"])
+    return ras
+
+def retrato(sistema):
+    # Boletins de todos os alunos, comparáveis entre processos (e entre armazenamentos, sem os RAs)
+    registro = sistema.registro
+    return sorted((b["nome"], b["turma"], tuple(sorted(b["notas"].items())), b["media"], b["status"])
+                  for b in (registro.boletim(ra) for ra in list(sistema.alunos)))
+
+@pytest.mark.parametrize("armazenamento", ARMAZENAMENTOS)
+@pytest.mark.parametrize("salvar", [True, False], ids=["salvo", "sem_salvar"])
+def test_ida_e_volta(novo_sistema, armazenamento, salvar):
+    sistema = novo_sistema(armazenamento)
+    ras = preencher_escola(sistema)
+    esperado = retrato(sistema)
+    if salvar:
+        sistema.registro.salvar()
+
+    reaberto = novo_sistema(armazenamento)
+    reaberto.registro.carregar()
+    assert retrato(reaberto) == esperado
+    assert set(reaberto.alunos) == {ras["Ana Silva"], ras["Bruno Lima"], ras["Carla Dias"]}
+    assert reaberto.registro.boletim(ras["Ana Silva"])["status"] == "APROVADO"
+    assert reaberto.registro.boletim(ras["Bruno Lima"])["notas"]["Matematica"] == 6.5
+    assert [aluno["nome"] for aluno in reaberto.registro.listar_turma("9A")] == ["Ana Silva", "Bruno Lima"]
+    assert reaberto.registro.turmas() == ["9A", "9B"]
+    assert reaberto.registro.verificar_medias() == []
+
+def test_armazenamentos_guardam_o_mesmo(novo_sistema, tmp_path, monkeypatch):
+    retratos = []
+    for armazenamento in ARMAZENAMENTOS:
+        pasta = tmp_path / armazenamento
+        pasta.mkdir()
+        monkeypatch.chdir(pasta)
+        sistema = novo_sistema(armazenamento)
+        sistema.registro.pasta = str(pasta)
+        preencher_escola(sistema)
+        sistema.registro.salvar()
+        reaberto = novo_sistema(armazenamento)
+        reaberto.registro.pasta = str(pasta)
+        reaberto.registro.carregar()
+        retratos.append(retrato(reaberto))
+    assert retratos[0] == retratos[1] == retratos[2]
+
+@pytest.mark.parametrize("armazenamento", ARMAZENAMENTOS)
+def test_boletim_antes_de_carregar(novo_sistema, armazenamento):
+    # A consulta pontual (sem carregar a escola inteira) devolve o mesmo boletim da consulta completa
+    sistema = novo_sistema(armazenamento)
+    ras = preencher_escola(sistema)
+    sistema.registro.salvar()
+
+    consulta = novo_sistema(armazenamento)
+    boletim = consulta.registro.boletim(ras["Ana Silva"])
+    assert boletim == sistema.registro.boletim(ras["Ana Silva"])
+    with pytest.raises(consulta.AlunoNaoEncontrado):
+        consulta.registro.boletim(ras["Davi Reis"])
+
+def test_erros_de_validacao(novo_sistema):
+    sistema = novo_sistema()
+    registro = sistema.registro
+    with pytest.raises(sistema.ErroRegistro):
+        registro.registrar("Ana", "9A")  # Sem sobrenome
+    with pytest.raises(sistema.ErroRegistro):
+        registro.registrar("Ana Silva", "1Z")
+    ra = registro.registrar("Ana Silva", "9A")
+    with pytest.raises(sistema.ErroRegistro):
+        registro.lancar_notas(ra, "Quimica", 5, 5)
+    with pytest.raises(sistema.ErroRegistro):
+        registro.lancar_notas(ra, "Matematica", 11, 5)
+
+def test_uma_pasta_por_processo(novo_sistema, tmp_path):
+    sistema = novo_sistema()
+    sistema.registro.carregar()
+    outra = sistema.RegistroEscolar(str(tmp_path / "outra"))
+    with pytest.raises(sistema.ErroRegistro):
+        outra.registrar("Ana Silva", "9A")
@@ -0,0 +1,170 @@
+# Servidor HTTP: rotas de consulta e de notas e as respostas de erro (400, 404, 405, 413 e 431).
+
+import asyncio
+import json
+import socket
+import threading
+
+import pytest
+
+class ClienteHTTP:
+    # Conexão crua com o servidor, para enviar também requisições malformadas
+    def __init__(self, porta):
+        self.conexao = socket.create_connection(("127.0.0.1", porta), timeout=5)
+        self.recebido = b""
+
+    def enviar(self, bruto):
+        self.conexao.sendall(bruto)
+        return self.ler_resposta()
+
+    def ler_resposta(self):
+        # Devolve (status, cabeçalhos, corpo JSON) de uma resposta, deixando a conexão pronta para a próxima
+        while b"\r\n\r\n" not in self.recebido:
+            self.receber()
+        cabecalho, self.recebido = self.recebido.split(b"\r\n\r\n", 1)
+        linhas = cabecalho.decode("latin-1").split("\r\n")
+        cabecalhos = {nome.lower(): valor.strip() for nome, _, valor in (linha.partition(":") for linha in linhas[1:])}
+        tamanho = int(cabecalhos["content-length"])
+        while len(self.recebido) < tamanho:
+            self.receber()
+        corpo, self.recebido = self.recebido[:tamanho], self.recebido[tamanho:]
+        return int(linhas[0].split()[1]), cabecalhos, json.loads(corpo)
+
+    def receber(self):
+        dados = self.conexao.recv(65536)
+        if not dados:
+            raise ConnectionError("conexão encerrada pelo servidor")
+        self.recebido += dados
+
+    def encerrada(self):
+        # True se o servidor fechou a conexão
+        try:
+            return self.recebido == b"" and self.conexao.recv(1) == b""
+        except ConnectionError:
+            return True
+
+    def fechar(self):
+        self.conexao.close()
+
+@pytest.fixture
+def servidor(novo_sistema):
+    # Servidor em uma thread, numa porta livre, com uma aluna cadastrada; encerrado no fim do teste
+    sistema = novo_sistema()
+    sistema.ATRASO_SALVAMENTO_HTTP = 0.01
+    ana = sistema.registro.registrar("Ana Silva", "9A")
+    loop = asyncio.new_event_loop()
+    instancia = sistema.ServidorEscolar(porta=0)
+    pronto = threading.Event()
+    tarefa = loop.create_task(instancia.executar(lambda s: pronto.set()))
+
+    def rodar():
+        try:
+            loop.run_until_complete(tarefa)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            loop.close()
+
+    thread = threading.Thread(target=rodar, daemon=True)
+    thread.start()
+    assert pronto.wait(5)
+    clientes = []
+
+    def conectar():
+        cliente = ClienteHTTP(instancia.porta)
+        clientes.append(cliente)
+        return cliente
+
+    yield sistema, ana, conectar
+    for cliente in clientes:
+        cliente.fechar()
+    loop.call_soon_threadsafe(tarefa.cancel)
+    thread.join(5)
+
+def get(caminho):
+    return f"GET {caminho} HTTP/1.1\r\nHost: teste\r\n\r\n".encode()
+
+def post_notas(corpo, extra=""):
+    return (f"POST /notas HTTP/1.1\r\nHost: teste\r\nContent-Length: {len(corpo)}\r\n{extra}\r\n").encode() + corpo
+
+def test_consultas_e_notas(servidor):
+    sistema, ana, conectar = servidor
+    cliente = conectar()
+    status, cabecalhos, resposta = cliente.enviar(get(f"/boletim/{ana}"))
+    assert status == 200 and resposta["nome"] == "Ana Silva"
+    assert cabecalhos["connection"] == "keep-alive"
+
+    # Mesma conexão (keep-alive): nota lançada e visível na consulta seguinte
+    corpo = json.dumps({"ra": ana.lower(), "materia": "Matematica", "n1": 7, "n2": 8}).encode()
+    status, _, resposta = cliente.enviar(post_notas(corpo))
+    assert (status, resposta) == (200, {"ra": ana, "media": 7.5})
+    status, _, resposta = cliente.enviar(get(f"/boletim/{ana}"))
+    assert resposta["notas"]["Matematica"] == 7.5
+    assert cliente.enviar(get("/turmas"))[2] == {"turmas": ["9A"]}
+    assert cliente.enviar(get("/turmas/9a"))[2]["alunos"][0]["ra"] == ana
+    assert cliente.enviar(get("/busca/ana%20sil"))[2]["alunos"][0]["ra"] == ana
+
+def test_rotas_e_alunos_inexistentes(servidor):
+    sistema, ana, conectar = servidor
+    cliente = conectar()
+    assert cliente.enviar(get("/nada"))[0] == 404
+    assert cliente.enviar(get("/boletim/FZZZZZ"))[0] == 404
+    corpo = json.dumps({"ra": "FZZZZZ", "materia": "Matematica", "n1": 5, "n2": 5}).encode()
+    assert cliente.enviar(post_notas(corpo))[0] == 404
+    assert cliente.enviar(b"POST /alunos HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}")[0] == 404
+    assert cliente.enviar(b"DELETE /turmas HTTP/1.1\r\n\r\n")[0] == 405
+    assert cliente.enviar(get("/turmas"))[0] == 200  # A conexão continua aberta depois dos erros
+
+@pytest.mark.parametrize("corpo", [
+    b"isto nao e json",
+    b"[1, 2, 3]",
+    b'"texto"',
+    b"{}",
+    b'{"ra": 123, "materia": "Matematica", "n1": 5, "n2": 5}',
+    b'{"ra": "RA", "materia": ["Matematica"], "n1": 5, "n2": 5}',
+    b'{"ra": "RA", "materia": "Matematica", "n1": "cinco", "n2": 5}',
+    b'{"ra": "RA", "materia": "Quimica", "n1": 5, "n2": 5}',
+    b'{"ra": "RA", "materia": "Matematica", "n1": 11, "n2": 5}',
+], ids=["nao_json", "lista", "texto", "vazio", "ra_numero", "materia_lista", "nota_texto",
+        "materia_invalida", "nota_fora_da_faixa"])
+def test_corpo_invalido_responde_400(servidor, corpo):
+    sistema, ana, conectar = servidor
+    cliente = conectar()
+    status, _, resposta = cliente.enviar(post_notas(corpo.replace(b'"RA"', f'"{ana}"'.encode())))
+    assert status == 400 and "erro" in resposta
+    assert cliente.enviar(get(f"/boletim/{ana}"))[2]["tem_nota"] is False  # Nada foi lançado
+
+@pytest.mark.parametrize("tamanho", ["abc", "-5"])
+def test_content_length_invalido_responde_400_e_encerra(servidor, tamanho):
+    sistema, ana, conectar = servidor
+    cliente = conectar()
+    status, cabecalhos, _ = cliente.enviar(f"POST /notas HTTP/1.1\r\nContent-Length: {tamanho}\r\n\r\n".encode())
+    assert status == 400 and cabecalhos["connection"] == "close"
+    assert cliente.encerrada()
+
+def test_corpo_grande_responde_413(servidor):
+    sistema, ana, conectar = servidor
+    cliente = conectar()
+    tamanho = sistema.TAMANHO_MAXIMO_CORPO + 1
+    status, cabecalhos, _ = cliente.enviar(f"POST /notas HTTP/1.1\r\nContent-Length: {tamanho}\r\n\r\n".encode())
+    assert status == 413 and cabecalhos["connection"] == "close"
+    assert cliente.encerrada()
+
+@pytest.mark.parametrize("bruto", [
+    b"GET /" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n",
+    b"GET /turmas HTTP/1.1\r\nX-Grande: " + b"a" * 70000 + b"\r\n\r\n",
+], ids=["linha", "cabecalho"])
+def test_requisicao_grande_responde_431(servidor, bruto):
+    sistema, ana, conectar = servidor
+    cliente = conectar()
+    status, cabecalhos, _ = cliente.enviar(bruto)
+    assert status == 431 and cabecalhos["connection"] == "close"
+    assert conectar().enviar(get("/turmas"))[0] == 200  # O servidor continua atendendo as outras conexões
+
+def test_notas_gravadas_pelo_servidor(servidor, novo_sistema):
+    sistema, ana, conectar = servidor
+    corpo = json.dumps({"ra": ana, "materia": "Historia", "n1": 9, "n2": 10}).encode()
+    assert conectar().enviar(post_notas(corpo, "Connection: close\r\n"))[0] == 200
+    # A nota vai para o diário na hora: outro processo já a enxerga, antes de qualquer salvamento
+    outro = novo_sistema()
+    assert outro.registro.boletim(ana)["notas"]["Historia"] == 9.5